@@ -9,6 +9,7 @@ from sqlalchemy import select
 from backend.database import get_db
 from backend import models
 from backend.api.deps import require_admin  # фабрика: require_admin("admin","super")
+from backend.services.authn.code_cache import invalidate_codes
 
 router = APIRouter(
     tags=["admin:codes-events"],
@@ -56,6 +57,7 @@ def set_allowed_events(code_id: int, payload: SetAllowedEventsIn, db: DB = Depen
             models.CodeAllowedEvent.code_id == code_id
         ).delete(synchronize_session=False)
         db.commit()
+        invalidate_codes([code.code_plain], strict=True)
         return AllowedEventsOut(code_id=code_id, allow_all=True, event_ids=[])
 
     # 2) deny-by-default: allow_all=false
@@ -89,6 +91,7 @@ def set_allowed_events(code_id: int, payload: SetAllowedEventsIn, db: DB = Depen
             models.CodeAllowedEvent.code_id == code_id
         ).delete(synchronize_session=False)
         db.commit()
+        invalidate_codes([code.code_plain], strict=True)
         return AllowedEventsOut(code_id=code_id, allow_all=False, event_ids=[])
 
     # 3) валідація: усі event_ids існують?
@@ -106,5 +109,6 @@ def set_allowed_events(code_id: int, payload: SetAllowedEventsIn, db: DB = Depen
 
     db.add_all([models.CodeAllowedEvent(code_id=code_id, event_id=eid) for eid in ids])
     db.commit()
+    invalidate_codes([code.code_plain], strict=True)
 
     return AllowedEventsOut(code_id=code_id, allow_all=False, event_ids=ids)
\ No newline at end of file
@@ -1,5 +1,5 @@
 # backend/api/v1/admin/analytics.py
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime
@@ -7,6 +7,13 @@ from typing import Literal, Optional
 
 from backend.api.deps import get_db, require_admin_token, require_admin
 from backend import models, schemas
+from backend.services.authn.code_cache import cache_stats
+from backend.services.page_cache import cache_stats as page_cache_stats
+from backend.core.compression import compression_cache_stats
+from backend.services.event_cache import event_cache_stats
+from backend.services.metrics.ccu_rollups import GLOBAL_SERIES, ccu_series
+from backend.services.metrics.ccu_series import event_ccu_peaks, event_ccu_series
+from backend.services.metrics.usage import batch_usage, event_codes, event_usage
 
 # Це адмінський роутер для аналітики
 router = APIRouter(
@@ -34,6 +41,45 @@ def get_ccu(
     rows = q.limit(limit).all()
     return rows  # працює завдяки from_attributes=True у CcuPoint
 
+@router.get("/ccu/series", response_model=schemas.CcuSeries)
+def get_ccu_series(
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+    event_id: int = Query(GLOBAL_SERIES, ge=0),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    max_points: int = Query(500, ge=1, le=5000),
+):
+    """
+    Ряд CCU (event_id=0 — глобальний) з min/avg/max по відрах. Роздільність (1m/5m/1h/1d)
+    обирається під діапазон і max_points; сирі /ccu і /ccu/events/{id} лишаються для сумісності.
+    """
+    return ccu_series(db, event_id, since, until, max_points)
+
+@router.get("/ccu/events", response_model=list[schemas.EventCcuPeak])
+def get_event_ccu_peaks(
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Пік/середнє CCU по івентах за діапазон (за спаданням піку)."""
+    return event_ccu_peaks(db, since, until, limit)
+
+@router.get("/ccu/events/{event_id}", response_model=list[schemas.CcuPoint])
+def get_event_ccu(
+    event_id: int,
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    limit: int = Query(1440, ge=1, le=10000),
+    order: Literal["asc","desc"] = Query("asc"),
+):
+    """Похвилинний CCU одного івенту."""
+    return event_ccu_series(db, event_id, since, until, limit, order)
+
 @router.get("/codes/{code_id}", response_model=schemas.CodeStats)
 def code_stats(
     code_id: int,
@@ -42,6 +88,16 @@ def code_stats(
     since: Optional[datetime] = Query(None, description="фільтр за created_at >= since"),
     until: Optional[datetime] = Query(None, description="фільтр за created_at <= until"),
 ):
+    if since is None and until is None:
+        # підсумки за весь час — з ролапу, без скану sessions
+        u = db.get(models.CodeUsage, code_id)
+        return {
+            "code_id": code_id,
+            "sessions": int(u.sessions) if u else 0,
+            "watch_seconds": int(u.watch_seconds) if u else 0,
+            "bytes_out": int(u.bytes_out) if u else 0,
+        }
+
     q = db.query(
         func.count(models.Session.id),
         func.coalesce(func.sum(models.Session.watch_seconds), 0),
@@ -54,4 +110,66 @@ def code_stats(
         q = q.filter(models.Session.created_at <= until)
 
     sessions, watch, traffic = q.one()
-    return {"code_id": code_id, "sessions": sessions, "watch_seconds": int(watch), "bytes_out": int(traffic)}
\ No newline at end of file
+    return {"code_id": code_id, "sessions": sessions, "watch_seconds": int(watch), "bytes_out": int(traffic)}
+
+@router.get("/batches", response_model=list[schemas.BatchRevenue])
+def get_batches_revenue(
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+    event_id: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Дохід пакетів (активовані коди × price_uah), сесії і час перегляду — лише з ролапів."""
+    return batch_usage(db, event_id=event_id, limit=limit, offset=offset)
+
+@router.get("/batches/{batch_id}", response_model=schemas.BatchRevenue)
+def get_batch_revenue(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+):
+    rows = batch_usage(db, batch_id=batch_id, limit=1)
+    if not rows:
+        raise HTTPException(404, detail="batch_not_found")
+    return rows[0]
+
+@router.get("/events/{event_id}/usage", response_model=schemas.EventUsageStats)
+def get_event_usage(
+    event_id: int,
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+):
+    """Сесії, активовані коди, час перегляду і дохід івенту — з ролапів."""
+    return event_usage(db, event_id)
+
+@router.get("/events/{event_id}/codes", response_model=list[schemas.EventCodeStats])
+def get_event_codes(
+    event_id: int,
+    db: Session = Depends(get_db),
+    _current = Depends(require_admin_token),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Активні коди івенту (хоч одна сесія на ньому) за спаданням часу перегляду."""
+    return event_codes(db, event_id, limit=limit, offset=offset)
+
+@router.get("/cache/codes")
+def code_cache_stats(_current = Depends(require_admin_token)):
+    """Hit-rate кешу метаданих access-кодів (логін), сумарно по всіх воркерах."""
+    return cache_stats()
+
+@router.get("/cache/pages")
+def event_page_cache_stats(_current = Depends(require_admin_token)):
+    """Кеш відрендерених сторінок івентів — лише цей воркер (in-process)."""
+    return page_cache_stats()
+
+@router.get("/cache/events")
+def event_meta_cache_stats(_current = Depends(require_admin_token)):
+    """Кеш метаданих івентів — лише цей воркер (in-process)."""
+    return event_cache_stats()
+
+@router.get("/cache/compression")
+def compression_cache_stats_view(_current = Depends(require_admin_token)):
+    """Кеш стиснутих тіл відповідей — лише цей воркер (in-process)."""
+    return compression_cache_stats()
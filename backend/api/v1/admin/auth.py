@@ -20,6 +20,7 @@ from backend.services.security.bruteforce import (
     register_failed_code_try,
     clear_failed_code_try,
 )
+from backend.services.security.rate_limit import limit_admin_login
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
 
@@ -40,8 +41,9 @@ def admin_login(
     password: str = Body(...),
     db: DB = Depends(get_db),
 ):
-    # 1) rate-limit по IP
+    # 1) rate-limit по IP (Redis: GCRA + backoff після невдач)
     ip = request.client.host if request.client else "0.0.0.0"
+    limit_admin_login(ip)
     check_bruteforce(db, ip)
 
     # 2) пошук користувача
@@ -0,0 +1,100 @@
+# backend/api/v1/admin/batches.py
+"""Масові операції над партіями кодів (CodeBatch).
+
+Шляхи (підключай у main.py з префіксом /api/admin/batches):
+
+    POST  /{batch_id}/revoke        – відкликати всі коди партії
+    PATCH /{batch_id}/codes         – allowed_sessions / revoked / expires_at для всіх кодів
+    POST  /{batch_id}/allow_events  – перезаписати дозволені події для всіх кодів
+
+Кожна операція — set-based UPDATE по batch_id; активні сесії гасяться пакетно,
+refresh-токени відкликаються одним запитом, клієнтам іде один terminate-сигнал партії.
+"""
+from __future__ import annotations
+
+from datetime import timezone
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models, schemas
+from backend.api.deps import get_db, require_admin
+from backend.api.v1.admin.allow_events import SetAllowedEventsIn
+from backend.services.repo import code_batches
+
+router = APIRouter(tags=["admin:batches"])
+
+def _get_batch(db: DB, batch_id: int) -> models.CodeBatch:
+    batch = db.get(models.CodeBatch, batch_id)
+    if not batch:
+        raise HTTPException(404, "Batch not found")
+    return batch
+
+# ───────────────────────── REVOKE ─────────────────────────
+# Доступ: Super, Admin, Manager
+@router.post("/{batch_id}/revoke")
+def revoke_batch(
+    batch_id: int,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager")),
+):
+    _get_batch(db, batch_id)
+    return code_batches.set_batch_revoked(db, batch_id, True).to_dict()
+
+# ───────────────────────── PATCH ─────────────────────────
+# Доступ: Super, Admin, Manager
+@router.patch("/{batch_id}/codes")
+def patch_batch_codes(
+    batch_id: int,
+    data: schemas.AccessCodePatch,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager")),
+):
+    _get_batch(db, batch_id)
+    out: dict = {"batch_id": batch_id}
+
+    if data.allowed_sessions is not None:
+        if data.allowed_sessions < 1:
+            raise HTTPException(400, "allowed_sessions must be >= 1")
+        out["allowed_sessions"] = code_batches.set_batch_allowed_sessions(db, batch_id, data.allowed_sessions).to_dict()
+
+    if "expires_at" in data.model_fields_set:
+        exp = data.expires_at
+        if exp is not None:
+            exp = exp.replace(tzinfo=timezone.utc) if exp.tzinfo is None else exp.astimezone(timezone.utc)
+        out["expires_at"] = code_batches.set_batch_expires(db, batch_id, exp).to_dict()
+
+    if data.revoked is not None:
+        out["revoked"] = code_batches.set_batch_revoked(db, batch_id, data.revoked).to_dict()
+
+    return out
+
+# ───────────────────────── ALLOWED EVENTS ─────────────────────────
+# Доступ: Admin, Super (як і для окремого коду)
+@router.post("/{batch_id}/allow_events")
+def set_batch_allowed_events(
+    batch_id: int,
+    payload: SetAllowedEventsIn,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("admin", "super")),
+):
+    _get_batch(db, batch_id)
+
+    ids = set(int(eid) for eid in payload.event_ids or [])
+    if not payload.allow_all and payload.event_slugs:
+        slugs = [s.strip() for s in payload.event_slugs if s and s.strip()]
+        slug2id = dict(db.execute(select(models.Event.slug, models.Event.id).where(models.Event.slug.in_(slugs))).all())
+        missing_slugs = [s for s in slugs if s not in slug2id]
+        if missing_slugs:
+            raise HTTPException(status_code=400, detail=f"event_slugs_not_found:{missing_slugs}")
+        ids.update(slug2id.values())
+
+    if not payload.allow_all and ids:
+        exist_ids = set(db.execute(select(models.Event.id).where(models.Event.id.in_(ids))).scalars())
+        missing = sorted(ids - exist_ids)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"events_not_found:{missing}")
+
+    res = code_batches.set_batch_allowed_events(db, batch_id, allow_all=payload.allow_all, event_ids=sorted(ids))
+    return {**res.to_dict(), "allow_all": payload.allow_all, "event_ids": [] if payload.allow_all else sorted(ids)}
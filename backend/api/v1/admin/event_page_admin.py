@@ -10,7 +10,10 @@ import secrets
 from backend.database import get_db
 from backend import models
 from backend.schemas.event_page import EventPageUpdate, EventPageOut
-from backend.services.etag import calc_event_etag
+from backend.repositories.events_repo import compute_event_etag
+from backend.services.event_cache import invalidate_event
+from backend.services.page_compiler import compile_event
+from backend.services.static_export import sync_event
 # Правильний імпорт залежності
 from backend.api.deps import require_admin
 
@@ -55,16 +58,18 @@ def update_event_page(
     if payload.assets_base_url is not None: ev.assets_base_url = payload.assets_base_url
     if payload.status is not None: ev.status = payload.status 
 
+    # санітизація/мініфікація/хеші — один раз тут, а не на кожен рендер
+    compile_event(ev)
+
     db.add(ev); db.commit(); db.refresh(ev)
 
     # Після коміту перерахуємо etag
-    ev.etag = calc_event_etag(
-        ev.id, getattr(ev, "updated_at", None), ev.status or "",
-        ev.page_html or "", ev.page_css or "", ev.page_js or ""
-    )
+    ev.etag = compute_event_etag(ev)
     db.add(ev); db.commit(); db.refresh(ev)
+    invalidate_event(ev.id)
+    sync_event(db, ev.id)
 
-    return {"ok": True, "etag": ev.etag}
+    return {"ok": True, "etag": ev.etag, "js_hash": ev.compiled_js_hash}
 
 # --- PUBLISH ACTIONS: Super, Admin ---
 @router.post("/{event_id}/publish")
@@ -79,16 +84,16 @@ def publish_event_page(
 
     ev.status = "published"
     ev.published_at = datetime.now(timezone.utc)
+    compile_event(ev)
     
     # оновити ETag
-    ev.etag = calc_event_etag(
-        ev.id, getattr(ev, "updated_at", None), ev.status or "",
-        ev.page_html or "", ev.page_css or "", ev.page_js or ""
-    )
+    ev.etag = compute_event_etag(ev)
     if not ev.preview_token:
         ev.preview_token = secrets.token_urlsafe(16)
 
     db.add(ev); db.commit(); db.refresh(ev)
+    invalidate_event(ev.id)
+    sync_event(db, ev.id)
     return {"ok": True, "etag": ev.etag, "preview_token": ev.preview_token}
 
 @router.post("/{event_id}/unpublish")
@@ -102,6 +107,8 @@ def unpublish_event_page(
         raise HTTPException(404, detail="event_not_found")
     ev.status = "draft"
     db.add(ev); db.commit()
+    invalidate_event(ev.id)
+    sync_event(db, ev.id)
     return {"ok": True}
 
 @router.post("/{event_id}/preview-token")
@@ -115,4 +122,5 @@ def regen_preview_token(
         raise HTTPException(404, detail="event_not_found")
     ev.preview_token = secrets.token_urlsafe(16)
     db.add(ev); db.commit(); db.refresh(ev)
+    invalidate_event(ev.id)
     return {"ok": True, "preview_token": ev.preview_token}
\ No newline at end of file
@@ -8,6 +8,8 @@ from backend.api.deps import require_admin
 from backend.database import get_db
 from backend.core.redis import get_redis
 from backend import models
+from backend.services.event_cache import invalidate_event
+from backend.services.static_export import sync_event
 
 from backend.schemas import (
     EventCreate, EventUpdate, EventOut, EventOutShort
@@ -49,6 +51,9 @@ def create_event(
         e = repo_create(db, **payload)
     except IntegrityError:
         raise HTTPException(status_code=409, detail="slug_exists")
+    # знімає негативний 404-кеш slug-а в усіх воркерах
+    invalidate_event(e.id, e.slug)
+    sync_event(db, e.id)
     return _event_to_out(e)
 
 # --- LIST: Всі ролі (Support і Analyst теж мають бачити події) ---
@@ -91,6 +96,8 @@ def patch_event(
     except IntegrityError:
         raise HTTPException(status_code=409, detail="slug_exists")
 
+    invalidate_event(e.id, e.slug)
+    sync_event(db, e.id)
     return _event_to_out(e)
 
 # --- DELETE: Тільки Super та Admin (Manager не може видаляти) ---
@@ -103,6 +110,8 @@ def delete_event(
     ok = repo_delete(db, event_id)
     if not ok:
         raise HTTPException(status_code=404, detail="not_found")
+    invalidate_event(event_id)
+    sync_event(db, event_id)
     return {"ok": True}
 
 # --- STATS: Всі (або можна обмежити без support) ---
@@ -0,0 +1,174 @@
+# backend/api/v1/admin/jobs.py
+"""Фонові задачі адмінки (довгі операції поза HTTP-запитом).
+
+Шляхи (підключай у main.py з префіксом /api/admin):
+
+    POST /jobs                 – поставити задачу {kind, params} → 202
+    POST /jobs/codes-import    – завантажити CSV і поставити codes.import_csv → 202
+    GET  /jobs                 – перелік задач
+    GET  /jobs/{id}            – стан/прогрес
+    POST /jobs/{id}/cancel     – скасувати
+    GET  /jobs/{id}/result     – файл результату (CSV / zip з Parquet чи Arrow)
+
+Прогрес також іде в адмін-WS подіями job_queued / job_started / job_progress / job_finished.
+"""
+from __future__ import annotations
+
+import shutil
+import uuid
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.api.deps import get_db, require_admin
+from backend.services.jobs import handlers  # noqa: F401 — реєстрація обробників
+from backend.services.jobs.core import (
+    JobKind, get_kind, job_to_dict, jobs_dir, kinds_for_role, request_cancel, submit,
+)
+from backend.services.repo.code_csv import CsvImportOptions
+
+router = APIRouter(tags=["admin:jobs"])
+
+RESULT_MEDIA_TYPES = {".csv": "text/csv", ".zip": "application/zip"}
+
+class JobSubmit(BaseModel):
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+def _check_kind(kind: str, admin: models.AdminUser) -> JobKind:
+    k = get_kind(kind)
+    if not k:
+        raise HTTPException(400, "unknown_job_kind")
+    if admin.role not in k.roles:
+        raise HTTPException(403, "forbidden")
+    return k
+
+def _get_job(db: DB, job_id: str) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+# Доступ: Super, Admin, Manager, Support (далі — ролі конкретного kind)
+@router.post("/jobs", status_code=202)
+def create_job(
+    data: JobSubmit,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager", "support")),
+):
+    k = _check_kind(data.kind, current_admin)
+    if data.kind == "codes.import_csv":
+        raise HTTPException(400, "use /jobs/codes-import")
+    reason = k.unavailable() if k.unavailable else None
+    if reason:
+        # не ставимо в чергу задачу, яка гарантовано завершиться помилкою
+        raise HTTPException(503, reason)
+    job = submit(db, data.kind, data.params, admin_id=current_admin.id)
+    return job_to_dict(job)
+
+# Доступ: Super, Admin, Manager
+@router.post("/jobs/codes-import", status_code=202)
+def create_import_job(
+    file: UploadFile = File(...),
+    default_sessions: int = Form(1),
+    default_active: bool = Form(True),
+    default_expires_at: str | None = Form(None),
+    event: str | None = Form(None),
+    has_header: bool = Form(True),
+    code_column: str = Form("code"),
+    sessions_column: str = Form("max_concurrent_sessions"),
+    active_column: str = Form("active"),
+    expires_column: str = Form("expires_at"),
+    event_column: str = Form("event"),
+    force_sessions: bool = Form(False),
+    force_active: bool = Form(False),
+    force_expires: bool = Form(False),
+    force_event: bool = Form(False),
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager")),
+):
+    _check_kind("codes.import_csv", current_admin)
+    opts = CsvImportOptions(
+        default_sessions=default_sessions, default_active=default_active,
+        default_expires_at=default_expires_at, event=event,
+        has_header=has_header, code_column=code_column, sessions_column=sessions_column,
+        active_column=active_column, expires_column=expires_column, event_column=event_column,
+        force_sessions=force_sessions, force_active=force_active,
+        force_expires=force_expires, force_event=force_event,
+    )
+    # файл — у jobs_dir до постановки в чергу: воркер може бути на іншому процесі
+    job_id = str(uuid.uuid4())
+    dst = jobs_dir() / f"{job_id}.input.csv"
+    with open(dst, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1 << 20)
+    job = submit(db, "codes.import_csv", {"options": opts.__dict__, "filename": file.filename},
+                 admin_id=current_admin.id, job_id=job_id)
+    return job_to_dict(job)
+
+# Доступ: Super, Admin, Manager, Support (лише kind, доступні ролі)
+@router.get("/jobs")
+def list_jobs(
+    db: DB = Depends(get_db),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    kind: str | None = None,
+    status: str | None = None,
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager", "support")),
+):
+    J = models.Job
+    # лише задачі тих kind, які роль може ставити: params/результати інших ролей не світимо
+    stmt = select(J).where(J.kind.in_(kinds_for_role(current_admin.role)))
+    if kind:
+        stmt = stmt.where(J.kind == kind)
+    if status:
+        stmt = stmt.where(J.status == status)
+    rows = db.execute(stmt.order_by(J.created_at.desc()).limit(limit).offset(offset)).scalars().all()
+    return {"items": [job_to_dict(j) for j in rows]}
+
+# Доступ: Super, Admin, Manager, Support (далі — ролі kind)
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: str,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager", "support")),
+):
+    job = _get_job(db, job_id)
+    _check_kind(job.kind, current_admin)
+    return job_to_dict(job)
+
+# Доступ: Super, Admin, Manager, Support (далі — ролі kind)
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(
+    job_id: str,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager", "support")),
+):
+    job = _get_job(db, job_id)
+    _check_kind(job.kind, current_admin)
+    return job_to_dict(request_cancel(db, job))
+
+# Доступ: Super, Admin, Manager, Support (далі — ролі kind)
+@router.get("/jobs/{job_id}/result")
+def job_result(
+    job_id: str,
+    db: DB = Depends(get_db),
+    current_admin: models.AdminUser = Depends(require_admin("super", "admin", "manager", "support")),
+):
+    job = _get_job(db, job_id)
+    _check_kind(job.kind, current_admin)
+    if not job.result_file:
+        raise HTTPException(404, "No result file")
+    path = jobs_dir() / job.result_file
+    if not path.is_file():
+        raise HTTPException(410, "Result file is gone")
+    suffix = path.suffix or ".csv"
+    return FileResponse(
+        path,
+        media_type=RESULT_MEDIA_TYPES.get(suffix, "application/octet-stream"),
+        filename=f"{job.kind.replace('.', '_')}_{job.id[:8]}{suffix}",
+    )
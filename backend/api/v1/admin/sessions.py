@@ -3,14 +3,15 @@ from __future__ import annotations
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import or_, cast, String
 from sqlalchemy.orm import Session as DB, selectinload
 
 from backend.api.deps import require_admin   # фабрика з deps.py
 from backend.database import get_db
+from backend.core.config import settings
 from backend import models
 from backend.services.session.online import ccu_estimate, is_online
 from backend.services.session_manager import logout as do_logout
+from backend.services.search import text_search
 from backend.services.ws_service import broadcast, publish_terminate
 
 # Доступ: Super, Admin, Support (Support повинен бачити сесії клієнтів)
@@ -47,17 +48,17 @@ def list_sessions(
               selectinload(models.Session.code)
                   .selectinload(models.AccessCode.event),
           )
-          .join(models.AccessCode, models.Session.code_id == models.AccessCode.id, isouter=True)
     )
 
-    if q:
-        like = f"%{q}%"
-        qry = qry.filter(or_(
-            cast(models.Session.id, String).ilike(like),   # id може бути UUID/str
-            models.Session.ip.ilike(like),
-            models.Session.user_agent.ilike(like),
-            models.AccessCode.code_plain.ilike(like),
-        ))
+    # id вже String(36) — без CAST, інакше триграмний індекс не підхопиться;
+    # код шукаємо підзапитом по access_codes, а не JOIN + OR
+    cond = text_search(
+        db, q,
+        [models.Session.id, models.Session.ip, models.Session.user_agent],
+        via=[(models.Session.code_id, models.AccessCode.id, models.AccessCode.code_plain)],
+    )
+    if cond is not None:
+        qry = qry.filter(cond)
 
     if active is not None:
         qry = qry.filter(models.Session.active == (active == 1))
@@ -150,6 +151,6 @@ def delete_session(
 
 @router.post("/gc")
 def run_gc_now(db: DB = Depends(get_db)):
-    from backend.workers.session_gc import gc_once
-    stats = gc_once(db)
+    from backend.workers.session_gc import _gc_once
+    stats = _gc_once(db, int(getattr(settings, "gc_batch_size", 500)) or 500)
     return {"ok": True, "stats": stats}
\ No newline at end of file
@@ -3,13 +3,13 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, Body, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.orm import Session as DB
-from sqlalchemy import select
 
 from backend.database import get_db
 from backend.api.deps import require_auth
 from backend.core.config import settings
 from backend.services.session_manager import login_with_code, rotate_refresh, logout as do_logout
-from backend.services.authz.policy import code_allows_event
+from backend.services.security.bruteforce import check_bruteforce, clear_failed_code_try, register_failed_code_try
+from backend.services.security.rate_limit import limit_code_login
 from backend import models
 
 router = APIRouter(tags=["client:auth"])
@@ -76,22 +76,19 @@ def login_by_code_endpoint(
     ip = request.client.host if request.client else None
     ua = request.headers.get("user-agent")
 
-    data = login_with_code(db, code_plain=code, ip=ip, ua=ua)
+    # rate-limit і backoff — лише Redis, до будь-якого запиту в Postgres
+    limit_code_login(ip, code)
+    check_bruteforce(db, ip or "0.0.0.0", scope="code")
+
+    # event_id перевіряється всередині (policy по кешованих метаданих коду) ще до створення сесії
+    try:
+        data = login_with_code(db, code_plain=code, ip=ip, ua=ua, event_id=payload.event_id)
+    except ValueError:
+        register_failed_code_try(db, ip or "0.0.0.0", code, scope="code")
+        raise HTTPException(401, "invalid_code")
+    clear_failed_code_try(db, ip or "0.0.0.0", scope="code")
     access, refresh, sid = data["access"], data["refresh"], data["session_id"]
 
-    # Опційна прив'язка до події з перевіркою прав
-    if payload.event_id is not None:
-        code_obj = db.execute(
-            select(models.AccessCode).where(models.AccessCode.code_plain == code)
-        ).scalar_one_or_none()
-        if not code_obj or not code_allows_event(db, code_obj, int(payload.event_id)):
-            raise HTTPException(403, "event_not_allowed")
-
-        sess = db.get(models.Session, sid)
-        if sess and sess.event_id is None:
-            sess.event_id = int(payload.event_id)
-            db.commit()
-
     _set_session_cookies(response, access, refresh, sid)
     return {"ok": True, "session_id": sid}
 
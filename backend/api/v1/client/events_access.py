@@ -2,13 +2,18 @@
 #v0.5
 #backend\routers\events.py
 from __future__ import annotations
+import secrets
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Request, Response, HTTPException
 from sqlalchemy.orm import Session as DB
 
 from backend.database import get_db
-from backend.models import Session, AccessCode, Event
+from backend.models import Session, AccessCode
 from backend.core.config import settings
 from backend.services.authz.policy import code_allows_event
+from backend.services.event_cache import get_event_meta
+from backend.services.page_shell import viewer_boot
 from backend.services.authn.jwt_event import create_event_token, verify_event_token
 from backend.services.heartbeat.service import handle_event_heartbeat
 
@@ -48,14 +53,52 @@ def event_enter(event_id: int, request: Request, response: Response, db: DB = De
     if not code_allows_event(db, code, event_id):
         raise HTTPException(status_code=403, detail="not_allowed")
 
-    ev = db.get(Event, event_id)
-    if not ev:
+    if get_event_meta(db, event_id) is None:
         raise HTTPException(status_code=404, detail="event_not_found")
 
     eat = create_event_token(session_id=sess.id, code_id=code.id, event_id=event_id, session_jti=sess.token_jti)
     _set_eat_cookie(response, eat, event_id)
     return {"ok": True, "path": f"/api/events/{event_id}/"}
 
+def _authorized_viewer(request: Request, response: Response, db: DB, event_id: int) -> Session:
+    """Глядач з дійсним EAT цього івенту і живою сесією; jti змінився (rotate) — перевипускаємо EAT."""
+    eat = request.cookies.get(EAT_COOKIE)
+    if not eat:
+        raise HTTPException(status_code=401, detail="event_token_missing")
+    data = verify_event_token(eat, event_id=event_id)
+    sess = db.get(Session, str(data.get("sid") or ""))
+    if not sess or not getattr(sess, "active", False):
+        raise HTTPException(status_code=401, detail="session_invalid")
+    if data.get("jti") != getattr(sess, "token_jti", None):
+        new_eat = create_event_token(session_id=sess.id, code_id=sess.code_id, event_id=event_id, session_jti=sess.token_jti)
+        _set_eat_cookie(response, new_eat, event_id)
+    return sess
+
+@router.get("/{event_id}/boot")
+def event_boot(
+    event_id: int,
+    request: Request,
+    response: Response,
+    token: Optional[str] = None,
+    db: DB = Depends(get_db),
+):
+    """
+    Per-viewer частина сторінки (підписаний URL, Mux) — документ-оболонка від неї вільний
+    і кешується CDN. Доступ — EAT (після /enter) або токен прев'ю.
+    """
+    response.headers["Cache-Control"] = "no-store"
+    meta = get_event_meta(db, event_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="event_not_found")
+    if token is not None:
+        if not meta.preview_token or not secrets.compare_digest(token, meta.preview_token):
+            raise HTTPException(status_code=403, detail="invalid_preview_token")
+        return viewer_boot(meta)
+    if not meta.is_published:
+        raise HTTPException(status_code=404, detail="event_not_published")
+    sess = _authorized_viewer(request, response, db, event_id)
+    return viewer_boot(meta, viewer_id=str(sess.code_id))
+
 @router.post("/{event_id}/heartbeat")
 def event_heartbeat(event_id: int, request: Request, response: Response, db: DB = Depends(get_db)):
     eat = request.cookies.get(EAT_COOKIE)
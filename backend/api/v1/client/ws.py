@@ -6,12 +6,25 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from starlette.websockets import WebSocketState
 import asyncio
 
-from backend.services.ws_service import register_client, unregister_client, broadcast
+import anyio
+
+from backend import models
+from backend.database import SessionLocal
+from backend.services.ws_service import (
+    TERMINATE_BATCH_CH_PREFIX, TERMINATE_CH_PREFIX, TERMINATED_BATCH_KEY_PREFIX,
+    register_client, unregister_client, broadcast,
+)
 from backend.services.session.online import mark_offline
 from backend.core.redis import get_redis_async
 
 router = APIRouter(tags=["client:ws"])
 
+def _session_batch(sid: str) -> int | None:
+    with SessionLocal() as db:
+        return db.query(models.AccessCode.batch_id)\
+                 .join(models.Session, models.Session.code_id == models.AccessCode.id)\
+                 .filter(models.Session.id == sid).scalar()
+
 @router.websocket("/ws/client")  # фінальний шлях буде /api/ws/client (через префікс у main.py)
 async def client_ws(ws: WebSocket, session_id: str | None = Query(None)):
     await ws.accept()
@@ -29,8 +42,16 @@ async def client_ws(ws: WebSocket, session_id: str | None = Query(None)):
     # Redis pubsub для terminate-сигналів між воркерами
     r = get_redis_async()
     psub = r.pubsub()
-    channel = f"session:terminate:{sid}"
-    await psub.subscribe(channel)
+    channel = f"{TERMINATE_CH_PREFIX}{sid}"
+    channels = [channel]
+    # масові операції над партією шлють один сигнал у канал партії
+    try:
+        batch_id = await anyio.to_thread.run_sync(_session_batch, sid)
+    except Exception:
+        batch_id = None
+    if batch_id:
+        channels.append(f"{TERMINATE_BATCH_CH_PREFIX}{batch_id}")
+    await psub.subscribe(*channels)
 
     try:
         while True:
@@ -40,6 +61,16 @@ async def client_ws(ws: WebSocket, session_id: str | None = Query(None)):
             except Exception:
                 msg = None
 
+            if msg and msg.get("type") == "message" and msg.get("channel") != channel:
+                # сигнал партії: закриваємось, лише якщо sid є в SET погашених. Помилка Redis —
+                # з'єднання лишається: сесію все одно відсіче наступний heartbeat/refresh
+                try:
+                    ended = bool(await r.sismember(f"{TERMINATED_BATCH_KEY_PREFIX}{batch_id}", sid))
+                except Exception:
+                    ended = False
+                if not ended:
+                    msg = None
+
             if msg and msg.get("type") == "message":
                 reason = msg.get("data") or "revoked"
                 try:
@@ -64,7 +95,7 @@ async def client_ws(ws: WebSocket, session_id: str | None = Query(None)):
     finally:
         # коректно закриваємо pubsub, прибираємо клієнта і позначаємо офлайн
         try:
-            await psub.unsubscribe(channel)
+            await psub.unsubscribe(*channels)
             await psub.close()
         except Exception:
             pass
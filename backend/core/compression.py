@@ -0,0 +1,213 @@
+# backend/core/compression.py
+# ASGI-middleware стиснення відповідей (gzip/brotli) з порогом розміру і фільтром content-type.
+# Відповіді з ETag стискаються один раз: стиснуті байти тримаються в LRU за (ETag, кодування).
+from __future__ import annotations
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.core.config import settings
+from backend.services.compression import BR, GZIP, available_encodings, brotli, compress, negotiate
+
+__all__ = ["CompressionMiddleware", "compression_cache_stats"]
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+def _compressible(content_type: str) -> bool:
+    ct = content_type.split(";", 1)[0].strip().lower()
+    return ct.startswith(COMPRESSIBLE_TYPES) or ct.endswith("+json")
+
+# ───────────────────────── кеш стиснутих тіл ─────────────────────────
+# ключ (etag, encoding) → (digest сирого тіла, стиснуте тіло). Digest захищає від тіл,
+# що різняться за того ж ETag (напр. nonce у сторінці івенту): там просто промах, не підміна.
+_lock = threading.Lock()
+_store: "OrderedDict[Tuple[str, str], Tuple[bytes, bytes]]" = OrderedDict()
+_store_bytes = 0
+_stats = {"hits": 0, "misses": 0, "compressed": 0, "skipped": 0}
+
+def _digest(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+def _cache_get(key: Tuple[str, str], digest: bytes) -> Optional[bytes]:
+    with _lock:
+        hit = _store.get(key)
+        if hit is not None and hit[0] == digest:
+            _store.move_to_end(key)
+            _stats["hits"] += 1
+            return hit[1]
+        _stats["misses"] += 1
+        return None
+
+def _cache_put(key: Tuple[str, str], digest: bytes, packed: bytes) -> None:
+    global _store_bytes
+    max_entries = int(getattr(settings, "compression_cache_entries", 256))
+    max_bytes = int(getattr(settings, "compression_cache_max_bytes", 32 * 1024 * 1024))
+    if max_entries <= 0 or len(packed) > max_bytes // 4:
+        return
+    with _lock:
+        old = _store.pop(key, None)
+        if old is not None:
+            _store_bytes -= len(old[1])
+        _store[key] = (digest, packed)
+        _store_bytes += len(packed)
+        while _store and (len(_store) > max_entries or _store_bytes > max_bytes):
+            _, (_, dropped) = _store.popitem(last=False)
+            _store_bytes -= len(dropped)
+
+def compression_cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_store), "bytes": _store_bytes}
+
+# ───────────────────────── стиснення ─────────────────────────
+def _level(encoding: str) -> int:
+    if encoding == BR:
+        return int(getattr(settings, "compression_brotli_quality", 5))
+    return int(getattr(settings, "compression_gzip_level", 6))
+
+class _StreamEncoder:
+    """Потокове стиснення для StreamingResponse (CSV-експорти): кожен chunk флашиться одразу."""
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == BR:
+            self._br = brotli.Compressor(quality=_level(BR))
+        else:
+            self._z = zlib.compressobj(_level(GZIP), zlib.DEFLATED, 31)  # 31 — gzip-контейнер
+
+    def feed(self, data: bytes) -> bytes:
+        if self.encoding == BR:
+            return self._br.process(data) + self._br.flush()
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == BR:
+            return self._br.finish()
+        return self._z.flush(zlib.Z_FINISH)
+
+def _header(headers: list, name: bytes) -> Optional[str]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v.decode("latin-1")
+    return None
+
+def _rewrite_headers(headers: list, encoding: str, length: Optional[int]) -> list:
+    out = []
+    vary = None
+    for k, v in headers:
+        lk = k.lower()
+        if lk == b"content-length":
+            continue
+        if lk == b"vary":
+            vary = v.decode("latin-1")
+            continue
+        if lk == b"etag":
+            # стиснуте представлення ≠ байтам оригіналу — ETag стає слабким (як у nginx gzip)
+            tag = v.decode("latin-1")
+            if not tag.startswith("W/"):
+                v = f"W/{tag}".encode("latin-1")
+        out.append((k, v))
+    out.append((b"content-encoding", encoding.encode("latin-1")))
+    if vary and "accept-encoding" not in vary.lower():
+        vary = f"{vary}, Accept-Encoding"
+    out.append((b"vary", (vary or "Accept-Encoding").encode("latin-1")))
+    if length is not None:
+        out.append((b"content-length", str(length).encode("latin-1")))
+    return out
+
+class CompressionMiddleware:
+    """
+    Pure ASGI (не BaseHTTPMiddleware): не буферизує стріми і не ламає WebSocket.
+    Стискає 200-відповіді стискуваних типів від min_size байт, якщо клієнт приймає gzip/br
+    і відповідь ще не закодована (рантайм віддає власні передстиснуті байти).
+    """
+    def __init__(self, app, min_size: Optional[int] = None):
+        self.app = app
+        self.min_size = int(min_size if min_size is not None else getattr(settings, "compression_min_size", 1024))
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope.get("method") == "HEAD"
+            or not getattr(settings, "compression_enabled", True)
+        ):
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for k, v in scope.get("headers") or ():
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        encoding = negotiate(accept, available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        passthrough = False
+        streamer: Optional[_StreamEncoder] = None
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough, streamer
+            mtype = message["type"]
+            if mtype == "http.response.start":
+                headers = list(message.get("headers") or [])
+                ctype = _header(headers, b"content-type") or ""
+                cache_control = (_header(headers, b"cache-control") or "").lower()
+                if (
+                    message["status"] != 200
+                    or _header(headers, b"content-encoding")
+                    or not _compressible(ctype)
+                    or "no-transform" in cache_control
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message  # відкладаємо заголовки до першого тіла
+                return
+            if mtype != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = list(start.get("headers") or [])
+
+            if streamer is None and not more:
+                # ціле тіло одним повідомленням — звичайна відповідь
+                if len(body) < self.min_size:
+                    _stats["skipped"] += 1
+                    await send(start)
+                    await send(message)
+                    return
+                etag = _header(headers, b"etag")
+                packed = None
+                if etag:
+                    key, digest = (etag.removeprefix("W/"), encoding), _digest(body)
+                    packed = _cache_get(key, digest)
+                if packed is None:
+                    packed = compress(body, encoding, level=_level(encoding))
+                    _stats["compressed"] += 1
+                    if etag:
+                        _cache_put(key, digest, packed)
+                await send({**start, "headers": _rewrite_headers(headers, encoding, len(packed))})
+                await send({"type": "http.response.body", "body": packed})
+                return
+
+            if streamer is None:
+                streamer = _StreamEncoder(encoding)
+                await send({**start, "headers": _rewrite_headers(headers, encoding, None)})
+            chunk = streamer.feed(body) if body else b""
+            if not more:
+                chunk += streamer.finish()
+            if chunk or not more:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, wrapped_send)
@@ -1,11 +1,15 @@
 # backend/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, field_validator
 from pathlib import Path
+import re
 from typing import List
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 
+# "$hs256$" + kid + "$" + 43 символи digest ≤ String(60) → kid не довший за 9; "$" — роздільник
+CODE_HASH_KEY_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,9}")
+
 class Settings(BaseSettings):
     app_env: str = Field("dev", env="APP_ENV")
     debug: bool = Field(True, env="DEBUG")
@@ -26,6 +30,55 @@ class Settings(BaseSettings):
     gc_interval_minutes: int = Field(60, env="GC_INTERVAL_MINUTES")
     gc_batch_size: int = Field(1000, env="GC_BATCH_SIZE")
 
+    # Слоти конкурентних сесій коду в Redis (ZSET + Lua admit-and-evict)
+    session_slots_enabled: bool = Field(True, env="SESSION_SLOTS_ENABLED")
+    session_slots_ttl_seconds: int = Field(86400, env="SESSION_SLOTS_TTL_SECONDS")
+    session_slots_reconcile_seconds: int = Field(60, env="SESSION_SLOTS_RECONCILE_SECONDS")
+
+    # Кеш метаданих access-кодів для логіну (Redis); негативний — для невідомих кодів
+    code_cache_ttl_seconds: int = Field(300, env="CODE_CACHE_TTL_SECONDS")
+    code_cache_negative_ttl_seconds: int = Field(30, env="CODE_CACHE_NEGATIVE_TTL_SECONDS")
+    code_cache_negative_max: int = Field(100_000, env="CODE_CACHE_NEGATIVE_MAX")
+
+    # Кеш метаданих івентів (per-process, інвалідація через Redis pub/sub; TTL — страховка)
+    event_cache_ttl_seconds: int = Field(60, env="EVENT_CACHE_TTL_SECONDS")
+    event_cache_negative_ttl_seconds: int = Field(10, env="EVENT_CACHE_NEGATIVE_TTL_SECONDS")
+
+    # Похвилинний семплер CCU (глобальний + по івентах); лідер обирається на кожну хвилину через Redis
+    ccu_sampler_enabled: bool = Field(True, env="CCU_SAMPLER_ENABLED")
+    # Ретеншн рядів CCU по роздільностях (днів; 0 — безстроково): 1m → 5m → 1h → 1d
+    ccu_retention_1m_days: int = Field(14, env="CCU_RETENTION_1M_DAYS")
+    ccu_retention_5m_days: int = Field(90, env="CCU_RETENTION_5M_DAYS")
+    ccu_retention_1h_days: int = Field(730, env="CCU_RETENTION_1H_DAYS")
+    ccu_retention_1d_days: int = Field(0, env="CCU_RETENTION_1D_DAYS")
+
+    # Фонові задачі адмінки (таблиця jobs); jobs_dir — спільне сховище файлів-результатів
+    jobs_dir: str = Field("var/jobs", env="JOBS_DIR")
+    jobs_workers: int = Field(2, env="JOBS_WORKERS")
+    jobs_stale_seconds: int = Field(120, env="JOBS_STALE_SECONDS")
+    # Колонковий експорт (analytics.export_columnar): рядків на партію / row group
+    analytics_export_batch_rows: int = Field(50_000, env="ANALYTICS_EXPORT_BATCH_ROWS")
+    # analytics.rebuild_usage: кодів (діапазон code_id) на транзакцію
+    usage_rebuild_chunk: int = Field(1000, env="USAGE_REBUILD_CHUNK")
+
+    # Версії PPV-рантайму: ppv-runtime.<version>.js (відносний шлях — від кореня репо)
+    runtime_dir: str = Field("backend/static/runtime", env="RUNTIME_DIR")
+
+    # Сторінка івенту (shell на хеш-CSP): браузерний і CDN TTL; per-viewer дані — з /boot
+    page_shell_max_age_seconds: int = Field(60, env="PAGE_SHELL_MAX_AGE_SECONDS")
+    page_shell_cdn_max_age_seconds: int = Field(86400, env="PAGE_SHELL_CDN_MAX_AGE_SECONDS")
+
+    # Статичний експорт опублікованих сторінок (каталог для nginx/CDN); порожньо — вимкнено
+    static_export_dir: str = Field("", env="STATIC_EXPORT_DIR")
+
+    # Стиснення відповідей у застосунку; кеш стиснутих тіл за ETag — per-process
+    compression_enabled: bool = Field(True, env="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(1024, env="COMPRESSION_MIN_SIZE")
+    compression_gzip_level: int = Field(6, env="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(5, env="COMPRESSION_BROTLI_QUALITY")
+    compression_cache_entries: int = Field(256, env="COMPRESSION_CACHE_ENTRIES")
+    compression_cache_max_bytes: int = Field(32 * 1024 * 1024, env="COMPRESSION_CACHE_MAX_BYTES")
+
     # Security / CORS
     allowed_hosts: str = Field("127.0.0.1,localhost", env="ALLOWED_HOSTS")
     allowed_origins: str = Field("", env="ALLOWED_ORIGINS")
@@ -33,6 +86,12 @@ class Settings(BaseSettings):
     # Code generation
     code_length:  int = Field(10, env="CODE_LENGTH")
     code_alphabet: str = Field("ABCDEFGHJKMNPQRSTUVWXYZ23456789", env="CODE_ALPHABET")
+    # Хеш коду (code_hash): hmac-sha256 (дефолт) | bcrypt; схема пишеться в сам хеш
+    code_hash_scheme: str = Field("hmac-sha256", env="CODE_HASH_SCHEME")
+    code_hash_key: str | None = Field(default=None, env="CODE_HASH_KEY")  # None → похідний від JWT_SECRET
+    code_hash_key_id: str = Field("k1", env="CODE_HASH_KEY_ID")  # ≤ 9 символів [A-Za-z0-9_-], див. валідатор
+    code_hash_bcrypt_rounds: int = Field(12, env="CODE_HASH_BCRYPT_ROUNDS")
+    code_hash_workers: int = Field(0, env="CODE_HASH_WORKERS")  # пул процесів для bcrypt; 0 → cpu_count
 
     # Event Access Token (EAT) TTL (seconds)
     event_token_ttl_seconds: int = Field(600, env="EVENT_TOKEN_TTL_SECONDS")
@@ -46,6 +105,14 @@ class Settings(BaseSettings):
     admin_root_pass:   str | None = Field(default=None, env="ADMIN_ROOT_PASS")
     rate_attempts:     int = Field(5, env="RATE_ATTEMPTS")
     rate_base:         int = Field(1, env="RATE_BASE")
+    bruteforce_ttl_seconds: int = Field(86400, env="BRUTEFORCE_TTL_SECONDS")
+    # Rate-limit логінів (Redis GCRA), формат "кількість/секунди"; порожньо — правило вимкнене
+    rate_limit_enabled:      bool = Field(True, env="RATE_LIMIT_ENABLED")
+    login_rate_ip:           str = Field("20/60", env="LOGIN_RATE_IP")
+    login_rate_ip_prefix:    str = Field("5/60", env="LOGIN_RATE_IP_PREFIX")
+    login_rate_global:       str = Field("2000/1", env="LOGIN_RATE_GLOBAL")
+    admin_login_rate_ip:     str = Field("10/60", env="ADMIN_LOGIN_RATE_IP")
+    admin_login_rate_global: str = Field("50/1", env="ADMIN_LOGIN_RATE_GLOBAL")
     admin_refresh_ttl_days: int = Field(7, env="ADMIN_REFRESH_TTL_DAYS")
 
     # Custom HTML rendering policy
@@ -57,6 +124,11 @@ class Settings(BaseSettings):
     # --- NEW: Streaming & Analytics ---
     bunny_security_key: str = Field("", env="BUNNY_SECURITY_KEY")
     bunny_pull_zone_host: str = Field("", env="BUNNY_PULL_ZONE_HOST")
+    bunny_token_ttl_seconds: int = Field(10800, env="BUNNY_TOKEN_TTL_SECONDS")
+    # expires округлюється вгору до межі відра — усі глядачі у вікні ділять один токен/URL
+    bunny_token_bucket_seconds: int = Field(600, env="BUNNY_TOKEN_BUCKET_SECONDS")
+    # токен на каталог (token_path): один підпис покриває плейлист і всі HLS-сегменти
+    bunny_token_directory: bool = Field(False, env="BUNNY_TOKEN_DIRECTORY")
     mux_env_key: str = Field("", env="MUX_ENV_KEY")
     # ----------------------------------
 
@@ -66,6 +138,14 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
+    @field_validator("code_hash_key_id")
+    @classmethod
+    def _check_code_hash_key_id(cls, v: str) -> str:
+        # помилка на старті, а не обрізаний/нерозбірний code_hash при першому створенні коду
+        if not CODE_HASH_KEY_ID_RE.fullmatch(v):
+            raise ValueError("CODE_HASH_KEY_ID: 1–9 символів [A-Za-z0-9_-] (хеш має влазити в String(60))")
+        return v
+
     @property
     def allowed_hosts_list(self) -> List[str]:
         return [h.strip() for h in self.allowed_hosts.split(",") if h.strip()]
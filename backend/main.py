@@ -7,6 +7,7 @@ from fastapi.responses import ORJSONResponse
 
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
+from backend.core.compression import CompressionMiddleware
 from sqlalchemy.orm import Session
 
 
@@ -25,6 +26,8 @@ from backend.api.v1.admin.events import router as admin_events_router
 from backend.api.v1.admin.sessions import router as admin_sessions_router
 from backend.api.v1.admin.ws import router as admin_ws_router
 from backend.api.v1.admin.event_page_admin import router as admin_event_page_router
+from backend.api.v1.admin.jobs import router as admin_jobs_router
+from backend.api.v1.admin.batches import router as admin_batches_router
 from backend.api.v1.admin import admin_users
 
 
@@ -41,11 +44,23 @@ from backend.api.v1.assets.runtime_and_user_js import router as assets_router
 from backend.models import AdminUser
 from backend.workers.idle_reaper import run_idle_reaper
 from backend.workers.session_gc import run_session_gc
+from backend.workers.slots_reconciler import run_slots_reconciler
+from backend.workers.jobs_runner import run_job_workers
+from backend.workers.ccu_sampler import run_ccu_sampler
+from backend.services.ws_service import run_admin_event_relay
+from backend.services.runtime_registry import load_runtimes
+from backend.services.static_export import export_runtimes
+from backend.services.event_cache import run_event_cache_invalidator
 
 from backend.services.authn.bootstrap import ensure_root_user
 
 _idle_task = None
 _gc_task = None
+_slots_task = None
+_jobs_task = None
+_relay_task = None
+_evcache_task = None
+_ccu_task = None
 
 # опціонально: якщо цей модуль у тебе є і ти ним користуєшся
 try:
@@ -129,6 +144,9 @@ app.add_middleware(
     allow_headers=["*"],           # або перелічити потрібні
 )
 
+# gzip/brotli для JSON/HTML/CSV; гарячі тіла з ETag стискаються один раз
+app.add_middleware(CompressionMiddleware)
+
 
 # --- startup/shutdown ---
 @app.on_event("startup")
@@ -136,6 +154,10 @@ async def on_startup() -> None:
     # один централізований бутстрап адміна/користувача
     ensure_root_user()
     seed_policy_defaults()
+    # рантайм мініфікується і стискається один раз тут, а не на запит
+    load_runtimes()
+    # статичний експорт: нові версії рантайму з деплою одразу лягають у каталог nginx/CDN
+    export_runtimes()
 
     try:
         if settings.db_url.startswith("sqlite"):
@@ -143,23 +165,33 @@ async def on_startup() -> None:
     except Exception:
         pass
 
-    global _idle_task, _gc_task
+    global _idle_task, _gc_task, _slots_task, _jobs_task, _relay_task, _evcache_task, _ccu_task
     if _idle_task is None:
         _idle_task = asyncio.create_task(run_idle_reaper(poll_seconds=30))
     if _gc_task is None:
         _gc_task = asyncio.create_task(run_session_gc())
+    if _slots_task is None:
+        _slots_task = asyncio.create_task(run_slots_reconciler())
+    if _jobs_task is None:
+        _jobs_task = asyncio.create_task(run_job_workers())
+    if _relay_task is None:
+        _relay_task = asyncio.create_task(run_admin_event_relay())
+    if _evcache_task is None:
+        _evcache_task = asyncio.create_task(run_event_cache_invalidator())
+    if _ccu_task is None:
+        _ccu_task = asyncio.create_task(run_ccu_sampler())
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    global _idle_task, _gc_task
-    for t in (_idle_task, _gc_task):
+    global _idle_task, _gc_task, _slots_task, _jobs_task, _relay_task, _evcache_task, _ccu_task
+    for t in (_idle_task, _gc_task, _slots_task, _jobs_task, _relay_task, _evcache_task, _ccu_task):
         if t:
             t.cancel()
             try:
                 await t
             except Exception:
                 pass
-    _idle_task = _gc_task = None
+    _idle_task = _gc_task = _slots_task = _jobs_task = _relay_task = _evcache_task = _ccu_task = None
     close_redis()
     await close_redis_async()
 
@@ -182,6 +214,8 @@ app.include_router(admin_ws_router, prefix="/api/ws", tags=["admin:ws"])
 app.include_router(admin_events_router, prefix="/api/admin/events", tags=["admin:events"])
 app.include_router(admin_event_page_router,  prefix="/api/admin/events",   tags=["admin:pages"])
 app.include_router(admin_allow_events_router, prefix="/api/admin/codes", tags=["admin:codes-events"])
+app.include_router(admin_jobs_router, prefix="/api/admin", tags=["admin:jobs"])
+app.include_router(admin_batches_router, prefix="/api/admin/batches", tags=["admin:batches"])
 app.include_router(admin_users.router, prefix="/api/v1/admin")
 
 
@@ -2,7 +2,7 @@
 # ============================================================================
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint,
+    BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint,
     Index, Text, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -67,6 +67,15 @@ class Event(Base):
     etag = Column(String(64), nullable=True, index=True)
     # Токен безпечного превʼю неопублікованої сторінки
     preview_token = Column(String(64), nullable=True, index=True)
+    # Скомпільовані при збереженні/публікації артефакти (санітизований HTML, мініфіковані CSS/JS)
+    compiled_html = Column(Text, nullable=True)
+    compiled_css  = Column(Text, nullable=True)
+    compiled_js   = Column(Text, nullable=True)
+    # sha256-префікс compiled_js → immutable /event-assets/{id}/user.{hash}.js
+    compiled_js_hash = Column(String(32), nullable=True)
+    # хеш усіх артефактів — версія скомпільованої сторінки
+    compiled_hash = Column(String(32), nullable=True)
+    compiled_at   = Column(DateTime(timezone=True), nullable=True)
     # Службове оновлення (для ETag/If-None-Match); якщо вже є в моделі — можна не дублювати
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -79,6 +88,26 @@ class Event(Base):
     codes: Mapped[list["AccessCode"]] = relationship(back_populates="event")
     code_batches:  Mapped[list["CodeBatch"]]  = relationship(back_populates="event")
 
+    __table_args__ = (
+        # pg_trgm GIN — підрядковий пошук у каталозі/адмінці
+        Index("ix_events_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_events_slug_trgm", "slug", postgresql_using="gin", postgresql_ops={"slug": "gin_trgm_ops"}),
+    )
+
+
+class EventUserJs(Base):
+    """Попередні версії compiled_js: закешовані на CDN оболонки ще пінять їх SRI-хешем."""
+    __tablename__ = "event_user_js"
+    event_id:   Mapped[int]      = mapped_column(ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    js_hash:    Mapped[str]      = mapped_column(String(32), primary_key=True)
+    js:         Mapped[str]      = mapped_column(Text, nullable=False, default="")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        default=lambda: datetime.now(timezone.utc),
+    )
+
 
 class CodeBatch(Base):
     """Пакет кодів, згенерований разом (для аналітики/доходу)."""
@@ -99,6 +128,10 @@ class CodeBatch(Base):
     event: Mapped["Event"] = relationship(back_populates="code_batches")
     codes: Mapped[list["AccessCode"]] = relationship(back_populates="batch")
 
+    __table_args__ = (
+        Index("ix_code_batches_label_trgm", "label", postgresql_using="gin", postgresql_ops={"label": "gin_trgm_ops"}),
+    )
+
 
 class AccessCode(Base):
     __tablename__ = "access_codes"
@@ -121,6 +154,8 @@ class AccessCode(Base):
 
     __table_args__ = (
         Index("ix_access_codes_event_active", "event_id", "revoked"),
+        Index("ix_access_codes_batch_id", "batch_id"),
+        Index("ix_access_codes_code_plain_trgm", "code_plain", postgresql_using="gin", postgresql_ops={"code_plain": "gin_trgm_ops"}),
     )
 
     @hybrid_property
@@ -157,6 +192,9 @@ class Session(Base):
         Index("ix_sessions_active_last_seen", "active", "last_seen"),
         Index("ix_sessions_created_at", "created_at"),
         Index("ix_sessions_code_active", "code_id", "active"),
+        Index("ix_sessions_id_trgm", "id", postgresql_using="gin", postgresql_ops={"id": "gin_trgm_ops"}),
+        Index("ix_sessions_ip_trgm", "ip", postgresql_using="gin", postgresql_ops={"ip": "gin_trgm_ops"}),
+        Index("ix_sessions_user_agent_trgm", "user_agent", postgresql_using="gin", postgresql_ops={"user_agent": "gin_trgm_ops"}),
     )
 
 
@@ -166,6 +204,71 @@ class CCUMinutely(Base):
     ccu:  Mapped[int]      = mapped_column(Integer)
 
 
+class EventCCUMinutely(Base):
+    """Похвилинний CCU по івенту (презенс-ZSET online:z:event:{id}); PK — ключ ряду і діапазонних вибірок."""
+    __tablename__ = "event_ccu_minutely"
+    event_id: Mapped[int]      = mapped_column(ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    ts:       Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    ccu:      Mapped[int]      = mapped_column(Integer)
+
+    __table_args__ = (
+        Index("ix_event_ccu_minutely_ts", "ts"),
+    )
+
+
+class CCURollup(Base):
+    """
+    Агрегати CCU за відро resolution секунд (300 / 3600 / 86400), що починається з ts.
+    event_id=0 — глобальний ряд (ccu_minutely); без FK, рядки видалених івентів прибирає ретеншн.
+    avg = ccu_sum / samples (samples — кількість хвилинних точок у відрі).
+    """
+    __tablename__ = "ccu_rollups"
+    event_id:   Mapped[int]      = mapped_column(Integer, primary_key=True)
+    resolution: Mapped[int]      = mapped_column(Integer, primary_key=True)
+    ts:         Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    ccu_min:    Mapped[int]      = mapped_column(Integer)
+    ccu_max:    Mapped[int]      = mapped_column(Integer)
+    ccu_sum:    Mapped[int]      = mapped_column(BigInteger)
+    samples:    Mapped[int]      = mapped_column(Integer)
+
+    __table_args__ = (
+        Index("ix_ccu_rollups_resolution_ts", "resolution", "ts"),
+    )
+
+
+# ───── інкрементальні ролапи використання кодів (пишуть логін, heartbeat, логаут) ─────
+# Підсумки пакета/івенту — сума цих рядків при читанні: спільний рядок на пакет/івент
+# був би одним row lock-ом на всі heartbeat-и великого івенту.
+class CodeUsage(Base):
+    """Підсумки по коду; batch_id — денормалізовано з AccessCode на момент першого логіну."""
+    __tablename__ = "code_usage"
+    code_id:        Mapped[int]             = mapped_column(ForeignKey("access_codes.id", ondelete="CASCADE"), primary_key=True)
+    batch_id:       Mapped[int | None]      = mapped_column(Integer, nullable=True)
+    sessions:       Mapped[int]             = mapped_column(Integer, default=0, server_default=text("0"))
+    watch_seconds:  Mapped[int]             = mapped_column(BigInteger, default=0, server_default=text("0"))
+    bytes_out:      Mapped[int]             = mapped_column(BigInteger, default=0, server_default=text("0"))
+    first_login_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_login_at:  Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_code_usage_batch_id", "batch_id"),
+    )
+
+
+class EventCodeUsage(Base):
+    """Код × івент: підсумки івенту (сума по event_id) і «які коди дивились івент»."""
+    __tablename__ = "event_code_usage"
+    event_id:      Mapped[int] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    code_id:       Mapped[int] = mapped_column(ForeignKey("access_codes.id", ondelete="CASCADE"), primary_key=True)
+    sessions:      Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    watch_seconds: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text("0"))
+    bytes_out:     Mapped[int] = mapped_column(BigInteger, default=0, server_default=text("0"))
+
+    __table_args__ = (
+        Index("ix_event_code_usage_code_id", "code_id"),
+    )
+
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -180,6 +283,33 @@ class Order(Base):
     code: Mapped["AccessCode"] = relationship()
 
 
+class Job(Base):
+    """Фонова адмінська задача (bulk create, CSV import/export, force-logout, GC)."""
+    __tablename__ = "jobs"
+
+    id:       Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    kind:     Mapped[str] = mapped_column(String(48))
+    status:   Mapped[str] = mapped_column(String(16), default="queued", server_default="queued")
+    params:   Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    result:   Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    result_file: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    error:    Mapped[str | None] = mapped_column(Text, nullable=True)
+    progress: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total:    Mapped[int | None] = mapped_column(Integer, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("false"))
+    worker:   Mapped[str | None] = mapped_column(String(64), nullable=True)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("admin_users.id", ondelete="SET NULL"), nullable=True)
+    created_at:   Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    started_at:   Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at:  Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
+
+
 class FailedLogin(Base):
     __tablename__ = "failed_logins"
     ip:        Mapped[str]      = mapped_column(String, primary_key=True)
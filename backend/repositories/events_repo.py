@@ -6,6 +6,30 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session as DB
 
 from backend import models
+from backend.services.etag import calc_event_etag
+from backend.services.page_compiler import compile_event
+from backend.services.search import text_search
+
+# зміна будь-якого з цих полів → перекомпіляція асетів сторінки
+PAGE_FIELDS = frozenset({"page_html", "page_css", "page_js"})
+
+# поля поза page_*, що потрапляють у документ сторінки — їх правка теж змінює etag
+DOCUMENT_FIELDS = (
+    "title", "slug", "short_description", "bunny_video_path", "player_manifest_url",
+    "mux_env_key", "assets_base_url", "runtime_js_version",
+)
+
+def compute_event_etag(e: models.Event) -> str:
+    return calc_event_etag(
+        e.id, e.updated_at, e.status or "", e.page_html, e.page_css, e.page_js,
+        *(getattr(e, f, None) or "" for f in DOCUMENT_FIELDS),
+    )
+
+def _refresh_etag(db: DB, e: models.Event) -> None:
+    """Після коміту (updated_at уже від БД) — перерахувати й зберегти etag сторінки."""
+    e.etag = compute_event_etag(e)
+    db.commit()
+    db.refresh(e)
 
 def is_slug_taken(db: DB, slug: str, exclude_id: Optional[int] = None) -> bool:
     q = select(models.Event.id).where(func.lower(models.Event.slug) == func.lower(slug))
@@ -15,6 +39,7 @@ def is_slug_taken(db: DB, slug: str, exclude_id: Optional[int] = None) -> bool:
 
 def create_event(db: DB, **fields) -> models.Event:
     e = models.Event(**fields)
+    compile_event(e)
     db.add(e)
     try:
         db.commit()
@@ -22,6 +47,7 @@ def create_event(db: DB, **fields) -> models.Event:
         db.rollback()
         raise
     db.refresh(e)
+    _refresh_etag(db, e)
     return e
 
 def get_event(db: DB, event_id: int) -> Optional[models.Event]:
@@ -38,12 +64,16 @@ def delete_event(db: DB, event_id: int) -> bool:
 def update_event(db: DB, e: models.Event, **fields) -> models.Event:
     for k, v in fields.items():
         setattr(e, k, v)
+    if PAGE_FIELDS & fields.keys():
+        compile_event(e)
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
     db.refresh(e)
+    # будь-яка правка (назва, відео, статус) змінює документ — клієнт не має отримати 304 на старий
+    _refresh_etag(db, e)
     return e
 
 def list_events(
@@ -53,11 +83,9 @@ def list_events(
     page_size: int,
 ) -> Tuple[int, Iterable[models.Event]]:
     stmt = select(models.Event)
-    if q:
-        like = f"%{q.strip()}%"
-        stmt = stmt.where(
-            (models.Event.title.ilike(like)) | (models.Event.slug.ilike(like))
-        )
+    cond = text_search(db, q, [models.Event.title, models.Event.slug])
+    if cond is not None:
+        stmt = stmt.where(cond)
     total = db.execute(
         select(func.count()).select_from(stmt.subquery())
     ).scalar_one()
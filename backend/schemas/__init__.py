@@ -16,6 +16,7 @@ from .auth import (
 from .access_codes import (
     AccessCodeOut,
     AccessCodeCreate,
+    AccessCodeBulkJob,
     AccessCodePatch,
     BulkDeleteCodes,
 )
@@ -51,6 +52,12 @@ from .admin_users import (
 
 # 8. Analytics
 from .analytics import (
+    BatchRevenue,
+    CcuBucket,
     CcuPoint,
+    CcuSeries,
     CodeStats,
+    EventCcuPeak,
+    EventCodeStats,
+    EventUsageStats,
 )
\ No newline at end of file
@@ -25,6 +25,10 @@ class AccessCodeCreate(BaseModel):
     allow_all: Optional[bool] = None
     event_ids: Optional[List[int]] = None
 
+class AccessCodeBulkJob(AccessCodeCreate):
+    # фонова генерація (POST /api/admin/jobs, kind=codes.bulk_create) — без ліміту запиту
+    amount: conint(ge=1, le=1_000_000)
+
 class AccessCodePatch(BaseModel):
     allowed_sessions: int | None = None
     revoked: bool | None = None
@@ -1,14 +1,63 @@
 # backend/schemas/analytics.py
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Optional
 
 class CcuPoint(BaseModel):
     ts: datetime
     ccu: int
     model_config = ConfigDict(from_attributes=True)
 
+class CcuBucket(BaseModel):
+    ts: datetime
+    min: int
+    avg: float
+    max: int
+
+class CcuSeries(BaseModel):
+    event_id: int
+    resolution: int  # секунди відра: 60 / 300 / 3600 / 86400
+    since: datetime
+    until: datetime
+    points: list[CcuBucket]
+
+class EventCcuPeak(BaseModel):
+    event_id: int
+    peak: int
+    avg: float
+    minutes: int
+
 class CodeStats(BaseModel):
     code_id: int
     sessions: int
     watch_seconds: int
-    bytes_out: int
\ No newline at end of file
+    bytes_out: int
+
+class BatchRevenue(BaseModel):
+    batch_id: int
+    label: str
+    event_id: Optional[int] = None
+    price_uah: Optional[int] = None
+    sessions: int
+    codes_used: int
+    revenue_uah: int
+    watch_seconds: int
+    bytes_out: int
+    last_login_at: Optional[datetime] = None
+
+class EventUsageStats(BaseModel):
+    event_id: int
+    sessions: int
+    codes_used: int
+    watch_seconds: int
+    bytes_out: int
+    revenue_uah: int
+    batches: int
+
+class EventCodeStats(BaseModel):
+    code_id: int
+    code_plain: str
+    batch_id: Optional[int] = None
+    sessions: int
+    watch_seconds: int
+    bytes_out: int
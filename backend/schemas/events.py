@@ -1,5 +1,6 @@
 # backend/schemas/events.py
 from __future__ import annotations
+import re
 from datetime import datetime
 from enum import Enum
 from typing import Optional
@@ -8,6 +9,16 @@ from pydantic import BaseModel, ConfigDict, Field, HttpUrl, field_validator
 
 ALLOWED = {"none", "html", "sandbox", "safe", "iframe"}
 ALIASES = {"safe": "sandbox", "iframe": "html"}
+# slug — частина URL і шляхів статичного експорту (p/{slug}/index.html): без '/', '.', пробілів
+SLUG_RE = re.compile(r"[a-z0-9][a-z0-9-]*")
+
+def check_slug(v: str) -> str:
+    s = v.strip()
+    if not s:
+        raise ValueError("slug required")
+    if not SLUG_RE.fullmatch(s):
+        raise ValueError("slug may contain only a-z, 0-9 and '-' and must not start with '-'")
+    return s
 
 class EventStatus(str, Enum):
     draft = "draft"
@@ -63,10 +74,7 @@ class EventBase(BaseModel):
     @field_validator("slug")
     @classmethod
     def normalize_slug(cls, v: str) -> str:
-        s = v.strip()
-        if not s:
-            raise ValueError("slug required")
-        return s
+        return check_slug(v)
 
     @field_validator("title")
     @classmethod
@@ -130,7 +138,7 @@ class EventUpdate(BaseModel):
     @field_validator("slug")
     @classmethod
     def normalize_slug(cls, v: str | None) -> str | None:
-        return v.strip() if isinstance(v, str) else v
+        return check_slug(v) if isinstance(v, str) else v
 
     @field_validator("title")
     @classmethod
@@ -0,0 +1,266 @@
+# backend/services/authn/code_cache.py
+# Кеш метаданих access-коду для логіну (Redis, спільний для всіх воркерів).
+from __future__ import annotations
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from time import monotonic, sleep
+from typing import Dict, FrozenSet, Iterable, Optional
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import settings
+from backend.core.redis import get_redis
+from backend.utils.dt import now_utc, utc_ts
+
+log = logging.getLogger(__name__)
+
+META_PREFIX = "code:meta:v2:"      # v2 — з batch_id
+NEG_ZSET = "code:meta:neg"        # member=code_plain, score=expire ts; розмір обмежений
+STATS_HASH = "code:meta:stats"
+GEN_PREFIX = "code:meta:gen:"     # покоління коду: INCR при інвалідації
+GEN_TTL_SEC = 3600                # з запасом довше за будь-яке читання з БД між GET gen і записом
+
+INVALIDATE_ATTEMPTS = 3
+
+STATS_FLUSH_SEC = 10.0
+
+@dataclass(frozen=True, slots=True)
+class CodeMeta:
+    """Компактний знімок AccessCode — усе, що потрібно логіну та code_allows_event."""
+    id: int
+    code_plain: str
+    revoked: bool
+    expires_at: Optional[datetime]
+    allowed_sessions: int
+    allow_all_events: bool
+    event_id: Optional[int]
+    batch_id: Optional[int] = None
+    allowed_event_ids: FrozenSet[int] = field(default_factory=frozenset)
+
+    def is_expired_or_revoked(self) -> bool:
+        return self.revoked or (self.expires_at is not None and self.expires_at <= now_utc())
+
+    def to_json(self) -> bytes:
+        return orjson.dumps({
+            "id": self.id,
+            "code_plain": self.code_plain,
+            "revoked": self.revoked,
+            "expires_at": self.expires_at.timestamp() if self.expires_at else None,
+            "allowed_sessions": self.allowed_sessions,
+            "allow_all_events": self.allow_all_events,
+            "event_id": self.event_id,
+            "batch_id": self.batch_id,
+            "allowed_event_ids": sorted(self.allowed_event_ids),
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "CodeMeta":
+        d = orjson.loads(raw)
+        exp = d.get("expires_at")
+        return cls(
+            id=int(d["id"]),
+            code_plain=d["code_plain"],
+            revoked=bool(d["revoked"]),
+            expires_at=datetime.fromtimestamp(exp, tz=timezone.utc) if exp is not None else None,
+            allowed_sessions=int(d["allowed_sessions"] or 1),
+            allow_all_events=bool(d["allow_all_events"]),
+            event_id=d.get("event_id"),
+            batch_id=d.get("batch_id"),
+            allowed_event_ids=frozenset(int(x) for x in d.get("allowed_event_ids") or ()),
+        )
+
+# ───────────────────────── метрики ─────────────────────────
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "neg_hits": 0, "neg_stores": 0, "errors": 0}
+_stats_flushed_at = monotonic()
+
+def _bump(name: str) -> None:
+    global _stats_flushed_at
+    with _stats_lock:
+        _stats[name] += 1
+        if monotonic() - _stats_flushed_at < STATS_FLUSH_SEC:
+            return
+        delta = {k: v for k, v in _stats.items() if v}
+        for k in _stats:
+            _stats[k] = 0
+        _stats_flushed_at = monotonic()
+    # лічильники процесу зливаємо в спільний hash, щоб бачити hit-rate по всіх воркерах
+    try:
+        p = get_redis().pipeline(transaction=False)
+        for k, v in delta.items():
+            p.hincrby(STATS_HASH, k, v)
+        p.execute()
+    except Exception:
+        log.debug("code_cache_stats_flush_failed", exc_info=True)
+
+def cache_stats() -> dict:
+    """Агреговані лічильники (Redis) + ще не злиті лічильники поточного процесу."""
+    try:
+        raw = get_redis().hgetall(STATS_HASH) or {}
+    except Exception:
+        raw = {}
+    out = {k: int(raw.get(k, 0) or 0) for k in _stats}
+    with _stats_lock:
+        for k, v in _stats.items():
+            out[k] += v
+    lookups = out["hits"] + out["misses"] + out["neg_hits"]
+    out["hit_rate"] = round((out["hits"] + out["neg_hits"]) / lookups, 4) if lookups else None
+    try:
+        out["negative_entries"] = int(get_redis().zcard(NEG_ZSET))
+    except Exception:
+        out["negative_entries"] = None
+    return out
+
+# ───────────────────────── load ─────────────────────────
+def _ttl() -> int:
+    return int(getattr(settings, "code_cache_ttl_seconds", 300))
+
+def _neg_ttl() -> int:
+    return int(getattr(settings, "code_cache_negative_ttl_seconds", 30))
+
+def _neg_max() -> int:
+    return int(getattr(settings, "code_cache_negative_max", 100_000))
+
+def _load_from_db(db: DB, code_plain: str) -> Optional[CodeMeta]:
+    c = models.AccessCode
+    row = db.execute(
+        select(c.id, c.revoked, c.expires_at, c.allowed_sessions, c.allow_all_events, c.event_id, c.batch_id)
+        .where(c.code_plain == code_plain)
+    ).first()
+    if not row:
+        return None
+    cid, revoked, exp, allowed, allow_all, event_id, batch_id = row
+    if exp is not None and exp.tzinfo is None:
+        exp = exp.replace(tzinfo=timezone.utc)
+    allowed_ids: FrozenSet[int] = frozenset()
+    if not allow_all and event_id is None:
+        allowed_ids = frozenset(db.execute(
+            select(models.CodeAllowedEvent.event_id).where(models.CodeAllowedEvent.code_id == cid)
+        ).scalars().all())
+    return CodeMeta(
+        id=int(cid),
+        code_plain=code_plain,
+        revoked=bool(revoked),
+        expires_at=exp,
+        allowed_sessions=int(allowed or 1),
+        allow_all_events=bool(allow_all),
+        event_id=event_id,
+        batch_id=batch_id,
+        allowed_event_ids=allowed_ids,
+    )
+
+# Запис після промаху — лише якщо покоління коду не змінилось від читання до запису:
+# інакше invalidate_codes встиг пройти між SELECT і SET, і знімок із БД уже застарів.
+# KEYS: gen, meta, neg zset | ARGV: gen при читанні ('' — немає), payload ('' — негатив),
+#   ttl, code_plain, neg expire ts, now ts, neg max → 1 — записано, 0 — пропущено
+_STORE_LUA = """
+local gen = redis.call('GET', KEYS[1]) or ''
+if gen ~= ARGV[1] then
+  return 0
+end
+if ARGV[2] ~= '' then
+  redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[6])
+redis.call('ZREMRANGEBYRANK', KEYS[3], 0, -(tonumber(ARGV[7]) + 1))
+return 1
+"""
+
+@lru_cache(maxsize=1)
+def _store_script():
+    return get_redis().register_script(_STORE_LUA)
+
+def _gen_str(raw) -> str:
+    if raw is None:
+        return ""
+    return raw.decode() if isinstance(raw, bytes) else str(raw)
+
+def get_code_meta(db: DB, code_plain: str) -> Optional[CodeMeta]:
+    """
+    Redis → Postgres. Невідомі коди кешуються негативно (короткий TTL,
+    обмежений ZSET — перебір кодів не роздуває памʼять Redis).
+    """
+    key = META_PREFIX + code_plain
+    gen_key = GEN_PREFIX + code_plain
+    try:
+        r = get_redis()
+        p = r.pipeline(transaction=False)
+        p.get(key)
+        p.zscore(NEG_ZSET, code_plain)
+        p.get(gen_key)
+        raw, neg, gen = p.execute()
+    except Exception:
+        _bump("errors")
+        return _load_from_db(db, code_plain)
+
+    if raw:
+        try:
+            meta = CodeMeta.from_json(raw)
+            _bump("hits")
+            return meta
+        except Exception:
+            pass
+    if neg is not None and float(neg) > utc_ts():
+        _bump("neg_hits")
+        return None
+
+    _bump("misses")
+    meta = _load_from_db(db, code_plain)
+    try:
+        now = utc_ts()
+        # негатив тримаємо не більше N найсвіжіших
+        stored = _store_script()(
+            keys=[gen_key, key, NEG_ZSET],
+            args=[
+                _gen_str(gen), meta.to_json() if meta is not None else b"", _ttl(),
+                code_plain, now + _neg_ttl(), now, _neg_max(),
+            ],
+        )
+        if meta is None and stored:
+            _bump("neg_stores")
+    except Exception:
+        _bump("errors")
+    return meta
+
+# ───────────────────────── invalidation ─────────────────────────
+def invalidate_codes(code_plains: Iterable[Optional[str]], *, strict: bool = False) -> None:
+    """
+    Скидає позитивні й негативні записи для кодів (після змін у адмінці,
+    створення, імпорту) і піднімає їх покоління, щоб паралельний промах
+    не записав назад знімок, прочитаний до коміту. Великі набори — чанками.
+
+    strict=True — для змін, що звужують доступ (revoke, видалення, reissue,
+    обмеження подій): якщо Redis так і не відповів, 503, а не лише лог —
+    інакше старий дозвіл жив би в кеші до code_cache_ttl_seconds.
+    """
+    plains = [p for p in code_plains if p]
+    if not plains:
+        return
+    for attempt in range(INVALIDATE_ATTEMPTS):
+        try:
+            r = get_redis()
+            for i in range(0, len(plains), 1000):
+                chunk = plains[i:i + 1000]
+                p = r.pipeline(transaction=False)
+                for c in chunk:
+                    p.incr(GEN_PREFIX + c)
+                    p.expire(GEN_PREFIX + c, GEN_TTL_SEC)
+                p.delete(*[META_PREFIX + c for c in chunk])
+                p.zrem(NEG_ZSET, *chunk)
+                p.execute()
+            return
+        except Exception:
+            log.warning("code_cache_invalidate_failed", extra={"attempt": attempt + 1}, exc_info=True)
+            if attempt + 1 < INVALIDATE_ATTEMPTS:
+                sleep(0.05 * 2 ** attempt)
+    if strict:
+        raise HTTPException(503, detail="code_cache_invalidate_failed")
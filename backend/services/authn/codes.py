@@ -1,43 +1,182 @@
 # backend/services/authn/codes.py
-#v1.0 - Direct bcrypt implementation for access codes
+#v1.1 - Pluggable code-hash schemes (HMAC-SHA256 default, bcrypt legacy)
 from __future__ import annotations
-import bcrypt
+import base64
+import hashlib
+import hmac
 import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+import bcrypt
+
+log = logging.getLogger(__name__)
+
+# code_hash ніде не використовується для логіну (матчимо code_plain), тому bcrypt
+# з дефолтною вартістю тут — лише CPU на генерацію. Схема записується в сам рядок
+# хешу (modular crypt format), тож старі bcrypt-хеші ("$2b$...") лишаються валідними:
+#   $hs256$<key_id>$<base64url(HMAC-SHA256(key, code))>   ← 7+kid+43 символів, влазить у String(60)
+#   $2b$12$...                                             ← bcrypt
+
+SCHEME_HMAC = "hmac-sha256"
+SCHEME_BCRYPT = "bcrypt"
+
+_HMAC_PREFIX = "$hs256$"
+
+# bcrypt має ліміт 72 байти. Обрізаємо для безпеки (хоча коди зазвичай короткі)
+def _bcrypt_input(code: str) -> bytes:
+    return code.encode("utf-8")[:72]
+
+# ───────────────────────── HMAC-SHA256 ─────────────────────────
+@lru_cache(maxsize=1)
+def _hmac_key() -> tuple[str, bytes]:
+    from backend.core.config import settings
+    kid = str(getattr(settings, "code_hash_key_id", None) or "k1")
+    raw = getattr(settings, "code_hash_key", None)
+    if raw:
+        key = raw.encode("utf-8")
+    else:
+        # без окремого ключа — похідний від JWT_SECRET (стабільний між рестартами)
+        key = hmac.new(settings.jwt_secret.encode("utf-8"), b"access-code-hash", hashlib.sha256).digest()
+    return kid, key
+
+def _hmac_digest(key: bytes, code: str) -> str:
+    d = hmac.new(key, code.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(d).rstrip(b"=").decode("ascii")
+
+def _hmac_hash(code: str) -> str:
+    kid, key = _hmac_key()
+    return f"{_HMAC_PREFIX}{kid}${_hmac_digest(key, code)}"
+
+def _hmac_verify(code: str, hashed: str) -> bool:
+    kid, key = _hmac_key()
+    try:
+        row_kid, digest = hashed[len(_HMAC_PREFIX):].split("$", 1)
+    except ValueError:
+        return False
+    if row_kid != kid:
+        # хеш зроблено іншим (ротованим) ключем — перевірити неможливо
+        return False
+    return hmac.compare_digest(digest, _hmac_digest(key, code))
+
+# ───────────────────────── bcrypt ─────────────────────────
+def _bcrypt_rounds() -> int:
+    try:
+        from backend.core.config import settings
+        return int(getattr(settings, "code_hash_bcrypt_rounds", 12))
+    except Exception:
+        return 12
+
+def _bcrypt_hash(code: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or _bcrypt_rounds())
+    return bcrypt.hashpw(_bcrypt_input(code), salt).decode("utf-8")
+
+def _bcrypt_verify(code: str, hashed: str) -> bool:
+    return bcrypt.checkpw(_bcrypt_input(code), hashed.encode("utf-8"))
 
-# Аналогічно до passwords.py, використовуємо bcrypt напряму,
-# щоб уникнути помилок сумісності passlib з Python 3.12+
+def _bcrypt_chunk(args: tuple[list[str], int]) -> list[str]:
+    # виконується у воркері пулу процесів — лише чисті аргументи, без settings
+    codes, rounds = args
+    return [_bcrypt_hash(c, rounds) for c in codes]
 
-def hash_code(code: str) -> str:
+# ───────────────────────── registry ─────────────────────────
+_HASHERS: Dict[str, Callable[[str], str]] = {
+    SCHEME_HMAC: _hmac_hash,
+    SCHEME_BCRYPT: _bcrypt_hash,
+}
+
+def default_scheme() -> str:
+    try:
+        from backend.core.config import settings
+        scheme = str(getattr(settings, "code_hash_scheme", SCHEME_HMAC) or SCHEME_HMAC).lower()
+    except Exception:
+        scheme = SCHEME_HMAC
+    return scheme if scheme in _HASHERS else SCHEME_HMAC
+
+def identify(hashed: str) -> Optional[str]:
+    """Схема, якою зроблено хеш (за префіксом), або None."""
+    if not hashed:
+        return None
+    if hashed.startswith(_HMAC_PREFIX):
+        return SCHEME_HMAC
+    if hashed.startswith(("$2a$", "$2b$", "$2y$")):
+        return SCHEME_BCRYPT
+    return None
+
+def hash_code(code: str, scheme: Optional[str] = None) -> str:
     """
-    Хешує код доступу за допомогою bcrypt.
+    Хешує код доступу обраною схемою (за замовчуванням — settings.code_hash_scheme).
     """
-    code_bytes = code.encode('utf-8')
-    
-    # bcrypt має ліміт 72 байти. Обрізаємо для безпеки (хоча коди зазвичай короткі)
-    if len(code_bytes) > 72:
-        code_bytes = code_bytes[:72]
-        
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(code_bytes, salt)
-    return hashed.decode('utf-8')
+    return _HASHERS[scheme or default_scheme()](code)
+
+# ───────────────────────── bulk ─────────────────────────
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _bcrypt_workers() -> int:
+    try:
+        from backend.core.config import settings
+        n = int(getattr(settings, "code_hash_workers", 0))
+    except Exception:
+        n = 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Пул на процес; інший розмір — новий пул (старий доробляє вже подані чанки)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+def hash_codes(codes: Sequence[str], scheme: Optional[str] = None, *, workers: Optional[int] = None) -> List[str]:
+    """
+    Пакетне хешування (генерація/імпорт). HMAC — просто цикл (~мкс на код).
+    bcrypt — паралельно в пулі процесів, якщо воркерів > 1 і кодів достатньо.
+    """
+    scheme = scheme or default_scheme()
+    if scheme != SCHEME_BCRYPT:
+        fn = _HASHERS[scheme]
+        return [fn(c) for c in codes]
+
+    rounds = _bcrypt_rounds()
+    n_workers = workers if workers is not None else _bcrypt_workers()
+    if n_workers <= 1 or len(codes) < 2 * n_workers:
+        return [_bcrypt_hash(c, rounds) for c in codes]
+
+    items = list(codes)
+    size = max(1, -(-len(items) // (n_workers * 4)))
+    chunks = [(items[i:i + size], rounds) for i in range(0, len(items), size)]
+    try:
+        out: List[str] = []
+        for part in _get_pool(n_workers).map(_bcrypt_chunk, chunks):
+            out.extend(part)
+        return out
+    except Exception:
+        log.warning("code_hash_pool_failed; falling back to serial bcrypt", exc_info=True)
+        return [_bcrypt_hash(c, rounds) for c in items]
 
 def verify_code(code: str, hashed: str) -> bool:
     """
-    Перевіряє код доступу.
+    Перевіряє код доступу; схема визначається з самого хешу.
     """
     try:
-        code_bytes = code.encode('utf-8')
-        
-        if len(code_bytes) > 72:
-            code_bytes = code_bytes[:72]
-            
-        # Якщо хеш прийшов як рядок, конвертуємо в байти
-        if isinstance(hashed, str):
-            hashed_bytes = hashed.encode('utf-8')
-        else:
-            hashed_bytes = hashed
-            
-        return bcrypt.checkpw(code_bytes, hashed_bytes)
+        # Якщо хеш прийшов як байти, конвертуємо в рядок
+        if isinstance(hashed, (bytes, bytearray)):
+            hashed = hashed.decode("utf-8")
+        scheme = identify(hashed)
+        if scheme == SCHEME_HMAC:
+            return _hmac_verify(code, hashed)
+        if scheme == SCHEME_BCRYPT:
+            return _bcrypt_verify(code, hashed)
+        return False
     except Exception:
         # При будь-якій помилці (бітий хеш тощо) вважаємо перевірку невдалою
-        return False
\ No newline at end of file
+        return False
@@ -16,6 +16,9 @@ def code_allows_event(db: Session, code: "models.AccessCode", event_id: Optional
     3) Якщо code.event_id заданий → дозволити лише при точному збігу.
     4) Інакше → дозволити тільки якщо існує M2M-зв'язок (CodeAllowedEvent) з цим event_id.
        (відсутність зв'язків = заборона)
+
+    Приймає як ORM AccessCode, так і кешований CodeMeta (authn.code_cache) —
+    для нього білий список уже в allowed_event_ids, без запиту в БД.
     """
     # 1) Немає контексту події — не обмежуємо
     if event_id is None:
@@ -31,6 +34,10 @@ def code_allows_event(db: Session, code: "models.AccessCode", event_id: Optional
         return int(fixed_eid) == int(event_id)
 
     # 4) M2M: білий список дозволених подій
+    preloaded = getattr(code, "allowed_event_ids", None)
+    if preloaded is not None:
+        return int(event_id) in preloaded
+
     stmt = select(
         exists().where(
             models.CodeAllowedEvent.code_id == code.id,
@@ -0,0 +1,132 @@
+# backend/services/catalog.py
+# Знімок публічного каталогу івентів: per-process, версіонований лічильником у Redis,
+# який бампають адмінські записи івентів. Кожен елемент серіалізовано orjson заздалегідь —
+# запит лише фільтрує/ріже список і склеює готові байти.
+from __future__ import annotations
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "PUBLIC_STATUSES",
+    "CatalogSnapshot",
+    "bump_catalog_version",
+    "catalog_version",
+    "get_catalog",
+]
+
+# статуси, які показуємо публічно
+PUBLIC_STATUSES = {"scheduled", "published", "live", "ended"}
+
+VERSION_KEY = "catalog:version"
+# Redis недоступний — знімок живе стільки, потім перебудовується з БД
+FALLBACK_TTL_SECONDS = 30.0
+
+_CATALOG_COLUMNS = (
+    models.Event.id,
+    models.Event.slug,
+    models.Event.title,
+    models.Event.starts_at,
+    models.Event.ends_at,
+    models.Event.thumbnail_url,
+    models.Event.short_description,
+)
+
+def catalog_item(e) -> dict:
+    return {
+        "id": e.id,
+        "slug": e.slug,
+        "title": e.title,
+        "starts_at": e.starts_at,
+        "ends_at": e.ends_at,
+        "thumbnail_url": e.thumbnail_url,
+        "short_description": e.short_description,
+        # зручно одразу віддати URL сторінки
+        "page_url": f"/p/{e.slug}",
+    }
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    built_at: float
+    # (title.casefold(), slug.casefold(), orjson-байти елемента) у порядку каталогу
+    items: Tuple[Tuple[str, str, bytes], ...]
+
+    def page(self, q: Optional[str], limit: int, offset: int) -> bytes:
+        items = self.items
+        q = (q or "").strip().casefold()
+        if q:
+            # те саме, що ILIKE '%q%' по title/slug у text_search
+            items = tuple(it for it in items if q in it[0] or q in it[1])
+        return b"[" + b",".join(it[2] for it in items[offset:offset + limit]) + b"]"
+
+def catalog_version() -> Optional[str]:
+    try:
+        return str(get_redis().get(VERSION_KEY) or 0)
+    except Exception:
+        log.warning("catalog_version_unavailable", exc_info=True)
+        return None
+
+def bump_catalog_version() -> None:
+    """Викликається після коміту будь-якої зміни івенту."""
+    try:
+        get_redis().incr(VERSION_KEY)
+    except Exception:
+        log.warning("catalog_version_bump_failed", exc_info=True)
+
+def _build(db: DB, status: Optional[str], version: str) -> CatalogSnapshot:
+    stmt = select(*_CATALOG_COLUMNS)
+    if status:
+        stmt = stmt.where(models.Event.status == status)
+    else:
+        stmt = stmt.where(models.Event.status.in_(PUBLIC_STATUSES))
+    stmt = stmt.order_by(models.Event.starts_at.asc().nulls_last(), models.Event.id.asc())
+    items = tuple(
+        ((r.title or "").casefold(), (r.slug or "").casefold(), orjson.dumps(catalog_item(r)))
+        for r in db.execute(stmt)
+    )
+    return CatalogSnapshot(version=version, built_at=time.monotonic(), items=items)
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_snapshots: Dict[str, CatalogSnapshot] = {}
+
+def _usable(snap: Optional[CatalogSnapshot], version: Optional[str]) -> bool:
+    if snap is None:
+        return False
+    if version is None:
+        return time.monotonic() - snap.built_at < FALLBACK_TTL_SECONDS
+    return snap.version == version
+
+def get_catalog(db: DB, status: Optional[str]) -> CatalogSnapshot:
+    """
+    Знімок для фільтра статусу (None — усі публічні). Версію читаємо ДО вибірки:
+    дані знімка щонайменше такі ж свіжі, як його мітка.
+    """
+    key = status or ""
+    version = catalog_version()
+    with _lock:
+        snap = _snapshots.get(key)
+    if _usable(snap, version):
+        return snap  # type: ignore[return-value]
+    # одна перебудова на процес: решта чекає і бере готове
+    with _build_lock:
+        with _lock:
+            snap = _snapshots.get(key)
+        if _usable(snap, version):
+            return snap  # type: ignore[return-value]
+        snap = _build(db, status, version if version is not None else f"local-{time.time():.0f}")
+        with _lock:
+            _snapshots[key] = snap
+        return snap
@@ -3,9 +3,10 @@
 # backend/services/codegen.py
 from __future__ import annotations
 import secrets
-from typing import Optional, Iterable, Set, List
+import threading
+from typing import Dict, Iterator, Optional, Iterable, Set, List
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 
 # Нечіткі символи прибрані (0/O/I/L)
@@ -57,6 +58,142 @@ def generate_unique_code(
     # якщо «не щастить» — віддай будь-який, і нехай INSERT зловить колізію
     return generate_plain_code(length=length, alphabet=alphabet)
 
+# ───────────────────────── bulk engine ─────────────────────────
+# Bloom-фільтр наявних кодів (в памʼяті процесу) + векторне перетворення
+# secrets.token_bytes → алфавіт через bytes.translate (C-цикл, без per-char choice).
+
+BLOOM_BITS_PER_CODE = 16     # ~0.2% хибнопозитивних при k=4 — просто відкидаємо кандидата
+BLOOM_MIN_CAPACITY = 1 << 20
+INDEX_LOAD_BATCH = 50_000
+STREAM_CHUNK = 10_000
+
+class _BloomIndex:
+    """
+    Bloom-фільтр по hash(str) кодів. Хибнопозитив лише «спалює» вільний код,
+    хибнонегативів немає → колізії з уже завантаженими кодами виключені.
+    Видалені/перевипущені коди лишаються у фільтрі — це безпечно.
+    """
+    __slots__ = ("capacity", "count", "mask", "bits", "watermark")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), BLOOM_MIN_CAPACITY)
+        m = 1 << max(23, (self.capacity * BLOOM_BITS_PER_CODE - 1).bit_length())
+        self.mask = m - 1
+        self.bits = bytearray(m >> 3)
+        self.count = 0
+        self.watermark = 0   # max(id) уже завантажених рядків
+
+    def add_new(self, code: str) -> bool:
+        """True — коду не було (і його додано); False — можливо вже є."""
+        h = hash(code)
+        h1 = h & 0xFFFFFFFF
+        h2 = ((h >> 32) & 0xFFFFFFFF) | 1
+        m, b = self.mask, self.bits
+        p0 = h1 & m; p1 = (h1 + h2) & m; p2 = (h1 + 2 * h2) & m; p3 = (h1 + 3 * h2) & m
+        if (b[p0 >> 3] >> (p0 & 7) & 1 and b[p1 >> 3] >> (p1 & 7) & 1
+                and b[p2 >> 3] >> (p2 & 7) & 1 and b[p3 >> 3] >> (p3 & 7) & 1):
+            return False
+        b[p0 >> 3] |= 1 << (p0 & 7); b[p1 >> 3] |= 1 << (p1 & 7)
+        b[p2 >> 3] |= 1 << (p2 & 7); b[p3 >> 3] |= 1 << (p3 & 7)
+        self.count += 1
+        return True
+
+_indexes: Dict[tuple, _BloomIndex] = {}
+_indexes_lock = threading.Lock()
+
+def _load_into(index: _BloomIndex, db: Session, Model, field_name: str) -> None:
+    """Дочитує рядки з id > watermark (інкрементально; першого разу — усі) потоково."""
+    field = getattr(Model, field_name)
+    pk = Model.id
+    stmt = (
+        select(pk, field)
+        .where(pk > index.watermark)
+        .order_by(pk)
+        .execution_options(yield_per=INDEX_LOAD_BATCH)
+    )
+    for part in db.execute(stmt).partitions():
+        for pid, code in part:
+            if code:
+                index.add_new(code)
+        index.watermark = max(index.watermark, int(part[-1][0]))
+
+def _get_index(db: Session, Model, field_name: str, expected: int) -> _BloomIndex:
+    """Викликати під _indexes_lock. Перебудова, якщо фільтр переповниться цією генерацією."""
+    key = (Model.__tablename__, field_name)
+    index = _indexes.get(key)
+    if index is not None:
+        _load_into(index, db, Model, field_name)
+        if index.count + expected <= index.capacity:
+            return index
+    total = db.execute(select(func.count()).select_from(Model)).scalar_one()
+    index = _BloomIndex(capacity=2 * (int(total) + int(expected)))
+    _load_into(index, db, Model, field_name)
+    _indexes[key] = index
+    return index
+
+def _alphabet_codec(alphabet: str) -> Optional[tuple[bytes, bytes, float]]:
+    """
+    Таблиця для bytes.translate: байт b < limit → alphabet[b % A], байти ≥ limit
+    видаляються (rejection sampling — без зміщення розподілу). None — не-ASCII алфавіт.
+    """
+    try:
+        ab = alphabet.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    a = len(ab)
+    if not 1 < a <= 256:
+        return None
+    limit = 256 - 256 % a
+    table = bytes(ab[v % a] if v < limit else 0 for v in range(256))
+    return table, bytes(range(limit, 256)), 256 / limit
+
+def _random_codes(n: int, length: int, alphabet: str) -> List[str]:
+    codec = _alphabet_codec(alphabet)
+    if codec is None:
+        return [generate_plain_code(length=length, alphabet=alphabet) for _ in range(n)]
+    table, delete, overhead = codec
+    need = n * length
+    buf = b""
+    while len(buf) < need:
+        raw = secrets.token_bytes(int((need - len(buf)) * overhead) + 64)
+        buf += raw.translate(table, delete)
+    s = buf[:need].decode("ascii")
+    return [s[i:i + length] for i in range(0, need, length)]
+
+def iter_unique_codes(
+    db: Session,
+    Model,
+    n: int,
+    field_name: str = "code_plain",
+    length: Optional[int] = None,
+    alphabet: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK,
+) -> Iterator[List[str]]:
+    """
+    Потокова генерація N унікальних кодів чанками по chunk_size.
+    Памʼять — Bloom-фільтр (~2 байти на код) + один чанк.
+
+    Унікальність гарантована проти кодів, уже видимих у БД на момент чанку,
+    і всередині процесу; гонку з іншим процесом ловить UNIQUE(code_plain).
+    """
+    dfa, dfl = _resolve_alphabet_and_length()
+    alphabet = (alphabet or dfa).upper()
+    length = int(length or dfl)
+
+    left = int(n)
+    with _indexes_lock:
+        index = _get_index(db, Model, field_name, left)
+    while left > 0:
+        want = min(left, int(chunk_size))
+        out: List[str] = []
+        with _indexes_lock:
+            while len(out) < want:
+                for c in _random_codes(want - len(out), length, alphabet):
+                    if index.add_new(c):
+                        out.append(c)
+        left -= len(out)
+        yield out
+
 def generate_unique_codes_bulk(
     db: Session,
     Model,
@@ -67,43 +204,10 @@ def generate_unique_codes_bulk(
     max_rounds: int = 10,
 ) -> List[str]:
     """
-    Ефективна генерація N унікальних кодів.
-    Працює і проти міжсобойних колізій у партії, і проти колізій із БД.
-
-    Алгоритм:
-      1) генеруємо пачку кандидатів (із запасом),
-      2) одним SELECT ... IN(...) відкидаємо ті, що вже є в БД,
-      3) додаємо в результат, поки не назбираємо N, інакше — наступний раунд.
+    Ефективна генерація N унікальних кодів (список; для потоку — iter_unique_codes).
+    max_rounds лишено для сумісності викликів.
     """
-    field = getattr(Model, field_name)
     result: List[str] = []
-    chosen: Set[str] = set()  # захист від дублів у самій партії
-    rounds = 0
-
-    while len(result) < int(n) and rounds < max_rounds:
-        rounds += 1
-        need = int(n) - len(result)
-        # генеруємо з невеликим «оверсайзом», щоб зменшити шанси перебору
-        batch_size = max(need * 2, 16)
-        candidates = {generate_plain_code(length=length, alphabet=alphabet) for _ in range(batch_size)}
-        candidates -= chosen
-        if not candidates:
-            continue
-
-        # перевірка проти БД одним запитом
-        existing = {
-            row[0]
-            for row in db.execute(select(field).where(field.in_(list(candidates)))).all()
-        }
-        unique = list(candidates - existing)
-        unique.sort()  # стабільність (не обов'язково)
-
-        take = unique[:need]
-        result.extend(take)
-        chosen.update(take)
-
-    if len(result) < int(n):
-        # fallback — добиваємо одиночними (рідко, але надійно)
-        while len(result) < int(n):
-            result.append(generate_unique_code(db, Model, field_name, length, alphabet))
+    for chunk in iter_unique_codes(db, Model, n, field_name=field_name, length=length, alphabet=alphabet):
+        result.extend(chunk)
     return result
@@ -0,0 +1,274 @@
+# backend/services/columnar_export.py
+# Колонковий експорт для аналітиків: sessions, session_events, ccu_minutely, event_ccu_minutely,
+# access_codes, code_batches → Parquet (zstd) або Arrow IPC, по файлу на таблицю, у zip разом
+# з manifest.json. Читання — серверним курсором (yield_per), запис — row group на кожну партію,
+# тож памʼять обмежена розміром партії, а не таблиці. pyarrow — опційна залежність.
+from __future__ import annotations
+import json
+import logging
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import settings
+
+try:
+    import pyarrow as pa  # опційно: pip install pyarrow
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pa = pa_ipc = pq = None  # type: ignore[assignment]
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "FORMATS",
+    "TABLES",
+    "ExportFilter",
+    "export_available",
+    "export_tables",
+]
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def export_available() -> bool:
+    return pa is not None
+
+@dataclass(frozen=True)
+class ExportFilter:
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    event_id: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+            "event_id": self.event_id,
+        }
+
+def _ts():
+    return pa.timestamp("us", tz="UTC")
+
+# ───────────────────────── таблиці ─────────────────────────
+# (назва колонки, вираз SQLAlchemy, тип arrow — фабрика, бо pyarrow може бути відсутній)
+_Col = Tuple[str, object, Callable[[], object]]
+
+def _range(stmt, col, f: ExportFilter):
+    if f.since:
+        stmt = stmt.where(col >= f.since)
+    if f.until:
+        stmt = stmt.where(col < f.until)
+    return stmt
+
+def _sessions(f: ExportFilter):
+    S = models.Session
+    # token_jti — не для аналітики
+    cols: List[_Col] = [
+        ("id", S.id, pa.string),
+        ("code_id", S.code_id, pa.int64),
+        ("event_id", S.event_id, pa.int64),
+        ("ip", S.ip, pa.string),
+        ("user_agent", S.user_agent, pa.string),
+        ("active", S.active, pa.bool_),
+        ("created_at", S.created_at, _ts),
+        ("last_seen", S.last_seen, _ts),
+        ("watch_seconds", S.watch_seconds, pa.int64),
+        ("bytes_out", S.bytes_out, pa.int64),
+    ]
+    stmt = _range(select(*(c for _, c, _ in cols)), S.created_at, f)
+    if f.event_id is not None:
+        stmt = stmt.where(S.event_id == f.event_id)
+    return cols, stmt.order_by(S.created_at, S.id)
+
+def _session_events(f: ExportFilter):
+    E, S = models.SessionEvent, models.Session
+    cols: List[_Col] = [
+        ("id", E.id, pa.int64),
+        ("session_id", E.session_id, pa.string),
+        ("event", E.event, pa.string),
+        ("at", E.at, _ts),
+        ("details", E.details, pa.string),
+    ]
+    stmt = _range(select(*(c for _, c, _ in cols)), E.at, f)
+    if f.event_id is not None:
+        stmt = stmt.where(E.session_id.in_(select(S.id).where(S.event_id == f.event_id)))
+    return cols, stmt.order_by(E.id)
+
+def _ccu_minutely(f: ExportFilter):
+    # глобальний ряд не належить жодному івенту — з фільтром по івенту не експортується
+    if f.event_id is not None:
+        return None
+    C = models.CCUMinutely
+    cols: List[_Col] = [("ts", C.ts, _ts), ("ccu", C.ccu, pa.int32)]
+    return cols, _range(select(C.ts, C.ccu), C.ts, f).order_by(C.ts)
+
+def _event_ccu_minutely(f: ExportFilter):
+    T = models.EventCCUMinutely
+    cols: List[_Col] = [("event_id", T.event_id, pa.int64), ("ts", T.ts, _ts), ("ccu", T.ccu, pa.int32)]
+    stmt = _range(select(T.event_id, T.ts, T.ccu), T.ts, f)
+    if f.event_id is not None:
+        stmt = stmt.where(T.event_id == f.event_id)
+    return cols, stmt.order_by(T.event_id, T.ts)
+
+def _event_codes(event_id: int):
+    """Коди івенту: закріплені за ним або з сесіями на ньому."""
+    C, S = models.AccessCode, models.Session
+    return or_(C.event_id == event_id, C.id.in_(select(S.code_id).where(S.event_id == event_id)))
+
+def _access_codes(f: ExportFilter):
+    C = models.AccessCode
+    # code_plain/code_hash — секрети доступу, в аналітичний експорт не йдуть
+    cols: List[_Col] = [
+        ("id", C.id, pa.int64),
+        ("event_id", C.event_id, pa.int64),
+        ("batch_id", C.batch_id, pa.int64),
+        ("allowed_sessions", C.allowed_sessions, pa.int32),
+        ("allow_all_events", C.allow_all_events, pa.bool_),
+        ("revoked", C.revoked, pa.bool_),
+        ("created_at", C.created_at, _ts),
+        ("expires_at", C.expires_at, _ts),
+    ]
+    stmt = select(*(c for _, c, _ in cols))
+    if f.event_id is not None:
+        stmt = stmt.where(_event_codes(f.event_id))
+    return cols, stmt.order_by(C.id)
+
+def _code_batches(f: ExportFilter):
+    B, C = models.CodeBatch, models.AccessCode
+    cols: List[_Col] = [
+        ("id", B.id, pa.int64),
+        ("event_id", B.event_id, pa.int64),
+        ("label", B.label, pa.string),
+        ("price_uah", B.price_uah, pa.int64),
+        ("generated_by", B.generated_by, pa.string),
+        ("created_at", B.created_at, _ts),
+    ]
+    stmt = select(*(c for _, c, _ in cols))
+    if f.event_id is not None:
+        stmt = stmt.where(or_(
+            B.event_id == f.event_id,
+            B.id.in_(select(C.batch_id).where(_event_codes(f.event_id), C.batch_id.is_not(None))),
+        ))
+    return cols, stmt.order_by(B.id)
+
+TABLES = {
+    "sessions": _sessions,
+    "session_events": _session_events,
+    "ccu_minutely": _ccu_minutely,
+    "event_ccu_minutely": _event_ccu_minutely,
+    "access_codes": _access_codes,
+    "code_batches": _code_batches,
+}
+
+# ───────────────────────── запис ─────────────────────────
+class _Writer:
+    """Parquet (row group на партію) або Arrow IPC file (record batch на партію)."""
+
+    def __init__(self, path: Path, schema, fmt: str):
+        self.fmt = fmt
+        if fmt == "parquet":
+            self._w = pq.ParquetWriter(str(path), schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            self._w = pa_ipc.new_file(self._sink, schema, options=pa_ipc.IpcWriteOptions(compression="zstd"))
+
+    def write(self, batch) -> None:
+        if self.fmt == "parquet":
+            self._w.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._w.write_batch(batch)
+
+    def close(self) -> None:
+        self._w.close()
+        if self.fmt != "parquet":
+            self._sink.close()
+
+def _export_table(
+    db: DB, name: str, f: ExportFilter, path: Path, fmt: str, batch_rows: int, on_rows: Callable[[int], None],
+) -> Optional[int]:
+    spec = TABLES[name](f)
+    if spec is None:
+        return None
+    cols, stmt = spec
+    schema = pa.schema([pa.field(n, t()) for n, _, t in cols])
+    writer = _Writer(path, schema, fmt)
+    rows = 0
+    try:
+        # yield_per → stream_results: на Postgres серверний курсор, у памʼяті — лише одна партія
+        result = db.execute(stmt.execution_options(yield_per=batch_rows))
+        for part in result.partitions():
+            arrays = [pa.array([r[i] for r in part], type=field.type) for i, field in enumerate(schema)]
+            writer.write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(part)
+            on_rows(len(part))
+        if rows == 0:
+            # порожній файл зі схемою — читачам не треба окремо обробляти відсутність таблиці
+            writer.write(pa.RecordBatch.from_arrays([pa.array([], type=fl.type) for fl in schema], schema=schema))
+    finally:
+        writer.close()
+    return rows
+
+def _snapshot(db: DB) -> None:
+    # одна REPEATABLE READ транзакція: таблиці узгоджені між собою на момент старту
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+
+def export_tables(
+    db: DB,
+    out: Path,
+    *,
+    flt: ExportFilter,
+    fmt: str = "parquet",
+    tables: Optional[List[str]] = None,
+    batch_rows: Optional[int] = None,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """
+    Пише zip з файлом на кожну таблицю + manifest.json. db — окрема сесія лише для читання:
+    серверний курсор не переживає коміт (прогрес задачі комітить свою сесію).
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow_not_installed")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format: {fmt}")
+    if isinstance(tables, str):
+        raise ValueError("tables must be a list")
+    unknown = sorted(set(tables or ()) - set(TABLES))
+    if unknown:
+        raise ValueError(f"unknown tables: {', '.join(unknown)}")
+    names = list(dict.fromkeys(tables or TABLES))
+    batch_rows = int(batch_rows or getattr(settings, "analytics_export_batch_rows", 50_000))
+    _snapshot(db)
+
+    counts: Dict[str, Optional[int]] = {}
+    parts: List[Path] = []
+    try:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name in names:
+                part = out.with_name(f"{out.stem}.{name}{FORMATS[fmt]}")
+                parts.append(part)
+                counts[name] = _export_table(db, name, flt, part, fmt, batch_rows, on_rows or (lambda n: None))
+                if counts[name] is not None:
+                    # файли вже стиснуті (zstd) — STORED, без повторного стиснення
+                    zf.write(part, arcname=f"{name}{FORMATS[fmt]}")
+                part.unlink(missing_ok=True)
+            manifest = {
+                "format": fmt,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "filter": flt.to_dict(),
+                "batch_rows": batch_rows,
+                "tables": {n: c for n, c in counts.items() if c is not None},
+            }
+            zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    finally:
+        for part in parts:
+            part.unlink(missing_ok=True)
+        db.rollback()
+    return manifest
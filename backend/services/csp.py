@@ -1,9 +1,11 @@
 # backend/services/csp.py
 from __future__ import annotations
+import base64
+import hashlib
 import secrets
 from typing import Dict, Iterable, List, Optional, Union
 
-__all__ = ["gen_nonce", "build_csp_headers"]
+__all__ = ["gen_nonce", "csp_hash", "sri_hash", "build_csp_headers"]
 
 SrcList = Union[str, Iterable[str]]
 
@@ -11,6 +13,16 @@ def gen_nonce(length: int = 16) -> str:
     """Генерує URL-safe nonce для CSP."""
     return secrets.token_urlsafe(length)
 
+def sri_hash(data: Union[str, bytes]) -> str:
+    """'sha256-<base64>' — значення integrity= і (в лапках) джерело CSP для того ж вмісту."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return "sha256-" + base64.b64encode(hashlib.sha256(data).digest()).decode("ascii")
+
+def csp_hash(data: Union[str, bytes]) -> str:
+    """Джерело CSP для інлайнового <script>/<style> з точно таким вмістом."""
+    return f"'{sri_hash(data)}'"
+
 def _join(srcs: SrcList) -> str:
     if isinstance(srcs, str):
         return srcs
@@ -18,8 +30,10 @@ def _join(srcs: SrcList) -> str:
 
 def build_csp_headers(
     mode: str,
-    nonce: str,
+    nonce: Optional[str],
     *,
+    script_hashes: Iterable[str] = (),
+    style_hashes: Iterable[str] = (),
     frame_ancestors: Optional[SrcList] = "none",
     connect_src_extra: Optional[List[str]] = None,
     img_src_extra: Optional[List[str]] = None,
@@ -33,6 +47,8 @@ def build_csp_headers(
     - mode='sandbox'  → максимально строго (рекомендовано за замовчуванням).
     - mode='html'     → трохи ліберальніше (але БЕЗ unsafe-inline/unsafe-eval).
     Усі inline <style>/<script> мають йти з nonce.
+    nonce=None — політика на хешах (script_hashes/style_hashes у форматі csp_hash):
+    документ однаковий для всіх глядачів і може кешуватись CDN.
     """
 
     # Базові джерела
@@ -56,8 +72,9 @@ def build_csp_headers(
         font_src.extend(font_src_extra)
 
     # Скрипти/стилі — тільки по nonce; strict-dynamic дозволяє підвантажені скрипти довіреним лоадером
-    script_src = [f"'nonce-{nonce}'", "'self'", "https:", "'strict-dynamic'"]
-    style_src  = [f"'nonce-{nonce}'", "'self'", "https:"]
+    nonce_src = [f"'nonce-{nonce}'"] if nonce else []
+    script_src = [*nonce_src, *script_hashes, "'self'", "https:", "'strict-dynamic'"]
+    style_src  = [*nonce_src, *style_hashes, "'self'", "https:"]
 
     if script_src_extra:
         script_src.extend(script_src_extra)
@@ -6,6 +6,7 @@ from datetime import datetime
 
 __all__ = [
     "calc_event_etag",
+    "content_digest",
     "calc_payload_etag",
     "not_modified",
     "set_etag_header",
@@ -35,6 +36,10 @@ def calc_payload_etag(*parts: Any) -> str:
         h.update(sep)
     return h.hexdigest()[:40]
 
+def content_digest(text: Optional[str]) -> str:
+    """sha256 вмісту: правка, що зберігає довжину, теж змінює ETag."""
+    return hashlib.sha256(_to_bytes(text)).hexdigest()
+
 def calc_event_etag(
     event_id: int,
     updated_at: Optional[datetime],
@@ -42,18 +47,21 @@ def calc_event_etag(
     html: Optional[str],
     css: Optional[str],
     js: Optional[str],
+    *extra: Any,
 ) -> str:
     """
     ETag для сторінки івенту: чутливий до id, оновлення, статусу і вмісту.
-    (довжини — достатній проксі, щоб не возити весь текст у геш)
+    extra — інші поля, що потрапляють у документ (назва, відео, …).
+    Рахується при збереженні й зберігається в events.etag — на запит не перераховується.
     """
     return calc_payload_etag(
         event_id,
         updated_at or "",
         status or "",
-        len(html or ""),
-        len(css or ""),
-        len(js or ""),
+        content_digest(html),
+        content_digest(css),
+        content_digest(js),
+        *extra,
     )
 
 def not_modified(incoming_if_none_match: Optional[str], current_etag: Optional[str]) -> bool:
@@ -0,0 +1,263 @@
+# backend/services/event_cache.py
+# Кеш метаданих івентів (без page_*/custom_*/compiled_* блобів) за id і slug — per-process.
+# Single-flight: сплеск запитів на щойно опублікований івент робить один SELECT.
+# Інвалідація — локально + Redis pub/sub у решту воркерів; TTL — лише страховка.
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import settings
+from backend.core.redis import get_redis, get_redis_async
+from backend.repositories.events_repo import compute_event_etag
+from backend.services.catalog import bump_catalog_version
+from backend.services.page_cache import invalidate_event_page
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "EventMeta",
+    "get_event_meta",
+    "get_event_meta_by_slug",
+    "invalidate_event",
+    "event_cache_stats",
+    "run_event_cache_invalidator",
+]
+
+INVALIDATE_CH = "events:invalidate"
+
+@dataclass(frozen=True)
+class EventMeta:
+    """Компактний знімок івенту: усе, що потрібно публічним роутам до рендеру/віддачі тіла."""
+    id: int
+    slug: str
+    title: str
+    status: str
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+    thumbnail_url: Optional[str]
+    short_description: Optional[str]
+    player_manifest_url: Optional[str]
+    bunny_video_path: Optional[str]
+    mux_env_key: Optional[str]
+    assets_base_url: Optional[str]
+    runtime_js_version: Optional[str]
+    etag: Optional[str]
+    preview_token: Optional[str]
+    compiled_js_hash: Optional[str]
+    compiled_hash: Optional[str]
+    compiled_at: Optional[datetime]
+    published_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @property
+    def is_published(self) -> bool:
+        return (self.status or "draft") == "published"
+
+_META_COLUMNS = tuple(getattr(models.Event, f) for f in EventMeta.__dataclass_fields__)
+
+def _load(db: DB, where) -> Optional[EventMeta]:
+    row = db.execute(select(*_META_COLUMNS).where(where)).one_or_none()
+    if row is None:
+        return None
+    meta = EventMeta(**row._asdict())
+    if meta.etag is None:
+        # легасі-рядок без збереженого etag — разово рахуємо з повного рядка
+        ev = db.get(models.Event, meta.id)
+        etag = compute_event_etag(ev)
+        meta = EventMeta(**{**row._asdict(), "etag": etag})
+    return meta
+
+# ───────────────────────── in-process кеш + single-flight ─────────────────────────
+_MISSING = object()  # негативний запис (slug/id не існує)
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+_lock = threading.Lock()
+_by_id: Dict[int, Tuple[object, float]] = {}
+_by_slug: Dict[str, Tuple[object, float]] = {}  # slug → (id | _MISSING, expires)
+_inflight: Dict[Hashable, _Flight] = {}
+_stats = {"hits": 0, "misses": 0, "negative_hits": 0, "coalesced": 0, "invalidations": 0}
+# межа slug-записів: перебір випадкових slug-ів не повинен роздувати негативний кеш
+MAX_SLUGS = 50_000
+# зростає на кожну інвалідацію: знімок, завантажений ДО неї, у кеш не потрапляє
+_gen = 0
+
+def _ttl(negative: bool = False) -> float:
+    if negative:
+        return float(getattr(settings, "event_cache_negative_ttl_seconds", 10))
+    return float(getattr(settings, "event_cache_ttl_seconds", 60))
+
+def _single_flight(key: Hashable, load: Callable[[], Optional[EventMeta]]) -> Optional[EventMeta]:
+    with _lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+        else:
+            _stats["coalesced"] += 1
+    if not leader:
+        # чекаємо лідера; якщо той завис — вантажимо самі, а не висимо разом із ним
+        if flight.done.wait(timeout=5.0):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        return load()
+    try:
+        flight.value = load()
+        return flight.value
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+def _store(meta: Optional[EventMeta], gen: int, *, event_id: Optional[int] = None, slug: Optional[str] = None) -> None:
+    now = time.monotonic()
+    with _lock:
+        if gen != _gen:
+            return
+        if meta is None:
+            if event_id is not None:
+                _by_id[event_id] = (_MISSING, now + _ttl(negative=True))
+            if slug is not None:
+                if len(_by_slug) >= MAX_SLUGS:
+                    _prune_slugs(now)
+                _by_slug[slug] = (_MISSING, now + _ttl(negative=True))
+            return
+        _by_id[meta.id] = (meta, now + _ttl())
+        _by_slug[meta.slug] = (meta.id, now + _ttl())
+        if slug is not None and slug != meta.slug:
+            _by_slug[slug] = (meta.id, now + _ttl())
+
+def _prune_slugs(now: float) -> None:
+    """Під _lock: спершу прострочені, за потреби — усі негативні."""
+    for s in [s for s, (_, exp) in _by_slug.items() if exp < now]:
+        del _by_slug[s]
+    if len(_by_slug) >= MAX_SLUGS:
+        for s in [s for s, (ref, _) in _by_slug.items() if ref is _MISSING]:
+            del _by_slug[s]
+
+def _fresh(entry: Optional[Tuple[object, float]]) -> object:
+    if entry is None or entry[1] < time.monotonic():
+        return None
+    return entry[0]
+
+def get_event_meta(db: DB, event_id: int) -> Optional[EventMeta]:
+    with _lock:
+        hit = _fresh(_by_id.get(event_id))
+        if hit is not None:
+            if hit is _MISSING:
+                _stats["negative_hits"] += 1
+                return None
+            _stats["hits"] += 1
+            return hit  # type: ignore[return-value]
+        _stats["misses"] += 1
+        gen = _gen
+
+    def load() -> Optional[EventMeta]:
+        meta = _load(db, models.Event.id == event_id)
+        _store(meta, gen, event_id=event_id)
+        return meta
+    return _single_flight(("id", event_id), load)
+
+def get_event_meta_by_slug(db: DB, slug: str) -> Optional[EventMeta]:
+    with _lock:
+        ref = _fresh(_by_slug.get(slug))
+        if ref is _MISSING:
+            _stats["negative_hits"] += 1
+            return None
+        hit = _fresh(_by_id.get(ref)) if ref is not None else None
+        if hit is not None and hit is not _MISSING and hit.slug == slug:  # type: ignore[union-attr]
+            _stats["hits"] += 1
+            return hit  # type: ignore[return-value]
+        _stats["misses"] += 1
+        gen = _gen
+
+    def load() -> Optional[EventMeta]:
+        meta = _load(db, models.Event.slug == slug)
+        _store(meta, gen, slug=slug)
+        return meta
+    return _single_flight(("slug", slug), load)
+
+# ───────────────────────── інвалідація ─────────────────────────
+def _drop_local(event_id: Optional[int], slugs: Iterable[str] = ()) -> None:
+    global _gen
+    with _lock:
+        _gen += 1
+        if event_id is None:
+            _by_id.clear()
+            _by_slug.clear()
+        else:
+            _by_id.pop(event_id, None)
+            for s in [s for s, (ref, _) in _by_slug.items() if ref == event_id]:
+                del _by_slug[s]
+        for s in slugs:
+            _by_slug.pop(s, None)
+        _stats["invalidations"] += 1
+    invalidate_event_page(event_id)
+
+def invalidate_event(event_id: Optional[int], *slugs: Optional[str]) -> None:
+    """
+    Після коміту будь-якої зміни івенту. slugs — нові slug-и (знімають негативний кеш 404).
+    Також бампає версію каталогу — знімки /api/events перебудуються в усіх воркерах.
+    event_id=None — скинути все.
+    """
+    clean = [s for s in slugs if s]
+    _drop_local(event_id, clean)
+    bump_catalog_version()
+    try:
+        get_redis().publish(INVALIDATE_CH, orjson.dumps({"id": event_id, "slugs": clean}))
+    except Exception:
+        log.debug("redis_publish_event_invalidate_failed", exc_info=True)
+
+def event_cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "ids": len(_by_id), "slugs": len(_by_slug), "inflight": len(_inflight)}
+
+async def run_event_cache_invalidator() -> None:
+    """Слухає інвалідації з інших воркерів (свої теж приходять — повторне скидання безпечне)."""
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis_async().pubsub()
+            await pubsub.subscribe(INVALIDATE_CH)
+            # після (пере)підключення могли пропустити повідомлення — скидаємо все
+            _drop_local(None)
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not msg or msg.get("type") != "message":
+                    continue
+                try:
+                    data = orjson.loads(msg.get("data"))
+                except Exception:
+                    continue
+                _drop_local(data.get("id"), data.get("slugs") or ())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.debug("event_cache_invalidator_error", exc_info=True)
+            await asyncio.sleep(1.0)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.unsubscribe(INVALIDATE_CH)
+                    await pubsub.close()
+                except Exception:
+                    pass
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session as DB
 from backend.models import Session, AccessCode
 from backend.utils.dt import now_utc
 from backend.services.session.constants import ONLINE_TTL_SEC
+from backend.services.metrics.usage import record_event_bind, record_watch
 
 def get_session(db: DB, sid: str) -> Session | None:
     return db.get(Session, sid)
@@ -16,7 +17,7 @@ def get_code_for_session(db: DB, sess: Session) -> AccessCode | None:
 def touch_session(db: DB, sess: Session, *, event_id: int) -> int:
     """
     Оновлює last_seen та watch_seconds (обмежує приріст ONLINE_TTL_SEC),
-    проставляє 'липку' прив'язку event_id один раз.
+    проставляє 'липку' прив'язку event_id один раз; ролапи використання — в тому ж коміті.
     Повертає вікно (сек), яке було використано для інкременту.
     """
     before = getattr(sess, "last_seen", None) or now_utc()
@@ -28,6 +29,9 @@ def touch_session(db: DB, sess: Session, *, event_id: int) -> int:
     sess.last_seen = now
     if getattr(sess, "event_id", None) is None:
         sess.event_id = event_id
+        if sess.code_id:
+            record_event_bind(db, code_id=sess.code_id, event_id=event_id)
+    record_watch(db, code_id=sess.code_id, event_id=sess.event_id, seconds=incr)
 
     db.commit()
     return ONLINE_TTL_SEC  # вікно для онлайн-лічильника/CCU
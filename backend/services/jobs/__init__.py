@@ -0,0 +1 @@
+# backend/services/jobs/__init__.py
@@ -0,0 +1,310 @@
+# backend/services/jobs/core.py
+# Фонові адмінські задачі: таблиця jobs як черга, реєстр обробників, контекст прогресу.
+from __future__ import annotations
+import logging
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from time import monotonic
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.services.ws_service import publish_admin_event
+from backend.utils.dt import now_utc
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINAL_STATUSES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+PROGRESS_EVERY_SEC = 1.0
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+class JobCancelled(Exception):
+    """Кидається з JobContext.check_cancel(), коли адмін скасував задачу."""
+
+class JobLost(Exception):
+    """Задачу перезаклеймили (requeue_stale) — ця спроба вже не власник рядка і має зупинитись."""
+
+@dataclass(frozen=True)
+class JobKind:
+    name: str
+    handler: Callable[["JobContext"], Optional[dict]]
+    roles: FrozenSet[str]
+    max_attempts: int = 3
+    # None — можна ставити в чергу; інакше причина, чому kind зараз недоступний (опційні залежності)
+    unavailable: Optional[Callable[[], Optional[str]]] = None
+
+_registry: Dict[str, JobKind] = {}
+
+def job_kind(name: str, *, roles=("super", "admin"), max_attempts: int = 3, unavailable=None):
+    """Декоратор: реєструє обробник задачі. Обробник має бути ідемпотентним/продовжуваним —
+    після рестарту задача стартує знову з тим самим params і збереженим progress."""
+    def deco(fn):
+        _registry[name] = JobKind(
+            name=name, handler=fn, roles=frozenset(roles), max_attempts=max_attempts, unavailable=unavailable,
+        )
+        return fn
+    return deco
+
+def get_kind(name: str) -> Optional[JobKind]:
+    return _registry.get(name)
+
+def kinds_for_role(role: str) -> list[str]:
+    """Назви kind, доступних ролі адміна (перелік задач фільтрується так само, як постановка)."""
+    return sorted(k.name for k in _registry.values() if role in k.roles)
+
+def jobs_dir() -> Path:
+    p = Path(getattr(settings, "jobs_dir", "var/jobs"))
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+def job_to_dict(job: models.Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "result": job.result,
+        "has_file": bool(job.result_file),
+        "error": job.error,
+        "cancel_requested": bool(job.cancel_requested),
+        "attempts": job.attempts,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def _emit(job: models.Job, type_: str) -> None:
+    payload = job_to_dict(job)
+    for k in ("created_at", "started_at", "finished_at"):
+        if payload[k] is not None:
+            payload[k] = payload[k].isoformat()
+    publish_admin_event({"type": type_, "payload": payload})
+
+# ───────────────────────── API-бік ─────────────────────────
+def submit(db: DB, kind: str, params: dict | None, *, admin_id: int | None = None, job_id: str | None = None) -> models.Job:
+    if kind not in _registry:
+        raise KeyError(kind)
+    job = models.Job(kind=kind, params=params or {}, status=QUEUED, created_by=admin_id)
+    if job_id:
+        job.id = job_id
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _emit(job, "job_queued")
+    return job
+
+def request_cancel(db: DB, job: models.Job) -> models.Job:
+    """queued → одразу cancelled; running → прапорець, обробник зупиниться на найближчому чанку."""
+    if job.status in FINAL_STATUSES:
+        return job
+    if job.status == QUEUED:
+        res = db.execute(
+            update(models.Job)
+            .where(models.Job.id == job.id, models.Job.status == QUEUED)
+            .values(status=CANCELLED, cancel_requested=True, finished_at=now_utc())
+        )
+        if res.rowcount:
+            db.commit()
+            db.refresh(job)
+            _emit(job, "job_finished")
+            return job
+    job.cancel_requested = True
+    db.commit()
+    db.refresh(job)
+    return job
+
+# ───────────────────────── воркер-бік ─────────────────────────
+def claim_next(db: DB) -> Optional[str]:
+    """Атомарно бере найстарішу queued-задачу (PG: FOR UPDATE SKIP LOCKED)."""
+    J = models.Job
+    pick = select(J.id).where(J.status == QUEUED).order_by(J.created_at).limit(1)
+    if db.get_bind().dialect.name == "postgresql":
+        pick = pick.with_for_update(skip_locked=True)
+    job_id = db.execute(pick).scalar_one_or_none()
+    if not job_id:
+        db.rollback()
+        return None
+    n = now_utc()
+    res = db.execute(
+        update(J)
+        .where(J.id == job_id, J.status == QUEUED)
+        .values(status=RUNNING, worker=WORKER_ID, started_at=n, heartbeat_at=n, attempts=J.attempts + 1)
+    )
+    db.commit()
+    return job_id if res.rowcount else None
+
+def requeue_stale(db: DB) -> int:
+    """
+    running-задачі без heartbeat довше за jobs_stale_seconds (воркер упав / рестарт) →
+    знову queued; після max_attempts — failed.
+    """
+    J = models.Job
+    cut = now_utc() - timedelta(seconds=int(getattr(settings, "jobs_stale_seconds", 120)))
+    stale = db.execute(
+        select(J).where(J.status == RUNNING, J.heartbeat_at < cut)
+    ).scalars().all()
+    for job in stale:
+        kind = _registry.get(job.kind)
+        limit = kind.max_attempts if kind else 1
+        if job.cancel_requested:
+            job.status, job.finished_at = CANCELLED, now_utc()
+        elif job.attempts >= limit:
+            job.status, job.finished_at, job.error = FAILED, now_utc(), "worker_lost"
+        else:
+            job.status, job.worker = QUEUED, None
+    if stale:
+        db.commit()
+        for job in stale:
+            _emit(job, "job_finished" if job.status in FINAL_STATUSES else "job_queued")
+    return len(stale)
+
+class JobContext:
+    """Передається обробнику: params, сесія БД, прогрес, скасування, файл результату."""
+
+    def __init__(self, db: DB, job: models.Job):
+        self.db = db
+        self.job = job
+        self.params: dict = dict(job.params or {})
+        self._last_emit = 0.0
+        self._attempt = int(job.attempts or 0)
+
+    def owned(self):
+        """Умова «рядок досі належить цій спробі»: воркер, статус і номер спроби."""
+        return _owned(self.job.id, self._attempt)
+
+    @property
+    def id(self) -> str:
+        return self.job.id
+
+    @property
+    def resumed_progress(self) -> int:
+        """Прогрес попередньої спроби (після рестарту) — щоб продовжити, а не почати з нуля."""
+        return int(self.job.progress or 0) if (self.job.attempts or 0) > 1 else 0
+
+    def file_path(self, suffix: str) -> Path:
+        return jobs_dir() / f"{self.job.id}{suffix}"
+
+    def set_result_file(self, path: Path) -> None:
+        J = models.Job
+        self.db.execute(update(J).where(J.id == self.job.id).values(result_file=path.name))
+        self.db.commit()
+
+    def is_cancelled(self) -> bool:
+        flag = self.db.execute(
+            select(models.Job.cancel_requested).where(models.Job.id == self.job.id)
+        ).scalar_one_or_none()
+        return bool(flag)
+
+    def check_cancel(self) -> None:
+        if self.is_cancelled():
+            raise JobCancelled()
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """Пише прогрес + heartbeat у БД (окремий коміт) і, не частіше за раз на секунду, шле подію в адмін-WS."""
+        J = models.Job
+        values: dict[str, Any] = {"progress": int(done), "heartbeat_at": now_utc()}
+        if total is not None:
+            values["total"] = int(total)
+        res = self.db.execute(update(J).where(self.owned()).values(**values))
+        self.db.commit()
+        if not res.rowcount:
+            raise JobLost()
+        self.job.progress = int(done)
+        if total is not None:
+            self.job.total = int(total)
+        t = monotonic()
+        if t - self._last_emit >= PROGRESS_EVERY_SEC:
+            self._last_emit = t
+            _emit(self.job, "job_progress")
+        self.check_cancel()
+
+def _owned(job_id: str, attempt: int):
+    J = models.Job
+    return (J.id == job_id) & (J.worker == WORKER_ID) & (J.status == RUNNING) & (J.attempts == attempt)
+
+class _Heartbeat(threading.Thread):
+    """
+    Оновлює heartbeat_at поки обробник працює — незалежно від того, як часто він кличе progress().
+    Інакше довгий крок (bcrypt-чанк, перерахунок ролапів) перевищує jobs_stale_seconds і
+    requeue_stale запускає другу копію задачі паралельно з першою.
+    """
+
+    def __init__(self, job_id: str, attempt: int):
+        super().__init__(name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        self.job_id, self.attempt = job_id, attempt
+        self.stopped = threading.Event()
+        self.interval = max(1.0, int(getattr(settings, "jobs_stale_seconds", 120)) / 4)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                with SessionLocal() as db:
+                    res = db.execute(
+                        update(models.Job).where(_owned(self.job_id, self.attempt)).values(heartbeat_at=now_utc())
+                    )
+                    db.commit()
+                if not res.rowcount:
+                    return  # рядок уже не наш — progress()/фіналізація це побачать
+            except Exception:
+                log.warning("job_heartbeat_failed", extra={"job_id": self.job_id}, exc_info=True)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join(timeout=5)
+
+def run_job(job_id: str) -> None:
+    """
+    Виконує вже заклеймлену задачу у власній сесії; фіксує підсумковий статус.
+    Фінальний UPDATE — лише якщо рядок досі належить цій спробі: перезаклеймлену
+    задачу стара спроба не завершить.
+    """
+    J = models.Job
+    with SessionLocal() as db:
+        job = db.get(J, job_id)
+        if not job:
+            return
+        kind = _registry.get(job.kind)
+        _emit(job, "job_started")
+        ctx = JobContext(db, job)
+        heartbeat = _Heartbeat(job_id, ctx._attempt)
+        heartbeat.start()
+        values: dict[str, Any] = {}
+        try:
+            if kind is None:
+                raise LookupError(f"unknown job kind: {job.kind}")
+            result = kind.handler(ctx)
+            values = {"status": SUCCEEDED, "result": result}
+        except JobLost:
+            log.warning("job_lost", extra={"job_id": job_id, "kind": job.kind})
+        except JobCancelled:
+            values = {"status": CANCELLED}
+        except Exception as e:
+            log.exception("job_failed", extra={"job_id": job_id, "kind": job.kind})
+            values = {"status": FAILED, "error": f"{type(e).__name__}: {e}"[:2000]}
+        finally:
+            heartbeat.stop()
+        db.rollback()  # на випадок незакоміченого стану обробника
+        if not values:
+            return
+        n = now_utc()
+        res = db.execute(update(J).where(ctx.owned()).values(**values, finished_at=n, heartbeat_at=n))
+        db.commit()
+        if not res.rowcount:
+            log.warning("job_finish_lost", extra={"job_id": job_id, "status": values["status"]})
+            return
+        job = db.get(J, job_id)
+        db.refresh(job)
+        _emit(job, "job_finished")
@@ -0,0 +1,256 @@
+# backend/services/jobs/handlers.py
+# Обробники фонових задач. Імпорт модуля реєструє їх у backend.services.jobs.core.
+from __future__ import annotations
+import csv
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from backend import models, schemas
+from backend.core.config import settings
+from backend.services.jobs.core import JobContext, job_kind
+from backend.services.repo import code_csv
+from backend.services.repo.access_codes import (
+    attrs_from_create, create_code_batch, missing_event_ids, stream_new_codes,
+)
+from backend.services.session_manager import logout as do_logout
+from backend.services.ws_service import publish_admin_event, publish_terminate
+
+FORCE_LOGOUT_PAGE = 500
+
+def _param_dt(ctx: JobContext, key: str) -> datetime | None:
+    """ISO-дата з params; naive — як UTC."""
+    raw = ctx.params.get(key)
+    if not raw:
+        return None
+    dt = datetime.fromisoformat(str(raw))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+# ───────────────────────── codes.bulk_create ─────────────────────────
+@job_kind("codes.bulk_create", roles=("super", "admin", "manager"))
+def bulk_create(ctx: JobContext) -> dict:
+    """
+    Генерація amount кодів; результат — CSV з кодами (дописується після кожного чанку).
+    Після рестарту продовжує з progress: файл відкривається на дозапис.
+    """
+    data = schemas.AccessCodeBulkJob(**ctx.params)
+
+    # batch створюється один раз і запамʼятовується в params — повтор не плодить дублікати
+    batch_id = ctx.params.get("batch_id")
+    if batch_id is None and data.event:
+        # до створення партії: невідомі події — помилка задачі без порожнього CodeBatch
+        missing = [] if data.allow_all else missing_event_ids(ctx.db, data.event_ids or [])
+        if missing:
+            raise ValueError(f"events_not_found:{missing}")
+        batch_id = create_code_batch(ctx.db, data.event, ctx.job.created_by)
+        ctx.params["batch_id"] = batch_id
+        ctx.db.execute(update(models.Job).where(models.Job.id == ctx.id).values(params=ctx.params))
+        ctx.db.commit()
+    attrs = attrs_from_create(data, batch_id)
+
+    done = ctx.resumed_progress
+    path = ctx.file_path(".csv")
+    with open(path, "a" if done else "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        if not done:
+            w.writerow(["code"])
+        ctx.set_result_file(path)
+        ctx.progress(done, data.amount)
+        for part in stream_new_codes(ctx.db, data.amount - done, attrs):
+            w.writerows([[plain] for _, plain in part])
+            fh.flush()
+            done += len(part)
+            ctx.progress(done)
+    return {"created": done, "batch_id": batch_id}
+
+# ───────────────────────── codes.import_csv ─────────────────────────
+@job_kind("codes.import_csv", roles=("super", "admin", "manager"))
+def import_csv(ctx: JobContext) -> dict:
+    """
+    Імпорт з файлу, збереженого API у jobs_dir. Повтор після рестарту безпечний:
+    вже вставлені рядки підуть у skipped як duplicate (ON CONFLICT DO NOTHING).
+    """
+    src = ctx.file_path(".input.csv")
+    opts = code_csv.CsvImportOptions(**(ctx.params.get("options") or {}))
+
+    with open(src, "rb") as fb:
+        total = sum(chunk.count(b"\n") for chunk in iter(lambda: fb.read(1 << 20), b""))
+    ctx.progress(0, total)
+
+    with open(src, "r", encoding="utf-8-sig", errors="ignore", newline="") as f:
+        result = code_csv.import_codes_csv(
+            ctx.db, f, opts,
+            admin_id=ctx.job.created_by,
+            on_batch=lambda line, created, skipped: ctx.progress(line),
+        )
+    ctx.progress(total)
+    if result.get("ok"):
+        src.unlink(missing_ok=True)
+    return result
+
+# ───────────────────────── codes.export_csv ─────────────────────────
+@job_kind("codes.export_csv", roles=("super", "admin", "manager", "support"))
+def export_csv(ctx: JobContext) -> dict:
+    q = ctx.params.get("q")
+    active = code_csv.parse_bool(ctx.params.get("active")) if ctx.params.get("active") not in (None, "") else None
+
+    total = code_csv.count_export_rows(ctx.db, q, active)
+    ctx.progress(0, total)
+    path = ctx.file_path(".csv")
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        for chunk in code_csv.iter_export_csv(ctx.db, q, active, on_batch=lambda n: ctx.progress(n)):
+            fh.write(chunk)
+        rows = ctx.job.progress
+    ctx.set_result_file(path)
+    return {"rows": rows}
+
+# ───────────────────────── codes.force_logout ─────────────────────────
+@job_kind("codes.force_logout", roles=("super", "admin", "manager"))
+def force_logout(ctx: JobContext) -> dict:
+    code_id = int(ctx.params["code_id"])
+    S = models.Session
+    base = select(S.id).where(S.code_id == code_id, S.active.is_(True))
+    total = ctx.db.execute(select(func.count()).select_from(base.subquery())).scalar_one()
+    ctx.progress(0, total)
+
+    terminated = 0
+    while True:
+        ids = ctx.db.execute(base.limit(FORCE_LOGOUT_PAGE)).scalars().all()
+        if not ids:
+            break
+        for sid in ids:
+            do_logout(ctx.db, sid)  # централізовано: revoke refresh + event + commit
+            publish_terminate(sid, reason="admin_force_logout")
+            terminated += 1
+        ctx.progress(terminated)
+
+    publish_admin_event({"type": "force_logout_all", "code_id": code_id, "count": terminated})
+    return {"terminated": terminated}
+
+# ───────────────────────── sessions.gc ─────────────────────────
+@job_kind("sessions.gc", roles=("super", "admin", "support"))
+def sessions_gc(ctx: JobContext) -> dict:
+    from backend.workers.session_gc import _gc_once
+
+    total = {"sessions": 0, "refresh": 0, "events": 0}
+    batch = int(getattr(settings, "gc_batch_size", 500)) or 500
+    while True:
+        stats = _gc_once(ctx.db, batch)
+        for k, v in stats.items():
+            total[k] += int(v)
+        ctx.progress(sum(total.values()))
+        if all(v == 0 for v in stats.values()):
+            break
+    return {"stats": total}
+
+# ───────────────────────── static.export_all ─────────────────────────
+@job_kind("static.export_all", roles=("super", "admin"))
+def static_export_all(ctx: JobContext) -> dict:
+    """Повний перезапис статичного експорту (після зміни розкладки/рантайму або втрати каталогу)."""
+    from backend.services.static_export import export_all, export_enabled
+
+    if not export_enabled():
+        return {"ok": False, "error": "static_export_disabled"}
+    return export_all(ctx.db, progress=ctx.progress)
+
+# ───────────────────────── ccu.rebuild_rollups ─────────────────────────
+@job_kind("ccu.rebuild_rollups", roles=("super", "admin"))
+def ccu_rebuild_rollups(ctx: JobContext) -> dict:
+    """
+    Перерахунок ролапів CCU за [since, until] (ISO; за замовчуванням — усе, що ще є в 1m) подобово.
+    Відра, чиє джерело вже прибрав ретеншн, не чіпаються. Після рестарту продовжує з progress.
+    """
+    from backend.services.metrics.ccu_rollups import RES_1D, RES_1H, RES_1M, RES_5M, retention_cutoff, rollup_range
+
+    now = datetime.now(timezone.utc)
+    until = _param_dt(ctx, "until") or now
+    since = _param_dt(ctx, "since") or retention_cutoff(RES_1M, now) or until - timedelta(days=365)
+    day0 = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, (until - day0).days + 1)
+
+    totals = {"5m": 0, "1h": 0, "1d": 0}
+    ctx.progress(ctx.resumed_progress, days)
+    for i in range(ctx.resumed_progress, days):
+        ctx.check_cancel()
+        start = day0 + timedelta(days=i)
+        written = rollup_range(ctx.db, start, start + timedelta(days=1, microseconds=-1), now=now)
+        ctx.db.commit()
+        for k, res in (("5m", RES_5M), ("1h", RES_1H), ("1d", RES_1D)):
+            totals[k] += written.get(res, 0)
+        ctx.progress(i + 1)
+    return {"days": days, "rows": totals}
+
+# ───────────────────────── analytics.rebuild_usage ─────────────────────────
+@job_kind("analytics.rebuild_usage", roles=("super",))
+def analytics_rebuild_usage(ctx: JobContext) -> dict:
+    """
+    Дорахунок ролапів code/event usage з sessions (після відновлення БД чи втрачених записів)
+    чанками по діапазону code_id, транзакція на чанк. Лише піднімає значення: історію сесій,
+    прибраних session_gc, з sessions не відновити. Після рестарту продовжує з progress.
+    """
+    from backend.services.metrics.usage import rebuild_usage
+
+    step = int(getattr(settings, "usage_rebuild_chunk", 1000)) or 1000
+    max_id = ctx.db.execute(select(func.max(models.AccessCode.id))).scalar() or 0
+    chunks = max(1, -(-int(max_id) // step))
+
+    rows = {"codes": 0, "event_codes": 0}
+    ctx.progress(ctx.resumed_progress, chunks)
+    for i in range(ctx.resumed_progress, chunks):
+        ctx.check_cancel()
+        written = rebuild_usage(ctx.db, i * step + 1, (i + 1) * step)
+        ctx.db.commit()
+        for k in rows:
+            rows[k] += written[k]
+        ctx.progress(i + 1)
+    return {"chunks": chunks, "rows": rows}
+
+# ───────────────────────── analytics.export_columnar ─────────────────────────
+def _columnar_unavailable() -> str | None:
+    from backend.services.columnar_export import export_available
+    return None if export_available() else "pyarrow_not_installed"
+
+@job_kind("analytics.export_columnar", roles=("super", "admin"), unavailable=_columnar_unavailable)
+def analytics_export_columnar(ctx: JobContext) -> dict:
+    """
+    Parquet/Arrow IPC вивантаження sessions, session_events, CCU і метаданих кодів/пакетів у zip.
+    params: format (parquet|arrow), since/until (ISO, [since, until)), event_id, tables (список).
+    Після рестарту починає з нуля — файл перезаписується.
+    """
+    from backend.database import SessionLocal
+    from backend.services.columnar_export import FORMATS, TABLES, ExportFilter, export_available, export_tables
+
+    if not export_available():
+        return {"ok": False, "error": "pyarrow_not_installed"}
+    fmt = str(ctx.params.get("format") or "parquet")
+    if fmt not in FORMATS:
+        return {"ok": False, "error": "unknown_format"}
+    tables = ctx.params.get("tables")
+    if tables is not None:
+        if not isinstance(tables, list) or not all(isinstance(t, str) for t in tables):
+            return {"ok": False, "error": "invalid_tables"}
+        unknown = sorted(set(tables) - set(TABLES))
+        if unknown:
+            return {"ok": False, "error": "unknown_tables", "tables": unknown}
+    event_id = ctx.params.get("event_id")
+    flt = ExportFilter(
+        since=_param_dt(ctx, "since"),
+        until=_param_dt(ctx, "until"),
+        event_id=int(event_id) if event_id not in (None, "") else None,
+    )
+
+    done = 0
+    ctx.progress(0)
+
+    def on_rows(n: int) -> None:
+        nonlocal done
+        done += n
+        ctx.progress(done)
+
+    path = ctx.file_path(".zip")
+    # читання — окрема сесія: ctx.progress комітить ctx.db, а серверний курсор коміт не переживає
+    with SessionLocal() as read_db:
+        manifest = export_tables(read_db, path, flt=flt, fmt=fmt, tables=tables, on_rows=on_rows)
+    ctx.set_result_file(path)
+    return {"rows": done, "tables": manifest["tables"], "format": fmt}
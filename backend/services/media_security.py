@@ -1,43 +1,95 @@
 # backend/services/media_security.py
 import hashlib
+import threading
 import time
 import base64
-from urllib.parse import urljoin
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import quote, urljoin
 from backend.core.config import settings
 
+# Кеш підписаних URL: (path, directory) → (expires, url). Поки відро expires те саме,
+# URL ідентичний для всіх глядачів — підпис рахується раз на відро, а CDN кешує маніфест.
+_SIGNED_MAX = 1024
+_signed_lock = threading.Lock()
+_signed: "OrderedDict[Tuple[str, bool], Tuple[int, str]]" = OrderedDict()
+
+def _bucketed_expires(expire_seconds: int, now: Optional[float] = None) -> int:
+    """now + ttl, округлене ВГОРУ до межі відра: токен живе не менше ttl і не більше ttl + bucket."""
+    bucket = max(1, int(getattr(settings, "bunny_token_bucket_seconds", 600) or 1))
+    target = int(now if now is not None else time.time()) + expire_seconds
+    return -(-target // bucket) * bucket
+
+def _b64url(digest: bytes) -> str:
+    return base64.b64encode(digest).decode("utf-8") \
+        .replace("\n", "") \
+        .replace("+", "-") \
+        .replace("/", "_") \
+        .replace("=", "")
+
+def _token_dir(path: str) -> str:
+    """'/video-123/playlist.m3u8' → '/video-123/' (каталог, який покриває токен)."""
+    head = path.rsplit("/", 1)[0] if "/" in path else ""
+    return f"/{head}/" if head else "/"
+
 class BunnySecurityService:
     @staticmethod
-    def generate_signed_url(video_path: str, expire_seconds: int = 10800) -> str:
+    def sign_path(path: str, expires: int, directory: bool = False) -> str:
+        """
+        Підписує шлях без кешу.
+
+        directory=False — базовий токен Bunny: md5(key + path + expires), ?token=&expires=.
+        directory=True  — токен із token_path (sha256): токен вшитий у шлях
+            (/bcdn_token=…&expires=…&token_path=…/dir/file), тож відносні URL сегментів
+            у плейлисті успадковують його і CDN пропускає весь каталог.
+        """
+        path = path.strip("/")
+        if not directory:
+            # Формування токена: md5(securityKey + path + expires)
+            token_content = f"{settings.bunny_security_key}{path}{expires}"
+            token = _b64url(hashlib.md5(token_content.encode("utf-8")).digest())
+            base_url = urljoin(settings.bunny_pull_zone_host, path)
+            return f"{base_url}?token={token}&expires={expires}"
+
+        token_path = _token_dir(path)
+        # hashable base: key + signature_path + expires + відсортовані параметри (неекрановані)
+        hashable = f"{settings.bunny_security_key}{token_path}{expires}token_path={token_path}"
+        token = _b64url(hashlib.sha256(hashable.encode("utf-8")).digest())
+        host = settings.bunny_pull_zone_host.rstrip("/")
+        return f"{host}/bcdn_token={token}&expires={expires}&token_path={quote(token_path, safe='')}/{path}"
+
+    @staticmethod
+    def generate_signed_url(video_path: str, expire_seconds: Optional[int] = None) -> str:
         """
         Генерує підписаний URL для Bunny CDN.
         
         :param video_path: Шлях до файлу або папки (наприклад, '/video-123/playlist.m3u8')
-        :param expire_seconds: Час життя посилання в секундах (за замовчуванням 3 години)
+        :param expire_seconds: Мінімальний час життя посилання в секундах
+            (за замовчуванням bunny_token_ttl_seconds, 3 години); expires округлюється до відра
         """
         
         # Якщо ключі не задані, повертаємо шлях як є (fallback)
         if not settings.bunny_security_key or not settings.bunny_pull_zone_host:
             return video_path
-        
-        # Видаляємо слеш на початку для коректної конкатенації
-        path = video_path.strip("/")
-        
-        expires = int(time.time()) + expire_seconds
-        
-        # Формування токена: sha256(securityKey + path + expires)
-        token_content = f"{settings.bunny_security_key}{path}{expires}"
-        
-        md5_hash = hashlib.md5(token_content.encode('utf-8')).digest()
-        token = base64.b64encode(md5_hash).decode('utf-8') \
-            .replace("\n", "") \
-            .replace("+", "-") \
-            .replace("/", "_") \
-            .replace("=", "")
-
-        # Формування фінального URL
-        base_url = urljoin(settings.bunny_pull_zone_host, path)
-        signed_url = f"{base_url}?token={token}&expires={expires}"
-        
+
+        if expire_seconds is None:
+            expire_seconds = int(getattr(settings, "bunny_token_ttl_seconds", 10800))
+        directory = bool(getattr(settings, "bunny_token_directory", False))
+        expires = _bucketed_expires(expire_seconds)
+        key = (video_path, directory)
+
+        with _signed_lock:
+            hit = _signed.get(key)
+            if hit is not None and hit[0] == expires:
+                _signed.move_to_end(key)
+                return hit[1]
+
+        signed_url = BunnySecurityService.sign_path(video_path, expires, directory=directory)
+        with _signed_lock:
+            _signed[key] = (expires, signed_url)
+            _signed.move_to_end(key)
+            while len(_signed) > _SIGNED_MAX:
+                _signed.popitem(last=False)
         return signed_url
 
     @staticmethod
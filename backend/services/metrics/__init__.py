@@ -0,0 +1 @@
+# backend/services/metrics/__init__.py
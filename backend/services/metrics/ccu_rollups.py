@@ -0,0 +1,201 @@
+# backend/services/metrics/ccu_rollups.py
+# Даунсемплінг рядів CCU: 1m (ccu_minutely / event_ccu_minutely) → 5m → 1h → 1d у ccu_rollups.
+# Відро рахується з попередньої роздільності (min мінімумів, max максимумів, суми сум і кількостей),
+# тож avg точний на будь-якому рівні. Кожна роздільність має власний ретеншн; відра, чиє джерело
+# вже частково видалене, не перераховуються — інакше повтор затер би їх неповними даними.
+from __future__ import annotations
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import BigInteger, Integer, and_, cast, delete, exists, func, literal, select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import settings
+from backend.services.metrics.ccu_series import _upsert
+
+__all__ = [
+    "GLOBAL_SERIES",
+    "RES_1D",
+    "RES_1H",
+    "RES_1M",
+    "RES_5M",
+    "RESOLUTIONS",
+    "apply_retention",
+    "ccu_series",
+    "pick_resolution",
+    "retention_cutoff",
+    "rollup_range",
+]
+
+RES_1M, RES_5M, RES_1H, RES_1D = 60, 300, 3600, 86400
+RESOLUTIONS = (RES_1M, RES_5M, RES_1H, RES_1D)
+_SOURCE = {RES_5M: RES_1M, RES_1H: RES_5M, RES_1D: RES_1H}
+# event_id ряду ccu_minutely у ccu_rollups
+GLOBAL_SERIES = 0
+_UPSERT_CHUNK = 1000
+_ROLLUP_COLS = ("ccu_min", "ccu_max", "ccu_sum", "samples")
+
+def _utc(ts: datetime) -> datetime:
+    # SQLite повертає naive (UTC), Postgres — aware
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _floor(ts: datetime, res: int) -> datetime:
+    epoch = int(_utc(ts).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % res, tz=timezone.utc)
+
+def retention_cutoff(res: int, now: datetime) -> Optional[datetime]:
+    """Найстаріша мітка, що ще зберігається на цій роздільності; None — без обмеження."""
+    days = int({
+        RES_1M: getattr(settings, "ccu_retention_1m_days", 14),
+        RES_5M: getattr(settings, "ccu_retention_5m_days", 90),
+        RES_1H: getattr(settings, "ccu_retention_1h_days", 730),
+        RES_1D: getattr(settings, "ccu_retention_1d_days", 0),
+    }[res] or 0)
+    return _utc(now) - timedelta(days=days) if days > 0 else None
+
+def _bucket(db: DB, col, res: int):
+    """Номер відра (epoch // res) на боці БД — одна агрегація на весь діапазон."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return cast(func.floor(func.extract("epoch", col) / res), BigInteger)
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", col), Integer) // res
+    raise NotImplementedError(f"ccu bucket: {dialect}")
+
+# ───────────────────────── запис ─────────────────────────
+def _source_rows(db: DB, res: int, start: datetime, end: datetime) -> List[dict]:
+    src = _SOURCE[res]
+    if src == RES_1M:
+        G, T = models.CCUMinutely, models.EventCCUMinutely
+        b_g, b_t = _bucket(db, G.ts, res), _bucket(db, T.ts, res)
+        stmts = [
+            select(literal(GLOBAL_SERIES), b_g, func.min(G.ccu), func.max(G.ccu), func.sum(G.ccu), func.count())
+            .where(G.ts >= start, G.ts < end).group_by(b_g),
+            select(T.event_id, b_t, func.min(T.ccu), func.max(T.ccu), func.sum(T.ccu), func.count())
+            .where(T.ts >= start, T.ts < end).group_by(T.event_id, b_t),
+        ]
+    else:
+        R = models.CCURollup
+        b = _bucket(db, R.ts, res)
+        stmts = [
+            select(R.event_id, b, func.min(R.ccu_min), func.max(R.ccu_max), func.sum(R.ccu_sum), func.sum(R.samples))
+            .where(R.resolution == src, R.ts >= start, R.ts < end).group_by(R.event_id, b),
+        ]
+    rows = []
+    for stmt in stmts:
+        for event_id, bucket, lo, hi, total, samples in db.execute(stmt):
+            rows.append({
+                "event_id": int(event_id),
+                "resolution": res,
+                "ts": datetime.fromtimestamp(int(bucket) * res, tz=timezone.utc),
+                "ccu_min": int(lo or 0),
+                "ccu_max": int(hi or 0),
+                "ccu_sum": int(total or 0),
+                "samples": int(samples or 0),
+            })
+    return rows
+
+def rollup_range(db: DB, since: datetime, until: datetime, now: Optional[datetime] = None) -> Dict[int, int]:
+    """
+    Перераховує всі відра 5m/1h/1d, що перетинають [since, until], по черзі від дрібних до грубих.
+    Відкрите (поточне) відро теж пишеться — його перезапише наступний виклик. Коміт — на викликачі.
+    Повертає {resolution: кількість upsert-нутих рядів}.
+    """
+    now = _utc(now or datetime.now(timezone.utc))
+    written: Dict[int, int] = {}
+    for res in RESOLUTIONS[1:]:
+        start = _floor(since, res)
+        end = _floor(until, res) + timedelta(seconds=res)
+        cutoff = retention_cutoff(_SOURCE[res], now)
+        if cutoff is not None and start < cutoff:
+            # перше відро, повністю покрите джерелом
+            start = _floor(cutoff - timedelta(microseconds=1), res) + timedelta(seconds=res)
+        if start >= end:
+            written[res] = 0
+            continue
+        rows = _source_rows(db, res, start, end)
+        for i in range(0, len(rows), _UPSERT_CHUNK):
+            _upsert(db, models.CCURollup, rows[i:i + _UPSERT_CHUNK], ["event_id", "resolution", "ts"], _ROLLUP_COLS)
+        written[res] = len(rows)
+    return written
+
+def apply_retention(db: DB, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Видаляє точки старші за ретеншн своєї роздільності і ролапи видалених івентів. Коміт — на викликачі."""
+    now = _utc(now or datetime.now(timezone.utc))
+    R = models.CCURollup
+    removed: Dict[str, int] = {}
+    cutoff = retention_cutoff(RES_1M, now)
+    if cutoff is not None:
+        removed["1m"] = (
+            db.execute(delete(models.CCUMinutely).where(models.CCUMinutely.ts < cutoff)).rowcount
+            + db.execute(delete(models.EventCCUMinutely).where(models.EventCCUMinutely.ts < cutoff)).rowcount
+        )
+    for res, name in ((RES_5M, "5m"), (RES_1H, "1h"), (RES_1D, "1d")):
+        cutoff = retention_cutoff(res, now)
+        if cutoff is not None:
+            removed[name] = db.execute(delete(R).where(R.resolution == res, R.ts < cutoff)).rowcount
+    # FK немає (глобальний ряд — event_id=0), тож ролапи видалених івентів прибираємо тут
+    removed["orphans"] = db.execute(
+        delete(R).where(
+            R.event_id != GLOBAL_SERIES,
+            ~exists().where(models.Event.id == R.event_id),
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    return removed
+
+# ───────────────────────── читання ─────────────────────────
+def pick_resolution(since: datetime, until: datetime, max_points: int, now: Optional[datetime] = None) -> int:
+    """
+    Найдрібніша роздільність, що вкладається в max_points і ще зберігається від since,
+    тобто найгрубша з потрібних; якщо жодна не підходить — 1d.
+    """
+    now = _utc(now or datetime.now(timezone.utc))
+    span = max(0.0, (_utc(until) - _utc(since)).total_seconds())
+    for res in RESOLUTIONS:
+        cutoff = retention_cutoff(res, now)
+        if cutoff is not None and _utc(since) < cutoff:
+            continue
+        # +1 — відро, в яке потрапляє вирівняний вниз since
+        if math.floor(span / res) + 1 <= max_points:
+            return res
+    return RES_1D
+
+def ccu_series(
+    db: DB,
+    event_id: int = GLOBAL_SERIES,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    max_points: int = 500,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Ряд CCU (event_id=0 — глобальний) з автоматичним вибором роздільності.
+    Точки — {ts, min, avg, max}; на 1m min=avg=max=ccu. За замовчуванням — остання доба.
+    """
+    now = _utc(now or datetime.now(timezone.utc))
+    until = _utc(until) if until else now
+    since = _utc(since) if since else until - timedelta(days=1)
+    res = pick_resolution(since, until, max_points, now)
+
+    if res == RES_1M:
+        T = models.CCUMinutely if event_id == GLOBAL_SERIES else models.EventCCUMinutely
+        stmt = select(T.ts, T.ccu).where(T.ts >= since, T.ts <= until)
+        if event_id != GLOBAL_SERIES:
+            stmt = stmt.where(T.event_id == event_id)
+        rows = db.execute(stmt.order_by(T.ts.asc()).limit(max_points))
+        points = [{"ts": _utc(ts), "min": ccu, "avg": float(ccu), "max": ccu} for ts, ccu in rows]
+    else:
+        R = models.CCURollup
+        stmt = (
+            select(R.ts, R.ccu_min, R.ccu_sum, R.samples, R.ccu_max)
+            .where(and_(R.event_id == event_id, R.resolution == res, R.ts >= _floor(since, res), R.ts <= until))
+            .order_by(R.ts.asc())
+            .limit(max_points)
+        )
+        points = [
+            {"ts": _utc(ts), "min": lo, "avg": (total / samples) if samples else 0.0, "max": hi}
+            for ts, lo, total, samples, hi in db.execute(stmt)
+        ]
+    return {"event_id": event_id, "resolution": res, "since": since, "until": until, "points": points}
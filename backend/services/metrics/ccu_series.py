@@ -0,0 +1,87 @@
+# backend/services/metrics/ccu_series.py
+# Ряди CCU: глобальний (ccu_minutely) і по івентах (event_ccu_minutely, PK (event_id, ts)).
+# Запис — один multi-row upsert на хвилину; повтор тієї ж хвилини перезаписує значення.
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+
+__all__ = [
+    "event_ccu_peaks",
+    "event_ccu_series",
+    "write_ccu_sample",
+]
+
+def _dialect_insert(db: DB):
+    """insert() з on_conflict_do_update для поточного діалекту."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"metrics upsert: {dialect}")
+    return dialect_insert
+
+def _upsert(db: DB, model, rows: List[dict], keys: List[str], update: Sequence[str] = ("ccu",)) -> None:
+    stmt = _dialect_insert(db)(model).values(rows)
+    db.execute(stmt.on_conflict_do_update(index_elements=keys, set_={c: stmt.excluded[c] for c in update}))
+
+def write_ccu_sample(db: DB, ts: datetime, total: int, per_event: Dict[int, int]) -> int:
+    """Пише знімок хвилини ts; повертає кількість рядів івентів. Коміт — на викликачі."""
+    _upsert(db, models.CCUMinutely, [{"ts": ts, "ccu": int(total)}], ["ts"])
+    if not per_event:
+        return 0
+    # видалені івенти (FK) не пишемо — їхні ZSET-и доживають TTL
+    known = set(db.execute(
+        select(models.Event.id).where(models.Event.id.in_(list(per_event)))
+    ).scalars())
+    rows = [{"event_id": eid, "ts": ts, "ccu": int(n)} for eid, n in sorted(per_event.items()) if eid in known]
+    if rows:
+        _upsert(db, models.EventCCUMinutely, rows, ["event_id", "ts"])
+    return len(rows)
+
+def event_ccu_series(
+    db: DB,
+    event_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 1440,
+    order: str = "asc",
+) -> List[models.EventCCUMinutely]:
+    T = models.EventCCUMinutely
+    stmt = select(T).where(T.event_id == event_id)
+    if since:
+        stmt = stmt.where(T.ts >= since)
+    if until:
+        stmt = stmt.where(T.ts <= until)
+    stmt = stmt.order_by(T.ts.asc() if order == "asc" else T.ts.desc()).limit(limit)
+    return list(db.execute(stmt).scalars())
+
+def event_ccu_peaks(
+    db: DB,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """Пік і середнє CCU по кожному івенту за діапазон — для зведення «які івенти дивились»."""
+    T = models.EventCCUMinutely
+    stmt = select(
+        T.event_id,
+        func.max(T.ccu).label("peak"),
+        func.avg(T.ccu).label("avg"),
+        func.count().label("minutes"),
+    ).group_by(T.event_id)
+    if since:
+        stmt = stmt.where(T.ts >= since)
+    if until:
+        stmt = stmt.where(T.ts <= until)
+    stmt = stmt.order_by(func.max(T.ccu).desc()).limit(limit)
+    return [
+        {"event_id": r.event_id, "peak": int(r.peak or 0), "avg": float(r.avg or 0), "minutes": int(r.minutes)}
+        for r in db.execute(stmt)
+    ]
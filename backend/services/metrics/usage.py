@@ -0,0 +1,208 @@
+# backend/services/metrics/usage.py
+# Інкрементальні ролапи використання: code_usage і event_code_usage. Пишуться в тій самій
+# транзакції, що й сесія (логін, heartbeat, логаут), атомарними upsert-ами «col = col + excluded.col»
+# по рядку коду — у кожного коду свій рядок, тож heartbeat-и різних глядачів не чекають один одного.
+# Підсумки пакета/івенту — агрегат цих рядків при читанні (індекси за batch_id / event_id):
+# сканується число кодів, а не sessions; codes_used — рядки з sessions > 0.
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.services.metrics.ccu_series import _dialect_insert
+
+__all__ = [
+    "batch_usage",
+    "event_codes",
+    "event_usage",
+    "rebuild_usage",
+    "record_event_bind",
+    "record_login",
+    "record_watch",
+]
+
+def _inc(db: DB, model, keys: Dict[str, int], incs: Dict[str, int], sets: Optional[dict] = None,
+         insert_only: Optional[dict] = None) -> None:
+    """Upsert з інкрементом лічильників."""
+    table = model.__table__
+    stmt = _dialect_insert(db)(model).values({**keys, **incs, **(sets or {}), **(insert_only or {})})
+    update = {c: table.c[c] + stmt.excluded[c] for c in incs}
+    update.update({c: stmt.excluded[c] for c in (sets or {})})
+    db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=update))
+
+# ───────────────────────── запис ─────────────────────────
+def record_event_bind(db: DB, *, code_id: int, event_id: int) -> None:
+    """Сесія прив'язалась до івенту (логін з event_id або перший heartbeat). Коміт — на викликачі."""
+    _inc(db, models.EventCodeUsage, {"event_id": event_id, "code_id": code_id}, {"sessions": 1})
+
+def record_login(db: DB, *, code_id: int, batch_id: Optional[int], event_id: Optional[int], at: datetime) -> None:
+    """Нова сесія коду. Коміт — на викликачі (разом із самою сесією)."""
+    _inc(
+        db, models.CodeUsage, {"code_id": code_id}, {"sessions": 1},
+        sets={"batch_id": batch_id, "last_login_at": at}, insert_only={"first_login_at": at},
+    )
+    if event_id is not None:
+        record_event_bind(db, code_id=code_id, event_id=event_id)
+
+def record_watch(db: DB, *, code_id: Optional[int], event_id: Optional[int], seconds: int, bytes_out: int = 0) -> None:
+    """Приріст часу перегляду/трафіку сесії. Коміт — на викликачі."""
+    if not code_id or (seconds <= 0 and bytes_out <= 0):
+        return
+    incs = {"watch_seconds": int(seconds), "bytes_out": int(bytes_out)}
+    # AccessCode уже в identity map (heartbeat/логаут його читають) — без додаткового SELECT
+    code = db.get(models.AccessCode, code_id)
+    batch_id = getattr(code, "batch_id", None)
+    # сесії, створені до ролапів, мають sessions=0 у новому рядку — лічильник логінів не чіпаємо
+    _inc(db, models.CodeUsage, {"code_id": code_id}, {**incs, "sessions": 0}, sets={"batch_id": batch_id})
+    if event_id is not None:
+        _inc(db, models.EventCodeUsage, {"event_id": event_id, "code_id": code_id}, {**incs, "sessions": 0})
+
+_COUNTERS = ("sessions", "watch_seconds", "bytes_out")
+
+def _greatest(db: DB, current, rebuilt):
+    # SQLite: багатоаргументні max()/min() — скалярні аналоги GREATEST/LEAST
+    fn = func.max if db.get_bind().dialect.name == "sqlite" else func.greatest
+    return fn(current, rebuilt)
+
+def _least(db: DB, current, rebuilt):
+    fn = func.min if db.get_bind().dialect.name == "sqlite" else func.least
+    return fn(func.coalesce(current, rebuilt), rebuilt)
+
+def rebuild_usage(db: DB, code_from: int, code_to: int) -> Dict[str, int]:
+    """
+    Дорахунок ролапів кодів [code_from, code_to] з sessions (після відновлення БД чи втрачених записів).
+    session_gc видаляє старі неактивні сесії, тож sessions — лише нижня межа історії коду: значення
+    тільки піднімаються (GREATEST, first_login_at — LEAST), накопичене ролапами не зменшується.
+    Рядки діапазону спершу створюються (якщо їх ще нема) і блокуються, тож логіни/heartbeat-и під час
+    перерахунку чекають на коміт чанку і додають свій приріст поверх нього. Коміт — на викликачі.
+    """
+    S, C = models.Session, models.AccessCode
+    CU, ECU = models.CodeUsage, models.EventCodeUsage
+    ins = _dialect_insert(db)
+    in_range = S.code_id.between(code_from, code_to)
+    watch = (func.coalesce(func.sum(S.watch_seconds), 0), func.coalesce(func.sum(S.bytes_out), 0))
+
+    keys = select(S.code_id, C.batch_id).join(C, C.id == S.code_id).where(in_range).distinct()
+    db.execute(ins(CU).from_select(["code_id", "batch_id"], keys).on_conflict_do_nothing())
+    db.execute(select(CU.code_id).where(CU.code_id.between(code_from, code_to)).with_for_update())
+    stmt = ins(CU).from_select(
+        ["code_id", "batch_id", "sessions", "watch_seconds", "bytes_out", "first_login_at", "last_login_at"],
+        select(S.code_id, C.batch_id, func.count(), *watch, func.min(S.created_at), func.max(S.created_at))
+        .join(C, C.id == S.code_id).where(in_range).group_by(S.code_id, C.batch_id),
+    )
+    codes = db.execute(stmt.on_conflict_do_update(
+        index_elements=["code_id"],
+        set_={
+            "batch_id": stmt.excluded.batch_id,
+            **{c: _greatest(db, CU.__table__.c[c], stmt.excluded[c]) for c in _COUNTERS},
+            "first_login_at": _least(db, CU.first_login_at, stmt.excluded.first_login_at),
+            "last_login_at": _greatest(db, func.coalesce(CU.last_login_at, stmt.excluded.last_login_at),
+                                       stmt.excluded.last_login_at),
+        },
+    )).rowcount
+
+    bound = in_range & S.event_id.is_not(None)
+    db.execute(ins(ECU).from_select(
+        ["event_id", "code_id"], select(S.event_id, S.code_id).where(bound).distinct(),
+    ).on_conflict_do_nothing())
+    db.execute(select(ECU.event_id).where(ECU.code_id.between(code_from, code_to)).with_for_update())
+    stmt = ins(ECU).from_select(
+        ["event_id", "code_id", "sessions", "watch_seconds", "bytes_out"],
+        select(S.event_id, S.code_id, func.count(), *watch).where(bound).group_by(S.event_id, S.code_id),
+    )
+    event_codes = db.execute(stmt.on_conflict_do_update(
+        index_elements=["event_id", "code_id"],
+        set_={c: _greatest(db, ECU.__table__.c[c], stmt.excluded[c]) for c in _COUNTERS},
+    )).rowcount
+    return {"codes": int(codes or 0), "event_codes": int(event_codes or 0)}
+
+# ───────────────────────── читання ─────────────────────────
+def _totals(model):
+    """Агрегати по рядках ролапу; codes_used — коди з хоча б одним логіном (база для доходу)."""
+    return (
+        func.coalesce(func.sum(model.sessions), 0).label("sessions"),
+        func.coalesce(func.sum(case((model.sessions > 0, 1), else_=0)), 0).label("codes_used"),
+        func.coalesce(func.sum(model.watch_seconds), 0).label("watch_seconds"),
+        func.coalesce(func.sum(model.bytes_out), 0).label("bytes_out"),
+    )
+
+def batch_usage(
+    db: DB,
+    *,
+    batch_id: Optional[int] = None,
+    event_id: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[dict]:
+    B, CU = models.CodeBatch, models.CodeUsage
+    stmt = select(B)
+    if batch_id is not None:
+        stmt = stmt.where(B.id == batch_id)
+    if event_id is not None:
+        stmt = stmt.where(B.event_id == event_id)
+    batches = list(db.execute(stmt.order_by(B.id.desc()).limit(limit).offset(offset)).scalars())
+    if not batches:
+        return []
+    # агрегуємо лише коди пакетів цієї сторінки (ix_code_usage_batch_id)
+    totals = {
+        r.batch_id: r for r in db.execute(
+            select(CU.batch_id, *_totals(CU), func.max(CU.last_login_at).label("last_login_at"))
+            .where(CU.batch_id.in_([b.id for b in batches])).group_by(CU.batch_id)
+        )
+    }
+    out = []
+    for b in batches:
+        t = totals.get(b.id)
+        codes_used = int(t.codes_used) if t else 0
+        out.append({
+            "batch_id": b.id,
+            "label": b.label,
+            "event_id": b.event_id,
+            "price_uah": b.price_uah,
+            "sessions": int(t.sessions) if t else 0,
+            "codes_used": codes_used,
+            # дохід — активовані (хоч раз використані) коди × ціна пакета
+            "revenue_uah": codes_used * int(b.price_uah or 0),
+            "watch_seconds": int(t.watch_seconds) if t else 0,
+            "bytes_out": int(t.bytes_out) if t else 0,
+            "last_login_at": t.last_login_at if t else None,
+        })
+    return out
+
+def event_usage(db: DB, event_id: int) -> dict:
+    """Підсумки івенту (сума event_code_usage) + дохід по його пакетах (використані коди × price_uah)."""
+    ECU, CU, B = models.EventCodeUsage, models.CodeUsage, models.CodeBatch
+    t = db.execute(select(*_totals(ECU)).where(ECU.event_id == event_id)).one()
+    revenue, batches_used = db.execute(
+        select(func.coalesce(func.sum(func.coalesce(B.price_uah, 0)), 0), func.count(func.distinct(B.id)))
+        .select_from(CU).join(B, B.id == CU.batch_id)
+        .where(B.event_id == event_id, CU.sessions > 0)
+    ).one()
+    return {
+        "event_id": event_id,
+        "sessions": int(t.sessions),
+        "codes_used": int(t.codes_used),
+        "watch_seconds": int(t.watch_seconds),
+        "bytes_out": int(t.bytes_out),
+        "revenue_uah": int(revenue or 0),
+        "batches": int(batches_used or 0),
+    }
+
+def event_codes(db: DB, event_id: int, *, limit: int = 100, offset: int = 0) -> List[dict]:
+    """Коди, що дивились івент, за спаданням часу перегляду."""
+    ECU, C = models.EventCodeUsage, models.AccessCode
+    stmt = (
+        select(ECU.code_id, C.code_plain, C.batch_id, ECU.sessions, ECU.watch_seconds, ECU.bytes_out)
+        .join(C, C.id == ECU.code_id)
+        .where(ECU.event_id == event_id)
+        .order_by(ECU.watch_seconds.desc(), ECU.code_id)
+        .limit(limit).offset(offset)
+    )
+    return [
+        {"code_id": r.code_id, "code_plain": r.code_plain, "batch_id": r.batch_id, "sessions": int(r.sessions),
+         "watch_seconds": int(r.watch_seconds), "bytes_out": int(r.bytes_out)}
+        for r in db.execute(stmt)
+    ]
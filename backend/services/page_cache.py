@@ -0,0 +1,57 @@
+# backend/services/page_cache.py
+# Кеш відрендерених сторінок івентів (PageShell): документ на хеш-CSP однаковий для всіх
+# глядачів, тому рендериться один раз на (івент, etag, режим) і віддається як є.
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple, TypeVar
+
+__all__ = [
+    "get_or_build",
+    "invalidate_event_page",
+    "cache_stats",
+]
+
+MAX_ENTRIES = 512
+
+T = TypeVar("T")
+
+# ───────────────────────── in-process LRU ─────────────────────────
+_lock = threading.Lock()
+_store: "OrderedDict[Hashable, object]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def get_or_build(key: Tuple[Hashable, ...], build: Callable[[], T]) -> T:
+    """
+    key[0] — event_id (для інвалідації), далі — усе, від чого залежить документ
+    (etag, режим, поля івенту). Зміна івенту дає новий ключ — інші воркери не
+    віддадуть застарілого навіть без явної інвалідації.
+    """
+    with _lock:
+        tpl = _store.get(key)
+        if tpl is not None:
+            _store.move_to_end(key)
+            _stats["hits"] += 1
+            return tpl  # type: ignore[return-value]
+        _stats["misses"] += 1
+    tpl = build()
+    with _lock:
+        _store[key] = tpl
+        _store.move_to_end(key)
+        while len(_store) > MAX_ENTRIES:
+            _store.popitem(last=False)
+    return tpl
+
+def invalidate_event_page(event_id: Optional[int] = None) -> None:
+    """Прибирає всі варіанти сторінки івенту (None — весь кеш)."""
+    with _lock:
+        if event_id is None:
+            _store.clear()
+        else:
+            for k in [k for k in _store if k[0] == event_id]:
+                del _store[k]
+        _stats["invalidations"] += 1
+
+def cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_store)}
@@ -0,0 +1,145 @@
+# backend/services/page_compiler.py
+# Компіляція асетів сторінки івенту при збереженні/публікації: санітизація HTML один раз,
+# мініфікація CSS/JS, контентні хеші. Рендер і /event-assets читають уже готові артефакти.
+from __future__ import annotations
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import object_session
+
+from backend import models
+from backend.core.config import settings
+from backend.services.sanitizer import strip_scripts_and_inline_handlers
+
+try:
+    import rjsmin  # опційно: безпечна мініфікація JS (без перейменувань)
+except Exception:  # pragma: no cover
+    rjsmin = None  # type: ignore[assignment]
+
+try:
+    import rcssmin  # опційно: повноцінний мініфікатор CSS
+except Exception:  # pragma: no cover
+    rcssmin = None  # type: ignore[assignment]
+
+__all__ = [
+    "CompiledPage",
+    "compile_page",
+    "compile_event",
+    "content_hash",
+    "minify_css",
+    "minify_js",
+    "user_js_path",
+]
+
+HASH_LEN = 16  # hex-символів sha256 у імені файлу — 64 біти, колізії практично неможливі
+
+def content_hash(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:HASH_LEN]
+
+# рядки й коментарі — окремими токенами, щоб не чіпати пробіли всередині рядків
+_CSS_SPLIT_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)""", re.DOTALL)
+# пробіли навколо цих символів у CSS незначущі (':' — лише ПІСЛЯ, бо «a :hover» ≠ «a:hover»)
+_CSS_TIGHT_RE = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON_RE = re.compile(r":\s+")
+
+def _tighten(plain: str) -> str:
+    plain = re.sub(r"\s+", " ", plain)
+    plain = _CSS_TIGHT_RE.sub(r"\1", plain)
+    # тут — лише текст поза рядками: «content:";}"» не зачепить
+    return _CSS_COLON_RE.sub(":", plain).replace(";}", "}")
+
+def _minify_css_builtin(css: str) -> str:
+    out: list[str] = []
+    buf: list[str] = []
+    for i, part in enumerate(_CSS_SPLIT_RE.split(css)):
+        if i % 2 == 0:
+            buf.append(part)
+        elif part.startswith("/*"):
+            buf.append(" ")
+        else:
+            out.append(_tighten("".join(buf))); buf = []
+            out.append(part)
+    out.append(_tighten("".join(buf)))
+    return "".join(out).strip()
+
+def minify_css(css: Optional[str]) -> str:
+    if not css or not css.strip():
+        return ""
+    if rcssmin is not None:
+        return rcssmin.cssmin(css).strip()
+    return _minify_css_builtin(css)
+
+def minify_js(js: Optional[str]) -> str:
+    """Без rjsmin — лише обрізка: власний «мініфікатор» JS без парсера небезпечний (ASI, regex-літерали)."""
+    if not js or not js.strip():
+        return ""
+    if rjsmin is not None:
+        return rjsmin.jsmin(js).strip()
+    return js.strip()
+
+@dataclass(frozen=True)
+class CompiledPage:
+    html: str
+    css: str
+    js: str
+    js_hash: str
+    hash: str  # хеш усіх трьох артефактів — версія сторінки
+
+def compile_page(html: Optional[str], css: Optional[str], js: Optional[str]) -> CompiledPage:
+    c_html = strip_scripts_and_inline_handlers(html or "").strip()
+    c_css = minify_css(css)
+    c_js = minify_js(js)
+    js_hash = content_hash(c_js)
+    return CompiledPage(
+        html=c_html,
+        css=c_css,
+        js=c_js,
+        js_hash=js_hash,
+        hash=content_hash("\x00".join((c_html, c_css, js_hash))),
+    )
+
+# CDN тримає оболонку s-maxage, а при збоях origin — ще stale-if-error (див. client/event_page.py)
+_STALE_IF_ERROR_SECONDS = 86400
+
+def _user_js_history_ttl() -> timedelta:
+    cdn = int(getattr(settings, "page_shell_cdn_max_age_seconds", 86400))
+    return timedelta(seconds=cdn + _STALE_IF_ERROR_SECONDS)
+
+def _remember_user_js(ev, js_hash: str, js: str) -> None:
+    """
+    Зберігає попередню версію user.js: закешована оболонка посилається на неї
+    з SRI, тож /user.{hash}.js мусить віддавати саме ці байти, поки оболонка жива.
+    """
+    db = object_session(ev)
+    if db is None or ev.id is None:
+        return
+    now = datetime.now(timezone.utc)
+    db.merge(models.EventUserJs(event_id=ev.id, js_hash=js_hash, js=js, created_at=now))
+    db.execute(
+        delete(models.EventUserJs).where(
+            models.EventUserJs.event_id == ev.id,
+            models.EventUserJs.created_at < now - _user_js_history_ttl(),
+        )
+    )
+
+def compile_event(ev) -> CompiledPage:
+    """Компілює page_* івенту в compiled_* (без коміту); попередній user.js іде в історію."""
+    prev_hash, prev_js = ev.compiled_js_hash, ev.compiled_js
+    page = compile_page(ev.page_html, ev.page_css, ev.page_js)
+    if prev_hash and prev_hash != page.js_hash and prev_js is not None:
+        _remember_user_js(ev, prev_hash, prev_js)
+    ev.compiled_html = page.html
+    ev.compiled_css = page.css
+    ev.compiled_js = page.js
+    ev.compiled_js_hash = page.js_hash
+    ev.compiled_hash = page.hash
+    ev.compiled_at = datetime.now(timezone.utc)
+    return page
+
+def user_js_path(event_id: int, js_hash: str) -> str:
+    """Контентно-адресований URL user.js — immutable, без ревалідації."""
+    return f"/event-assets/{event_id}/user.{js_hash}.js"
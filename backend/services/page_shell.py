@@ -0,0 +1,262 @@
+# backend/services/page_shell.py
+# HTML-документ сторінки івенту. Два режими:
+#  - nonce: CSP з per-request nonce (документ різний на кожен запит);
+#  - shell: CSP на хешах + SRI на зовнішні скрипти — документ однаковий для всіх глядачів,
+#    per-viewer дані (підписаний URL, Mux) рантайм бере з /api/events/{id}/boot.
+from __future__ import annotations
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from backend import models
+from backend.services.csp import build_csp_headers, csp_hash, sri_hash
+from backend.services.etag import calc_payload_etag, set_etag_header
+from backend.services.media_security import BunnySecurityService
+from backend.services.page_compiler import user_js_path
+from backend.services.runtime_registry import LATEST, _version_key, get_runtime
+from backend.services.sanitizer import strip_scripts_and_inline_handlers
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "BOOT_MIN_RUNTIME",
+    "PageShell",
+    "boot_url",
+    "build_html_doc",
+    "build_shell",
+    "json_for_script",
+    "runtime_url",
+    "shell_etag",
+    "user_js_bytes",
+    "user_js_url",
+    "viewer_boot",
+]
+
+# найстаріший рантайм, що дотягує env з bootUrl; старші показали б підписаний івент без відео
+BOOT_MIN_RUNTIME = "1.1.0"
+
+def runtime_url(version: str | None) -> str:
+    return f"/runtime/ppv-runtime.{(version or 'latest')}.js"
+
+def boot_url(event_id: int, preview_token: Optional[str] = None) -> str:
+    # прев'ю без EAT: доступ до boot — тим самим токеном, що й до сторінки
+    q = f"?token={quote(preview_token, safe='')}" if preview_token else ""
+    return f"/api/events/{event_id}/boot{q}"
+
+def user_js_url(ev, etag: Optional[str]) -> Optional[str]:
+    # скомпільований JS — контентно-адресований immutable URL; порожній — без тегу взагалі
+    if getattr(ev, "compiled_at", None) is not None:
+        return user_js_path(ev.id, ev.compiled_js_hash) if ev.compiled_js else None
+    q = f"?v={etag}" if etag else ""
+    return f"/event-assets/{ev.id}/user.js{q}"
+
+def json_for_script(obj: dict) -> str:
+    # безпечно для інлайнового <script>
+    return json.dumps(obj, ensure_ascii=False).replace("</", "<\\/")
+
+def _boot_script(boot: dict) -> str:
+    return (
+        f"window.__PPV_BOOT__={json_for_script(boot)};"
+        f"if(Object.freeze){{try{{Object.freeze(window.__PPV_BOOT__);}}catch(_ ){{}}}}"
+    )
+
+def _style_payload(css: str, gated: bool) -> str:
+    gating_rule = "html.gated, body.gated { visibility: hidden; }" if gated else ""
+    return (gating_rule + ("\n" if gating_rule and (css or "").strip() else "") + (css or "")).strip()
+
+def _script_attrs(nonce: Optional[str], integrity: Optional[str]) -> str:
+    if nonce:
+        return f' nonce="{nonce}"'
+    if integrity:
+        return f' integrity="{integrity}" crossorigin="anonymous"'
+    return ""
+
+def build_html_doc(
+    *,
+    html: str,
+    css: str,
+    runtime_url: str,
+    user_js_url: Optional[str],
+    nonce: Optional[str],
+    assets_base_url: Optional[str],
+    boot: dict,
+    gated: bool,
+    sanitized: bool = False,
+    runtime_integrity: Optional[str] = None,
+    user_js_integrity: Optional[str] = None,
+    csp_meta: Optional[str] = None,
+) -> str:
+    """
+    Порядок:
+      1) __PPV_BOOT__ (inline, nonce або хеш у CSP)
+      2) runtime (nonce або integrity)
+      3) <style> з правилом gated + page_css (nonce або хеш у CSP)
+      4) sanitized body
+      5) user.js (nonce або integrity)
+    sanitized=True — html уже пройшов санітизацію при компіляції.
+    csp_meta — політика в <meta> для статичного експорту, де заголовки ставить не застосунок.
+    """
+    safe_html = (html or "") if sanitized else strip_scripts_and_inline_handlers(html or "")
+
+    preconnect = f'<link rel="preconnect" href="{assets_base_url}">' if assets_base_url else ""
+    meta_csp = f'<meta http-equiv="Content-Security-Policy" content="{csp_meta}"/>' if csp_meta else ""
+
+    nonce_attr = f' nonce="{nonce}"' if nonce else ""
+    css_payload = _style_payload(css, gated)
+    style_tag = f"<style{nonce_attr}>{css_payload}</style>" if css_payload else ""
+    boot_tag = f"<script{nonce_attr}>{_boot_script(boot)}</script>"
+    runtime_tag = f'<script{_script_attrs(nonce, runtime_integrity)} src="{runtime_url}"></script>'
+    user_js_tag = (
+        f'<script{_script_attrs(nonce, user_js_integrity)} src="{user_js_url}"></script>' if user_js_url else ""
+    )
+
+    html_cls = ' class="gated"' if gated else ""
+    body_cls = ' class="gated"' if gated else ""
+
+    return (
+        "<!doctype html>"
+        f"<html lang=\"uk\"{html_cls}>"
+        "<head>"
+        "<meta charset=\"utf-8\"/>"
+        f"{meta_csp}"
+        "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\"/>"
+        f"{preconnect}"
+        "<title>Подія</title>"
+        f"{boot_tag}"
+        f"{runtime_tag}"
+        f"{style_tag}"
+        "</head>"
+        f"<body{body_cls}>"
+        f"{safe_html}"
+        f"{user_js_tag}"
+        "</body>"
+        "</html>"
+    )
+
+# ───────────────────────── shell (hash-CSP) ─────────────────────────
+@dataclass(frozen=True)
+class PageShell:
+    html: str
+    headers: Dict[str, str]
+    etag: str
+    csp: str
+    runtime_version: Optional[str]
+
+def user_js_bytes(ev: models.Event) -> bytes:
+    """Рівно ті байти, що віддає /event-assets (від них рахується SRI)."""
+    if getattr(ev, "compiled_at", None) is not None:
+        return (ev.compiled_js or "").encode("utf-8")
+    return (ev.page_js or "").strip().encode("utf-8")
+
+def _signed(ev) -> bool:
+    return bool(getattr(ev, "bunny_video_path", None))
+
+def shell_boot(ev, *, is_preview: bool = False) -> dict:
+    """Спільна для всіх глядачів частина __PPV_BOOT__; підписаний URL і Mux — лише через bootUrl."""
+    signed = _signed(ev)
+    boot = {
+        "eventId": ev.id,
+        "slug": ev.slug,
+        "loginPath": "/login",
+        "autoGate": (not is_preview),
+        "env": {
+            "title": ev.title,
+            "description": getattr(ev, "short_description", None),
+            # публічний маніфест не секрет; підписаний прийде з boot-ендпоінта
+            "hls": None if signed else getattr(ev, "player_manifest_url", None),
+            "mux": None,
+            "cdn": getattr(ev, "assets_base_url", None),
+            "preview": bool(is_preview),
+        },
+    }
+    if signed:
+        boot["bootUrl"] = boot_url(ev.id, getattr(ev, "preview_token", None) if is_preview else None)
+    return boot
+
+def viewer_boot(ev, *, viewer_id: Optional[str] = None) -> dict:
+    """Per-viewer частина: підписаний (відрами expires) URL відео і конфіг Mux Data."""
+    bunny_path = getattr(ev, "bunny_video_path", None)
+    if not bunny_path:
+        return {"eventId": ev.id, "hls": getattr(ev, "player_manifest_url", None), "mux": None}
+    return {
+        "eventId": ev.id,
+        "hls": BunnySecurityService.generate_signed_url(video_path=bunny_path),
+        "mux": BunnySecurityService.get_mux_metadata(
+            event_title=ev.title,
+            video_id=str(ev.id),
+            env_key=getattr(ev, "mux_env_key", None),
+            user_id=viewer_id,
+        ),
+    }
+
+def shell_runtime(version: Optional[str], *, signed: bool = False):
+    """
+    Рантайм документа. signed — у boot є bootUrl: закріплена версія, старша за BOOT_MIN_RUNTIME,
+    підміняється на latest (інакше env.hls=None і відео не стартує).
+    """
+    runtime, _ = get_runtime(version or LATEST)
+    if signed and runtime is not None and _version_key(runtime.version) < _version_key(BOOT_MIN_RUNTIME):
+        runtime, _ = get_runtime(LATEST)
+        if runtime is not None and _version_key(runtime.version) < _version_key(BOOT_MIN_RUNTIME):
+            log.warning("page_shell_runtime_without_boot", extra={"version": runtime.version})
+    return runtime
+
+def shell_etag(
+    event_etag: Optional[str], runtime_js_version: Optional[str], is_preview: bool = False, *, signed: bool = False,
+) -> str:
+    """
+    ETag документа без рендеру (для 304 до завантаження рядка). Версія рантайму —
+    фактична, після розв'язання 'latest': новий деплой рантайму дає новий документ.
+    """
+    runtime = shell_runtime(runtime_js_version, signed=signed)
+    return calc_payload_etag("shell", event_etag or "", runtime.version if runtime else "", bool(is_preview))
+
+def build_shell(ev: models.Event, *, event_etag: str, is_preview: bool = False, static: bool = False) -> PageShell:
+    """
+    Повний рядок Event (потрібні compiled_*/page_*). static=True — CSP ще й у <meta>
+    (frame-ancestors у <meta> не діє — його має ставити nginx/CDN).
+    """
+    signed = _signed(ev)
+    runtime = shell_runtime(getattr(ev, "runtime_js_version", None), signed=signed)
+    if runtime is None:
+        log.warning("page_shell_runtime_missing", extra={"event_id": ev.id})
+    rt_url = runtime.path if runtime else runtime_url(getattr(ev, "runtime_js_version", None))
+    rt_sri = runtime.integrity if runtime else None
+
+    js_url = user_js_url(ev, event_etag)
+    js_sri = sri_hash(user_js_bytes(ev)) if js_url else None
+
+    compiled = getattr(ev, "compiled_at", None) is not None
+    html = (ev.compiled_html if compiled else getattr(ev, "page_html", "")) or ""
+    css = (ev.compiled_css if compiled else getattr(ev, "page_css", "")) or ""
+    gated = not is_preview
+    boot = shell_boot(ev, is_preview=is_preview)
+
+    script_hashes = [csp_hash(_boot_script(boot))]
+    script_hashes += [f"'{h}'" for h in (rt_sri, js_sri) if h]
+    css_payload = _style_payload(css, gated)
+    style_hashes = [csp_hash(css_payload)] if css_payload else []
+    headers = build_csp_headers(mode="sandbox", nonce=None, script_hashes=script_hashes, style_hashes=style_hashes)
+    csp = headers["Content-Security-Policy"]
+
+    doc = build_html_doc(
+        html=html,
+        css=css,
+        runtime_url=rt_url,
+        user_js_url=js_url,
+        nonce=None,
+        assets_base_url=getattr(ev, "assets_base_url", None),
+        boot=boot,
+        gated=gated,
+        sanitized=compiled,
+        runtime_integrity=rt_sri,
+        user_js_integrity=js_sri,
+        csp_meta=(csp.replace("frame-ancestors 'none';", "").strip() if static else None),
+    )
+    etag = shell_etag(event_etag, getattr(ev, "runtime_js_version", None), is_preview, signed=signed)
+    set_etag_header(headers, etag)
+    headers.setdefault("X-Content-Type-Options", "nosniff")
+    headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
+    return PageShell(html=doc, headers=headers, etag=etag, csp=csp, runtime_version=runtime.version if runtime else None)
@@ -1,32 +1,221 @@
 # backend/services/repo/access_codes.py
-#v0.5
+#v0.6
 from __future__ import annotations
-from typing import List
+import io
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select, text
 from sqlalchemy.orm import Session as DB
+from sqlalchemy.exc import IntegrityError
 
 from backend import models
-from backend.services.authn.codes import hash_code
-from backend.services.codegen import generate_unique_code
+from backend.services.authn.codes import hash_codes
+from backend.services.authn.code_cache import invalidate_codes
 from backend.services.codegen import generate_unique_codes_bulk
 
-def create_access_codes(db: DB, amount: int, allowed_sessions: int) -> list[str]:
+log = logging.getLogger(__name__)
+
+INGEST_CHUNK = 5_000
+INGEST_MAX_RETRIES = 3
+
+@dataclass(frozen=True)
+class CodeAttrs:
+    """Атрибути, які отримує кожен код партії (пишуться разом із рядком, без UPDATE-ів)."""
+    allowed_sessions: int = 1
+    expires_at: Optional[datetime] = None
+    batch_id: Optional[int] = None
+    allow_all_events: bool = False
+    event_ids: Sequence[int] = ()
+    revoked: bool = False
+
+# ───────────────────────── PostgreSQL: COPY ─────────────────────────
+def _copy_supported(db: DB) -> bool:
+    return db.get_bind().dialect.name == "postgresql" and db.get_bind().dialect.driver == "psycopg2"
+
+def _copy_field(v) -> str:
+    # text-формат COPY: \N — NULL; коди/хеші без табів і переносів
+    if v is None:
+        return r"\N"
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return str(v)
+
+def _copy_rows(db: DB, table: str, columns: Sequence[str], rows) -> None:
+    buf = io.StringIO()
+    for r in rows:
+        buf.write("\t".join(_copy_field(v) for v in r))
+        buf.write("\n")
+    buf.seek(0)
+    raw = db.connection().connection  # DBAPI-зʼєднання в тій самій транзакції
+    with raw.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+def _insert_pg_copy(db: DB, plains: Sequence[str], hashes: Sequence[str], attrs: CodeAttrs) -> List[int]:
+    # id виділяємо наперед із sequence — COPY не вміє RETURNING, а id потрібні для M2M
+    ids = list(db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('access_codes', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(plains)},
+    ).scalars())
+    _copy_rows(
+        db, "access_codes",
+        ("id", "code_plain", "code_hash", "allowed_sessions", "allow_all_events", "revoked", "expires_at", "batch_id"),
+        ((i, p, h, attrs.allowed_sessions, attrs.allow_all_events, attrs.revoked, attrs.expires_at, attrs.batch_id)
+         for i, p, h in zip(ids, plains, hashes)),
+    )
+    if attrs.event_ids and not attrs.allow_all_events:
+        _copy_rows(db, "code_allowed_events", ("code_id", "event_id"),
+                   ((cid, eid) for cid in ids for eid in attrs.event_ids))
+    return ids
+
+# ───────────────────────── інші діалекти: multi-row INSERT ─────────────────────────
+def _insert_multirow(db: DB, plains: Sequence[str], hashes: Sequence[str], attrs: CodeAttrs) -> List[int]:
+    c = models.AccessCode
+    rows = db.execute(
+        insert(c).returning(c.id, c.code_plain),
+        [
+            {
+                "code_plain": p, "code_hash": h,
+                "allowed_sessions": attrs.allowed_sessions,
+                "allow_all_events": attrs.allow_all_events,
+                "revoked": attrs.revoked,
+                "expires_at": attrs.expires_at,
+                "batch_id": attrs.batch_id,
+            }
+            for p, h in zip(plains, hashes)
+        ],
+    ).all()
+    by_plain = {p: int(i) for i, p in rows}
+    ids = [by_plain[p] for p in plains]
+    if attrs.event_ids and not attrs.allow_all_events:
+        db.execute(
+            insert(models.CodeAllowedEvent),
+            [{"code_id": cid, "event_id": eid} for cid in ids for eid in attrs.event_ids],
+        )
+    return ids
+
+def insert_codes(db: DB, plains: Sequence[str], attrs: CodeAttrs) -> List[int]:
+    """
+    Один прохід: рядки access_codes з усіма атрибутами + M2M code_allowed_events.
+    PostgreSQL/psycopg2 — COPY, інакше multi-row INSERT. Без коміту; повертає id у порядку plains.
+    """
+    if not plains:
+        return []
+    hashes = hash_codes(plains)
+    if _copy_supported(db):
+        return _insert_pg_copy(db, plains, hashes, attrs)
+    return _insert_multirow(db, plains, hashes, attrs)
+
+def insert_codes_skip_existing(db: DB, rows: Sequence[dict]) -> set[str]:
+    """
+    INSERT ... ON CONFLICT (code_plain) DO NOTHING RETURNING code_plain (PG / SQLite).
+    rows — словники колонок access_codes (code_hash рахується тут, пакетом).
+    Повертає множину реально вставлених code_plain; решта — дублікати. Без коміту.
+    """
+    if not rows:
+        return set()
+    hashes = hash_codes([r["code_plain"] for r in rows])
+    values = [{**r, "code_hash": h} for r, h in zip(rows, hashes)]
+    c = models.AccessCode
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"insert_codes_skip_existing: {dialect}")
+    stmt = dialect_insert(c).on_conflict_do_nothing(index_elements=["code_plain"]).returning(c.code_plain)
+    return set(db.execute(stmt, values).scalars().all())
+
+def missing_event_ids(db: DB, event_ids: Sequence[int]) -> List[int]:
+    """event_ids, яких немає в events — перевіряти ДО створення партії й першого чанку."""
+    ids = sorted({int(e) for e in event_ids})
+    if not ids:
+        return []
+    found = set(db.execute(select(models.Event.id).where(models.Event.id.in_(ids))).scalars())
+    return [e for e in ids if e not in found]
+
+def _is_code_plain_collision(exc: IntegrityError) -> bool:
+    """Лише UNIQUE(code_plain) варто повторювати новими кодами; FK/NOT NULL — помилка вхідних даних."""
+    orig = getattr(exc, "orig", None)
+    pgcode = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if pgcode is not None:
+        constraint = getattr(getattr(orig, "diag", None), "constraint_name", None)
+        return pgcode == "23505" and (constraint is None or "code_plain" in constraint)
+    msg = str(orig).lower()
+    return "unique" in msg and "code_plain" in msg
+
+def stream_new_codes(
+    db: DB, amount: int, attrs: CodeAttrs, *, chunk_size: int = INGEST_CHUNK,
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Генерує й записує amount нових кодів чанками; кожен чанк комітиться окремо
+    і віддається як [(id, code_plain), ...]. Колізія з паралельним процесом
+    (UNIQUE code_plain) → відкат лише цього чанку й нові коди для нього;
+    будь-яка інша IntegrityError піднімається одразу.
+
+    Не атомарно: при збої посеред партії вже закомічені чанки (і CodeBatch,
+    створений викликачем) лишаються — job продовжує з progress, синхронні
+    ендпоінти повертають помилку, а частину партії видно в адмінці за batch_id.
+    Тому event_ids перевіряються тут до першого чанку (ValueError), а викликачі
+    мають зробити те саме ще до create_code_batch — див. missing_event_ids.
+    """
+    missing = missing_event_ids(db, attrs.event_ids) if not attrs.allow_all_events else []
+    if missing:
+        raise ValueError(f"events_not_found:{missing}")
     model = models.AccessCode
-    plains = generate_unique_codes_bulk(db, model, field_name="code_plain", n=amount)
-    objs = [
-        model(code_plain=p, code_hash=hash_code(p), allowed_sessions=int(allowed_sessions))
-        for p in plains
-    ]
-    db.add_all(objs)
-    try:
-        db.commit()
-    except IntegrityError:
-        # на випадок гонки з іншим процесом — добити бракуючі й повторити
-        db.rollback()
-        # можна обчислити які саме впали, але простіше — викликати ще раз і докинути
-        extra_needed = amount - db.query(model).filter(model.code_plain.in_(plains)).count()
-        if extra_needed > 0:
-            extra = generate_unique_codes_bulk(db, model, "code_plain", extra_needed)
-            db.add_all([model(code_plain=p, code_hash=hash_code(p), allowed_sessions=int(allowed_sessions)) for p in extra])
-            db.commit()
-        # повертаємо вже наявні + нові (або просто plains, якщо достатньо)
-    return plains
+    left = int(amount)
+    while left > 0:
+        want = min(left, int(chunk_size))
+        for attempt in range(1, INGEST_MAX_RETRIES + 1):
+            plains = generate_unique_codes_bulk(db, model, field_name="code_plain", n=want)
+            try:
+                ids = insert_codes(db, plains, attrs)
+                db.commit()
+                break
+            except IntegrityError as e:
+                db.rollback()
+                if attempt == INGEST_MAX_RETRIES or not _is_code_plain_collision(e):
+                    raise
+                log.warning("code_ingest_conflict_retry", extra={"attempt": attempt, "size": want})
+        # коди могли бути в негативному кеші логіну
+        invalidate_codes(plains)
+        left -= len(plains)
+        yield list(zip(ids, plains))
+
+def create_code_batch(db: DB, label: str | None, admin_id: int | str | None = None) -> int | None:
+    """Створює CodeBatch для партії (одразу з комітом); None — без лейблу."""
+    BatchModel = getattr(models, "CodeBatch", None)
+    if not (label and BatchModel and hasattr(models.AccessCode, "batch_id")):
+        return None
+    batch_kwargs = {}
+    if hasattr(BatchModel, "label"): batch_kwargs["label"] = label
+    elif hasattr(BatchModel, "name"): batch_kwargs["name"] = label
+    elif hasattr(BatchModel, "title"): batch_kwargs["title"] = label
+    if hasattr(BatchModel, "generated_by"):
+        batch_kwargs["generated_by"] = str(admin_id or "")
+    batch = BatchModel(**batch_kwargs)
+    db.add(batch); db.commit()
+    return batch.id
+
+def attrs_from_create(data, batch_id: int | None) -> CodeAttrs:
+    """CodeAttrs із schemas.AccessCodeCreate (та похідних)."""
+    allow_all = bool(getattr(data, "allow_all", None))
+    exp = getattr(data, "expires_at", None)
+    if exp is not None:
+        exp = exp.replace(tzinfo=timezone.utc) if exp.tzinfo is None else exp.astimezone(timezone.utc)
+    return CodeAttrs(
+        allowed_sessions=int(data.max_concurrent_sessions or data.allowed_sessions or 1),
+        expires_at=exp,
+        batch_id=batch_id,
+        allow_all_events=allow_all,
+        event_ids=() if allow_all else tuple(int(e) for e in (getattr(data, "event_ids", None) or [])),
+    )
+
+def create_access_codes(db: DB, amount: int, allowed_sessions: int) -> list[str]:
+    attrs = CodeAttrs(allowed_sessions=int(allowed_sessions))
+    return [p for part in stream_new_codes(db, amount, attrs) for _, p in part]
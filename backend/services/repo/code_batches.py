@@ -0,0 +1,175 @@
+# backend/services/repo/code_batches.py
+# Масові операції над усіма кодами партії (CodeBatch): set-based UPDATE замість циклу по кодах.
+from __future__ import annotations
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.redis import get_redis
+from backend.services.authn.code_cache import invalidate_codes
+from backend.services.session.online import ONLINE_ZSET
+from backend.services.session.slots import reset_slots
+from backend.services.ws_service import broadcast, publish_terminate_batch
+from backend.utils.dt import now_utc
+
+log = logging.getLogger(__name__)
+
+OFFLINE_CHUNK = 1_000
+
+@dataclass
+class BatchOpResult:
+    batch_id: int
+    codes: int = 0
+    sessions_ended: int = 0
+    code_ids: List[int] = field(default_factory=list, repr=False)
+    code_plains: List[str] = field(default_factory=list, repr=False)
+    ended_session_ids: List[str] = field(default_factory=list, repr=False)
+
+    def to_dict(self) -> dict:
+        return {"batch_id": self.batch_id, "codes": self.codes, "sessions_ended": self.sessions_ended}
+
+def _batch_codes(batch_id: int):
+    return select(models.AccessCode.id).where(models.AccessCode.batch_id == batch_id)
+
+def _update_codes(db: DB, batch_id: int, values: dict, res: BatchOpResult) -> None:
+    """UPDATE access_codes ... WHERE batch_id RETURNING id, code_plain — id/plain потрібні для кешів."""
+    c = models.AccessCode
+    rows = db.execute(
+        update(c).where(c.batch_id == batch_id).values(**values).returning(c.id, c.code_plain)
+    ).all()
+    res.codes = len(rows)
+    res.code_ids = [int(i) for i, _ in rows]
+    res.code_plains = [p for _, p in rows]
+
+def _end_sessions(db: DB, session_filter, reason: str, res: BatchOpResult) -> None:
+    """
+    Гасить активні сесії за фільтром трьома set-based запитами:
+    SessionEvent (INSERT ... SELECT), revoke refresh-токенів, UPDATE sessions RETURNING id.
+    """
+    S, RT, SE = models.Session, models.RefreshToken, models.SessionEvent
+    victims = select(S.id).where(S.active.is_(True), session_filter)
+
+    db.execute(
+        insert(SE).from_select(
+            ["session_id", "event", "details"],
+            select(S.id, literal("logout"), literal(reason)).where(S.active.is_(True), session_filter),
+        )
+    )
+    db.execute(
+        update(RT)
+        .where(RT.revoked_at.is_(None), RT.session_id.in_(victims))
+        .values(revoked_at=now_utc())
+        .execution_options(synchronize_session=False)
+    )
+    ids = db.execute(
+        update(S)
+        .where(S.active.is_(True), session_filter)
+        .values(active=False, connected=False)
+        .returning(S.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    res.ended_session_ids = list(ids)
+    res.sessions_ended = len(ids)
+
+def _after_commit(res: BatchOpResult, reason: str, op: str) -> None:
+    """Сигнали — лише після коміту: слоти, присутність, один terminate на партію, кеш логіну."""
+    if res.sessions_ended:
+        reset_slots(res.code_ids)
+        try:
+            r = get_redis()
+            ids = res.ended_session_ids
+            for i in range(0, len(ids), OFFLINE_CHUNK):
+                r.zrem(ONLINE_ZSET, *ids[i:i + OFFLINE_CHUNK])
+        except Exception:
+            log.debug("batch_mark_offline_failed", exc_info=True)
+        publish_terminate_batch(res.batch_id, res.ended_session_ids, reason)
+    try:
+        broadcast({"type": "code_batch_updated", "payload": {"op": op, **res.to_dict()}})
+    except Exception:
+        pass
+    # останнім: strict при збої Redis дає 503, решта сигналів уже розіслана
+    invalidate_codes(res.code_plains, strict=True)
+
+def _in_batch(batch_id: int):
+    return models.Session.code_id.in_(_batch_codes(batch_id))
+
+def set_batch_revoked(db: DB, batch_id: int, revoked: bool = True) -> BatchOpResult:
+    res = BatchOpResult(batch_id)
+    _update_codes(db, batch_id, {"revoked": bool(revoked)}, res)
+    if revoked:
+        _end_sessions(db, _in_batch(batch_id), "batch_revoked", res)
+    db.commit()
+    _after_commit(res, "batch_revoked", "revoke" if revoked else "restore")
+    return res
+
+def set_batch_expires(db: DB, batch_id: int, expires_at: Optional[datetime]) -> BatchOpResult:
+    """Новий expires_at для всієї партії; якщо він уже минув — сесії гасяться одразу."""
+    res = BatchOpResult(batch_id)
+    _update_codes(db, batch_id, {"expires_at": expires_at}, res)
+    if expires_at is not None and expires_at <= now_utc():
+        _end_sessions(db, _in_batch(batch_id), "batch_expired", res)
+    db.commit()
+    _after_commit(res, "batch_expired", "expires")
+    return res
+
+def set_batch_allowed_sessions(db: DB, batch_id: int, allowed_sessions: int) -> BatchOpResult:
+    """
+    Новий ліміт сесій. Якщо ліміт зменшився — понад ліміт гасяться найстаріші
+    (та сама політика, що й витіснення при логіні), одним запитом з row_number().
+    """
+    S = models.Session
+    limit = max(1, int(allowed_sessions))
+    res = BatchOpResult(batch_id)
+    _update_codes(db, batch_id, {"allowed_sessions": limit}, res)
+
+    ranked = (
+        select(
+            S.id.label("sid"),
+            func.row_number().over(partition_by=S.code_id, order_by=S.created_at.desc()).label("rn"),
+        )
+        .where(S.active.is_(True), _in_batch(batch_id))
+        .subquery()
+    )
+    excess = select(ranked.c.sid).where(ranked.c.rn > limit)
+    _end_sessions(db, S.id.in_(excess), "limit_exceeded", res)
+    db.commit()
+    _after_commit(res, "limit_exceeded", "allowed_sessions")
+    return res
+
+def set_batch_allowed_events(
+    db: DB, batch_id: int, *, allow_all: bool, event_ids: Sequence[int] = (),
+) -> BatchOpResult:
+    """
+    Replace-семантика, як у /codes/{id}/allow_events, але для всієї партії:
+    DELETE зв’язків + INSERT ... SELECT (коди партії × події). Сесії, привʼязані
+    до події поза новим переліком, гасяться (коди з фіксованим event_id — лише поза ним).
+    """
+    S, CAE = models.Session, models.CodeAllowedEvent
+    res = BatchOpResult(batch_id)
+    _update_codes(db, batch_id, {"allow_all_events": bool(allow_all)}, res)
+    db.execute(delete(CAE).where(CAE.code_id.in_(_batch_codes(batch_id))))
+    ids = sorted({int(e) for e in event_ids}) if not allow_all else []
+    if ids:
+        db.execute(
+            insert(CAE).from_select(
+                ["code_id", "event_id"],
+                select(models.AccessCode.id, models.Event.id)
+                .join(models.Event, models.Event.id.in_(ids))  # коди партії × події
+                .where(models.AccessCode.batch_id == batch_id),
+            )
+        )
+    if not allow_all:
+        # та сама пріоритетність, що в code_allows_event: фіксований AccessCode.event_id
+        # важить більше за M2M-перелік, тож такі коди лишаються при «своїй» події
+        fixed = select(models.AccessCode.event_id).where(models.AccessCode.id == S.code_id).scalar_subquery()
+        by_list = fixed.is_(None) if not ids else and_(fixed.is_(None), S.event_id.not_in(ids))
+        out_of_scope = and_(S.event_id.is_not(None), or_(and_(fixed.is_not(None), fixed != S.event_id), by_list))
+        _end_sessions(db, and_(_in_batch(batch_id), out_of_scope), "event_not_allowed", res)
+    db.commit()
+    _after_commit(res, "event_not_allowed", "allowed_events")
+    return res
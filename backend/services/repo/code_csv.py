@@ -0,0 +1,284 @@
+# backend/services/repo/code_csv.py
+# CSV-імпорт/експорт access-кодів: спільне для HTTP-ендпоінтів і фонових задач.
+from __future__ import annotations
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Optional, TextIO
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.services.authn.code_cache import invalidate_codes
+from backend.services.repo.access_codes import insert_codes_skip_existing
+from backend.services.search import text_search
+
+IMPORT_BATCH = 5_000
+IMPORT_MAX_ERRORS = 1_000  # у відповідь — лише перші N; лічильник skipped — повний
+EXPORT_BATCH = 5_000
+
+EXPORT_HEADER = ["id", "code", "event", "max_concurrent_sessions", "active", "created_at", "expires_at"]
+
+def parse_bool(val) -> bool | None:
+    if val is None:
+        return None
+    v = str(val).strip().lower()
+    if v in ("1", "true", "yes", "y", "on"):
+        return True
+    if v in ("0", "false", "no", "n", "off"):
+        return False
+    return None
+
+def parse_dt_to_utc(val: str | None):
+    if not val:
+        return None
+    v = val.strip()
+    try:
+        v = v.replace("Z", "").replace("T", " ")
+        dt = datetime.fromisoformat(v)
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def _batch_label_col():
+    BatchModel = getattr(models, "CodeBatch", None)
+    if not (BatchModel and hasattr(models.AccessCode, "batch_id")):
+        return None, None
+    for cand in ("label", "name", "title"):
+        if hasattr(BatchModel, cand):
+            return BatchModel, getattr(BatchModel, cand)
+    return BatchModel, None
+
+# ───────────────────────── IMPORT ─────────────────────────
+@dataclass
+class CsvImportOptions:
+    # дефолти
+    default_sessions: int = 1
+    default_active: bool = True
+    default_expires_at: Optional[str] = None
+    event: Optional[str] = None
+    # структура CSV
+    has_header: bool = True
+    code_column: str = "code"
+    sessions_column: str = "max_concurrent_sessions"
+    active_column: str = "active"
+    expires_column: str = "expires_at"
+    event_column: str = "event"
+    # прапорці перезапису
+    force_sessions: bool = False
+    force_active: bool = False
+    force_expires: bool = False
+    force_event: bool = False
+
+def import_codes_csv(
+    db: DB,
+    f: TextIO,
+    opts: CsvImportOptions,
+    *,
+    admin_id: int | str | None = None,
+    on_batch: Optional[Callable[[int, int, int], None]] = None,
+) -> dict:
+    """
+    Потоковий імпорт: файл читається рядок за рядком (без read() цілком),
+    вставка батчами INSERT ... ON CONFLICT (code_plain) DO NOTHING RETURNING,
+    коміт на кожен батч. Дублікати — різниця між батчем і RETURNING.
+    on_batch(line, created, skipped) — після кожного коміту (прогрес / скасування).
+    """
+    BatchModel, batch_label_col = _batch_label_col()
+
+    # усі наявні лейбли — одним запитом наперед; нові створюються за потреби
+    batch_ids: dict[str, int] = {}
+    if batch_label_col is not None:
+        for b_id, lbl in db.execute(select(BatchModel.id, batch_label_col)).all():
+            if lbl:
+                batch_ids.setdefault(lbl, b_id)
+
+    def batch_id_for(lbl: str | None) -> int | None:
+        if not (lbl and batch_label_col is not None):
+            return None
+        label = lbl.strip()
+        if not label:
+            return None
+        if label not in batch_ids:
+            kwargs = {batch_label_col.key: label}
+            if hasattr(BatchModel, "generated_by"):
+                kwargs["generated_by"] = str(admin_id or "")
+            batch = BatchModel(**kwargs)
+            db.add(batch); db.flush()
+            batch_ids[label] = batch.id
+        return batch_ids[label]
+
+    default_exp = parse_dt_to_utc(opts.default_expires_at)
+    default_act = bool(opts.default_active)
+    default_ev = (opts.event or "").strip() or None
+
+    def iter_rows():
+        """(line, code, sessions, active, exp, ev_label) — по одному, без буферизації файлу."""
+        if opts.has_header:
+            reader = csv.DictReader(f)
+            field_map = {(k or "").strip().lower(): k for k in (reader.fieldnames or [])}
+            code_key = field_map.get(opts.code_column.lower())
+            sess_key = field_map.get(opts.sessions_column.lower())
+            act_key = field_map.get(opts.active_column.lower())
+            exp_key = field_map.get(opts.expires_column.lower())
+            ev_key = field_map.get(opts.event_column.lower())
+            if not code_key:
+                raise LookupError(f"Column '{opts.code_column}' not found")
+
+            for r in reader:
+                line = reader.line_num
+                code = (r.get(code_key) or "").strip()
+                if not code:
+                    yield line, None, 0, False, None, None
+                    continue
+
+                if opts.force_sessions:
+                    sessions = max(1, opts.default_sessions)
+                else:
+                    s_raw = (r.get(sess_key) or "").strip() if sess_key else ""
+                    try:
+                        sessions = int(s_raw) if s_raw else opts.default_sessions
+                    except ValueError:
+                        sessions = opts.default_sessions
+                    sessions = max(1, sessions)
+
+                if opts.force_active:
+                    active = default_act
+                else:
+                    a_parsed = parse_bool((r.get(act_key) or "").strip() if act_key else None)
+                    active = default_act if a_parsed is None else a_parsed
+
+                if opts.force_expires:
+                    exp = default_exp
+                else:
+                    exp = parse_dt_to_utc((r.get(exp_key) or "").strip() if exp_key else None) or default_exp
+
+                if opts.force_event:
+                    ev_label = default_ev
+                else:
+                    ev_label = (r.get(ev_key) or "").strip() if ev_key else ""
+                    if not ev_label:
+                        ev_label = default_ev
+
+                yield line, code, sessions, active, exp, ev_label
+        else:
+            reader = csv.reader(f)
+            for r in reader:
+                code = (r[0] or "").strip() if r else ""
+                yield reader.line_num, code or None, max(1, opts.default_sessions), default_act, default_exp, default_ev
+
+    errors: list[dict] = []
+    created = 0
+    skipped = 0
+
+    def add_error(line: int, code: str, reason: str) -> None:
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": line, "code": code, "reason": reason})
+
+    def flush(pending: list[tuple[int, dict]]) -> None:
+        nonlocal created, skipped
+        inserted = insert_codes_skip_existing(db, [row for _, row in pending])
+        db.commit()
+        # коди могли потрапити в негативний кеш (спроби логіну до імпорту)
+        invalidate_codes(inserted)
+        claimed: set[str] = set()
+        for line, row in pending:
+            plain = row["code_plain"]
+            if plain in inserted and plain not in claimed:
+                claimed.add(plain); created += 1
+            else:
+                skipped += 1
+                add_error(line, plain, "duplicate")
+        if on_batch:
+            on_batch(pending[-1][0], created, skipped)
+
+    max_len = models.AccessCode.code_plain.type.length
+    pending: list[tuple[int, dict]] = []
+    try:
+        for line, plain, sessions, active, exp, ev_label in iter_rows():
+            if not plain:
+                skipped += 1
+                continue
+            if len(plain) > max_len:
+                skipped += 1
+                add_error(line, plain, "too_long")
+                continue
+            pending.append((line, {
+                "code_plain": plain,
+                "allowed_sessions": sessions,
+                "revoked": not active,
+                "expires_at": exp,
+                "batch_id": batch_id_for(ev_label),
+            }))
+            if len(pending) >= IMPORT_BATCH:
+                flush(pending)
+                pending = []
+        if pending:
+            flush(pending)
+    except LookupError as e:
+        db.rollback()
+        return {"ok": False, "detail": str(e)}
+    except csv.Error as e:
+        db.rollback()
+        return {"ok": False, "detail": f"CSV parse error: {e}", "created": created, "skipped": skipped}
+
+    return {"ok": True, "created": created, "skipped": skipped, "errors": errors}
+
+# ───────────────────────── EXPORT ─────────────────────────
+def export_codes_stmt(db: DB, q: str | None, active: bool | None):
+    """SELECT для експорту: (AccessCode, batch label) з тими ж фільтрами, що й у списку."""
+    c = models.AccessCode
+    BatchModel, title_col = _batch_label_col()
+    if title_col is not None:
+        stmt = select(c, title_col.label("event_title")).outerjoin(BatchModel, c.batch_id == BatchModel.id)
+        via = [(c.batch_id, BatchModel.id, title_col)]
+    else:
+        stmt = select(c)
+        via = []
+    if active is not None:
+        stmt = stmt.where(c.revoked == (not active))
+    cond = text_search(db, q, [c.code_plain], via=via)
+    if cond is not None:
+        stmt = stmt.where(cond)
+    return stmt.order_by(c.id.desc())
+
+def count_export_rows(db: DB, q: str | None, active: bool | None) -> int:
+    sub = export_codes_stmt(db, q, active).order_by(None).subquery()
+    return int(db.execute(select(func.count()).select_from(sub)).scalar_one())
+
+def iter_export_csv(
+    db: DB,
+    q: str | None,
+    active: bool | None,
+    *,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> Iterator[str]:
+    """CSV шматками по EXPORT_BATCH рядків (yield_per — без .all() у памʼять)."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(EXPORT_HEADER)
+    yield buf.getvalue()
+
+    done = 0
+    stmt = export_codes_stmt(db, q, active).execution_options(yield_per=EXPORT_BATCH)
+    for part in db.execute(stmt).partitions():
+        buf.seek(0); buf.truncate(0)
+        for row in part:
+            c, ev = row[0], (row[1] if len(row) > 1 else "")
+            w.writerow([
+                c.id,
+                c.code_plain or "",
+                ev or "",
+                c.allowed_sessions or 1,
+                "0" if c.revoked else "1",
+                c.created_at or "",
+                c.expires_at or "",
+            ])
+        done += len(part)
+        yield buf.getvalue()
+        if on_batch:
+            on_batch(done)
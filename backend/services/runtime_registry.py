@@ -0,0 +1,138 @@
+# backend/services/runtime_registry.py
+# Реєстр версій PPV-рантайму: файли ppv-runtime.<version>.js читаються один раз при старті,
+# мініфікуються і тримаються в пам'яті вже стиснутими (identity/gzip/br) — на запит лише вибір байтів.
+from __future__ import annotations
+import hashlib
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from backend.core.config import ROOT_DIR, settings
+from backend.services.compression import available_encodings, compress, negotiate
+from backend.services.csp import sri_hash
+from backend.services.page_compiler import minify_js
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "LATEST",
+    "RuntimeAsset",
+    "all_runtimes",
+    "get_runtime",
+    "load_runtimes",
+    "runtime_versions",
+]
+
+LATEST = "latest"
+_FILE_RE = re.compile(r"^ppv-runtime\.([0-9A-Za-z][0-9A-Za-z._-]*)\.js$")
+
+@dataclass(frozen=True)
+class RuntimeAsset:
+    version: str
+    etag: str
+    # encoding ('' — identity) → байти
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+    # SRI (integrity=) для hash-CSP сторінок: скрипт закріпленої версії ніколи не зміниться
+    integrity: str = ""
+
+    @property
+    def path(self) -> str:
+        return f"/runtime/ppv-runtime.{self.version}.js"
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # strong ETag різний для кожного content-coding (RFC 9110 §8.8.3)
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """304, якщо клієнт має будь-який варіант — вміст однаковий, різниться лише кодування."""
+        if not if_none_match:
+            return False
+        known = {self.etag_for(e or None) for e in self.bodies}
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"') in known:
+                return True
+        return False
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        enc = negotiate(accept_encoding, [e for e in available_encodings() if e in self.bodies])
+        return self.bodies[enc or ""], enc
+
+def _version_key(v: str) -> tuple:
+    # '1.10.0' > '1.9.2'; нечислові частини — після числових
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in re.split(r"[._-]", v))
+
+def build_asset(version: str, source: str) -> RuntimeAsset:
+    raw = minify_js(source).encode("utf-8")
+    bodies = {"": raw}
+    for enc in available_encodings():
+        packed = compress(raw, enc)
+        if len(packed) < len(raw):
+            bodies[enc] = packed
+    return RuntimeAsset(
+        version=version,
+        etag=hashlib.sha256(raw).hexdigest()[:32],
+        bodies=bodies,
+        integrity=sri_hash(raw),
+    )
+
+_lock = threading.Lock()
+_assets: Dict[str, RuntimeAsset] = {}
+_latest: Optional[str] = None
+_loaded = False
+
+def runtime_dir() -> Path:
+    p = Path(getattr(settings, "runtime_dir", "backend/static/runtime"))
+    return p if p.is_absolute() else ROOT_DIR / p
+
+def load_runtimes(directory: Optional[Path] = None) -> Dict[str, RuntimeAsset]:
+    """Перечитує каталог і атомарно підміняє реєстр. Викликається при старті."""
+    global _assets, _latest, _loaded
+    directory = directory or runtime_dir()
+    assets: Dict[str, RuntimeAsset] = {}
+    if directory.is_dir():
+        for f in sorted(directory.iterdir()):
+            m = _FILE_RE.match(f.name)
+            if not m or m.group(1) == LATEST:
+                continue
+            assets[m.group(1)] = build_asset(m.group(1), f.read_text(encoding="utf-8"))
+    if not assets:
+        log.warning("runtime_registry_empty", extra={"dir": str(directory)})
+    latest = max(assets, key=_version_key) if assets else None
+    with _lock:
+        _assets, _latest, _loaded = assets, latest, True
+    log.info("runtime_registry_loaded", extra={"versions": sorted(assets), "latest": latest})
+    return assets
+
+def _ensure_loaded() -> None:
+    if not _loaded:
+        load_runtimes()
+
+def get_runtime(version: str) -> Tuple[Optional[RuntimeAsset], bool]:
+    """
+    → (asset, pinned). pinned=True — конкретна версія, її байти ніколи не змінюються.
+    'latest' і невідомі версії віддають найновішу, але без immutable.
+    """
+    _ensure_loaded()
+    with _lock:
+        asset = _assets.get(version)
+        if asset is not None and version != LATEST:
+            return asset, True
+        return (_assets.get(_latest) if _latest else None), False
+
+def all_runtimes() -> Tuple[RuntimeAsset, ...]:
+    _ensure_loaded()
+    with _lock:
+        return tuple(_assets.values())
+
+def runtime_versions() -> dict:
+    _ensure_loaded()
+    with _lock:
+        return {"latest": _latest, "versions": sorted(_assets, key=_version_key)}
@@ -1,7 +1,7 @@
 # backend/services/sanitizer.py
 from __future__ import annotations
 import re
-from typing import Optional
+from typing import Iterator, Optional
 
 try:
     import bleach  # опційно: якщо встановлено, можемо задіяти allowlist-санітизацію
@@ -10,34 +10,330 @@ except Exception:  # pragma: no cover
 
 __all__ = [
     "strip_scripts_and_inline_handlers",
+    "iter_sanitized",
     "sanitize_html",
     "has_inline_event_handlers",
 ]
 
-# Вирізати <script>...</script>
-_SCRIPT_TAG_RE = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
-# Вирізати on*="" атрибути: onload, onclick, onerror, ...
-_ON_ATTR_RE = re.compile(r"\s(on[a-z0-9_-]+)\s*=\s*(\".*?\"|'.*?'|[^\s>]+)", re.IGNORECASE | re.DOTALL)
+# Однопрохідний токенізатор за правилами HTML-токенізації (data state, теги, атрибути, коментарі).
+# Кожен regex — match/search з поточної позиції по неперетинних класах символів, без
+# відкатів між альтернативами: час лінійний від довжини входу на будь-якому (зламаному) HTML.
+#
+# Вихід — канонічна серіалізація того, що побачив токенізатор: текст без «голих» '<',
+# атрибути в подвійних лапках з екранованими " < >, коментарі/декларації викинуто. Тому браузер
+# розбирає результат так само, як ми, — зокрема в rawtext-контекстах (<style>, <textarea>) і SVG,
+# де розбіжність токенізації і є класичним обходом санітайзерів.
+_TAG_NAME_RE = re.compile(r"[^\t\n\f\r />]*")
+# пропуск між атрибутами ('/' поза '/>' — теж пропуск) + ім'я; '=' може бути першим символом імені
+_ATTR_NAME_RE = re.compile(r"[\t\n\f\r /]*([^\t\n\f\r />][^\t\n\f\r />=]*)?")
+_ATTR_EQ_RE = re.compile(r"[\t\n\f\r ]*=[\t\n\f\r ]*")
+_UNQUOTED_RE = re.compile(r"[^\t\n\f\r >]*")
+_COMMENT_END_RE = re.compile(r"--!?>")
+# RAWTEXT/RCDATA-елементи: браузер не бачить у вмісті тегів до відповідного закриваючого —
+# копіюємо вміст як є (<script> — вирізаємо), інакше «<style>x<y</style>» з'їв би закриваючий тег
+_RAW_TEXT = frozenset({"style", "textarea", "title", "xmp", "noscript", "iframe", "noembed", "noframes"})
+_RAW_END_RE = {
+    name: re.compile(rf"</{name}[\t\n\f\r />]", re.IGNORECASE) for name in ("script", *_RAW_TEXT)
+}
+# Іноземний контент (SVG/MathML): там style/title/… — звичайні елементи, вміст браузер розбирає
+# як розмітку. Тримаємо стек відкритих елементів від <svg>/<math> до їх закриття; HTML integration
+# points повертають HTML-контекст, «breakout»-теги виводять з іноземного контенту, як у браузера.
+_FOREIGN_ROOTS = frozenset({"svg", "math"})
+_INTEGRATION_POINTS = {
+    "svg": frozenset({"foreignobject", "desc", "title"}),
+    "math": frozenset({"mi", "mo", "mn", "ms", "mtext", "annotation-xml"}),
+}
+_BREAKOUT = frozenset({
+    "b", "big", "blockquote", "body", "br", "center", "code", "dd", "div", "dl", "dt", "em", "embed",
+    "h1", "h2", "h3", "h4", "h5", "h6", "head", "hr", "i", "img", "li", "listing", "menu", "meta", "nobr",
+    "ol", "p", "pre", "ruby", "s", "small", "span", "strong", "strike", "sub", "sup", "table", "tt", "u",
+    "ul", "var",
+})
+_TEXT_RE = re.compile(r"[^<]+")
+# Швидкий шлях: найдовший префікс, що вже в канонічній формі — текст і теги з name="value"
+# (без < > у значенні), крім <script>, raw-text елементів, <svg>/<math> і on*. Один match у C замість розбору по токенах;
+# усе інше (неканонічне/небезпечне) — повним розбором нижче. Альтернативи починаються з різних
+# символів, а після '+' нічого не вимагається — катастрофічного відкату немає.
+_SAFE_TAG = (
+    rf"<(?!(?:{'|'.join(sorted({*_RAW_END_RE, *_FOREIGN_ROOTS}))})[\t\n\f\r />])[A-Za-z][A-Za-z0-9-]*"
+    r'(?:[\t\n\f\r ]+(?!on)[A-Za-z_:][-A-Za-z0-9_:.]*(?:="[^"<>]*")?)*[\t\n\f\r ]*/?>'
+    r"|</[A-Za-z][A-Za-z0-9-]*>"
+)
+_SAFE_RUN_RE = re.compile(rf"(?:[^<]+|{_SAFE_TAG})+", re.IGNORECASE)
+# той самий тег, що перетнув межу вікна прогону
+_SAFE_TAG_RE = re.compile(_SAFE_TAG, re.IGNORECASE)
+# імена атрибутів, які браузер прийме, але які не мають сенсу в легітимній розмітці;
+# "=" — лише першим символом, і після атрибута без значення перечитується як його значення
+_BAD_ATTR_CHARS = frozenset("\"'<`=")
+
+_ATTR_ESCAPE = str.maketrans({'"': "&quot;", "<": "&lt;", ">": "&gt;"})
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+def _parse_tag(html: str, pos: int, n: int, on_handler=None):
+    """
+    pos — на першому символі імені тегу. → (end, name, attrs, self_closing) або None,
+    якщо тег не закритий до кінця входу (браузер такий тег відкидає разом з рештою).
+    attrs — готові до виводу ' name="value"' (on* уже відкинуто).
+    """
+    m = _TAG_NAME_RE.match(html, pos)
+    name = m.group()
+    pos = m.end()
+    attrs: list[str] = []
+    while True:
+        m = _ATTR_NAME_RE.match(html, pos)
+        skipped_to = m.start(1) if m.group(1) is not None else m.end()
+        attr = m.group(1)
+        pos = m.end()
+        if attr is None:
+            if pos >= n:
+                return None
+            # тут лише '>': решту символів забирає ім'я атрибута
+            self_closing = skipped_to > m.start() and html[skipped_to - 1] == "/"
+            return pos + 1, name, attrs, self_closing
+        value = None
+        eq = _ATTR_EQ_RE.match(html, pos)
+        if eq is not None:
+            pos = eq.end()
+            if pos >= n:
+                return None
+            q = html[pos]
+            if q == '"' or q == "'":
+                close = html.find(q, pos + 1)
+                if close < 0:
+                    return None
+                value = html[pos + 1:close]
+                pos = close + 1
+            else:
+                u = _UNQUOTED_RE.match(html, pos)
+                value = u.group()
+                pos = u.end()
+        lname = attr.lower()
+        if lname.startswith("on"):
+            if on_handler is not None:
+                on_handler(lname)
+            continue
+        if _BAD_ATTR_CHARS.intersection(attr):
+            continue
+        attrs.append(f" {attr}" if value is None else f' {attr}="{value.translate(_ATTR_ESCAPE)}"')
+
+def _is_alpha(ch: str) -> bool:
+    return ("a" <= ch <= "z") or ("A" <= ch <= "Z")
+
+class _Foreign:
+    """
+    Стек відкритих елементів SVG/MathML: (ім'я, integration point, простір імен).
+    Лічильник імен — щоб закриваючий тег без пари не сканував стек: на ворожому вході
+    (тисячі незакритих <g> і </x>) час лишається лінійним.
+    """
+
+    __slots__ = ("stack", "names", "seen")
+
+    def __init__(self) -> None:
+        self.stack: list[tuple[str, bool, str]] = []
+        self.names: dict[str, int] = {}
+        self.seen = False
+
+    def __bool__(self) -> bool:
+        return bool(self.stack)
+
+    @property
+    def active(self) -> bool:
+        """Поточний вузол — іноземний (не integration point): raw-text правила не діють."""
+        return bool(self.stack) and not self.stack[-1][1]
+
+    def _push(self, name: str, integration: bool, ns: str) -> None:
+        self.stack.append((name, integration, ns))
+        self.names[name] = self.names.get(name, 0) + 1
+        self.seen = True
+
+    def _pop(self) -> None:
+        name = self.stack.pop()[0]
+        self.names[name] -= 1
+
+    def _breakout(self) -> None:
+        while self.active:
+            self._pop()
+
+    def enter(self, lname: str, attrs: list[str], self_closing: bool) -> None:
+        if self.active:
+            font_breakout = lname == "font" and any(
+                a.split("=", 1)[0].strip().lower() in ("color", "face", "size") for a in attrs
+            )
+            if lname in _BREAKOUT or font_breakout:
+                self._breakout()
+            elif not self_closing:
+                ns = self.stack[-1][2]
+                self._push(lname, lname in _INTEGRATION_POINTS[ns], ns)
+        elif lname in _FOREIGN_ROOTS and not self_closing:
+            self._push(lname, False, lname)
+
+    def leave(self, lname: str) -> None:
+        """Закриваючий тег знімає стек до елемента з цим ім'ям; </p>, </br> — теж breakout."""
+        if lname in ("p", "br") and self.active:
+            self._breakout()
+        elif self.names.get(lname):
+            while self.stack[-1][0] != lname:
+                self._pop()
+            self._pop()
+
+def _sanitize(html: str, chunk_size: int, on_handler=None) -> Iterator[str]:
+    n = len(html)
+    pos = 0
+    out: list[str] = []
+    size = 0
+    foreign = _Foreign()
+    while pos < n:
+        # вікно chunk_size: один гігантський прогін не ламає межу шматка при стрімінгу;
+        # усередині SVG/MathML — лише повний розбір, бо потрібне ім'я кожного тегу
+        run = None if foreign else _SAFE_RUN_RE.match(html, pos, min(n, pos + chunk_size))
+        if run is None and foreign and html[pos] != "<":
+            run = _TEXT_RE.match(html, pos, min(n, pos + chunk_size))
+        if run is not None:
+            out.append(run.group())
+            size += run.end() - pos
+            pos = run.end()
+            if size >= chunk_size:
+                yield "".join(out)
+                out = []
+                size = 0
+            if pos >= n or html[pos] != "<":
+                continue
+        nxt = html[pos + 1] if pos + 1 < n else ""
+
+        safe = None if foreign else _SAFE_TAG_RE.match(html, pos)
+        if safe is not None:
+            piece = safe.group()
+            pos = safe.end()
+        elif _is_alpha(nxt):
+            tag = _parse_tag(html, pos + 1, n, on_handler)
+            if tag is None:
+                break
+            end, name, attrs, self_closing = tag
+            lname = name.lower()
+            if lname == "script":
+                # вміст скрипта — до першого </script…; далі розбираємо звичайним HTML
+                m = _RAW_END_RE["script"].search(html, end)
+                if m is None:
+                    break
+                closing = _parse_tag(html, m.start() + 2, n)
+                if closing is None:
+                    break
+                pos = closing[0]
+                continue
+            if lname in _RAW_TEXT and not foreign.active:
+                # вміст — дослівно до першого </name…; без нього — до кінця, і закриваємо самі,
+                # щоб розмітка після фрагмента (user.js) не потрапила у вміст
+                m = _RAW_END_RE[lname].search(html, end)
+                closing = _parse_tag(html, m.start() + 2, n) if m is not None else None
+                stop = m.start() if closing is not None else n
+                body = html[end:stop]
+                if foreign.seen:
+                    # після SVG/MathML дерево браузера могло розійтися з нашим стеком (таблиці,
+                    # select, …): без '<' вміст — лише текст за будь-якого тлумачення
+                    body = body.replace("<", "&lt;")
+                piece = f"<{name}{''.join(attrs)}{'/' if self_closing else ''}>{body}</{name}>"
+                pos = closing[0] if closing is not None else n
+                out.append(piece)
+                size += len(piece)
+                if size >= chunk_size:
+                    yield "".join(out)
+                    out = []
+                    size = 0
+                continue
+            foreign.enter(lname, attrs, self_closing)
+            pos = end
+            if "<" in name:
+                # «<a<script>» — один тег для браузера, але на вигляд як два: не ризикуємо
+                continue
+            piece = f"<{name}{''.join(attrs)}{'/' if self_closing else ''}>"
+        elif nxt == "/":
+            after = html[pos + 2] if pos + 2 < n else ""
+            if _is_alpha(after):
+                tag = _parse_tag(html, pos + 2, n)
+                if tag is None:
+                    break
+                # атрибути закриваючого тегу браузер ігнорує
+                pos = tag[0]
+                foreign.leave(tag[1].lower())
+                if "<" in tag[1]:
+                    continue
+                piece = f"</{tag[1]}>"
+            elif after == "":
+                piece = "&lt;/"
+                pos = n
+            else:
+                # '</>' ігнорується, '</ …>' — bogus comment
+                gt = html.find(">", pos + 2)
+                if gt < 0:
+                    break
+                pos = gt + 1
+                continue
+        elif nxt == "!" and html.startswith("<!--", pos):
+            body = pos + 4
+            # '<!-->' і '<!--->' закривають коментар одразу
+            if html.startswith(">", body):
+                pos = body + 1
+            elif html.startswith("->", body):
+                pos = body + 2
+            else:
+                m = _COMMENT_END_RE.search(html, body)
+                if m is None:
+                    break
+                pos = m.end()
+            continue
+        elif nxt == "!" or nxt == "?":
+            # <!DOCTYPE …>, <![CDATA[…>, <?xml …> — bogus comment до першого '>'
+            gt = html.find(">", pos + 2)
+            if gt < 0:
+                break
+            pos = gt + 1
+            continue
+        else:
+            # '<' не відкриває тег — текст; екрануємо, щоб склеювання після вирізань не дало тег
+            piece = "&lt;"
+            pos += 1
+
+        out.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(out)
+            out = []
+            size = 0
+    if out:
+        yield "".join(out)
+
+def iter_sanitized(html: Optional[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Те саме, що strip_scripts_and_inline_handlers, але шматками ~chunk_size символів —
+    для StreamingResponse/запису у файл без повної копії результату в пам'яті.
+    """
+    if not html:
+        return iter(())
+    return _sanitize(html, max(1, int(chunk_size)))
 
 def strip_scripts_and_inline_handlers(html: Optional[str]) -> str:
     """
     Мінімально-безпечна санація:
     - повністю вирізає <script>...</script>
     - видаляє інлайн-обробники подій (on*)
-    НЕ чіпає інший HTML. Придатно для режиму з CSP nonce та окремим user.js.
+    - викидає коментарі/декларації, нормалізує лапки атрибутів і екранує «голі» '<'
+    Решту HTML не чіпає. Придатно для режиму з CSP та окремим user.js.
     """
     if not html:
         return ""
-    no_scripts = _SCRIPT_TAG_RE.sub("", html)
-    # Забираємо ВСІ on* атрибути; це жорстко, але безпечно
-    cleaned = _ON_ATTR_RE.sub("", no_scripts)
-    return cleaned
+    # вікном, а не одним прогоном: гігантський match у re повільніший за кілька по 64K
+    return "".join(_sanitize(html, DEFAULT_CHUNK_SIZE))
 
 def has_inline_event_handlers(html: Optional[str]) -> bool:
     """Чи містить html інлайн on* атрибути (для діагностики/логів адмінці)."""
     if not html:
         return False
-    return bool(_ON_ATTR_RE.search(html))
+    found: list[str] = []
+    for _ in _sanitize(html, DEFAULT_CHUNK_SIZE, found.append):
+        if found:
+            return True
+    return bool(found)
 
 def sanitize_html(
     html: Optional[str],
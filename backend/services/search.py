@@ -0,0 +1,70 @@
+# backend/services/search.py
+from __future__ import annotations
+from typing import Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session as DB
+from sqlalchemy.sql import ColumnElement
+
+__all__ = [
+    "LIKE_ESCAPE",
+    "escape_like",
+    "dialect_name",
+    "contains",
+    "text_search",
+]
+
+LIKE_ESCAPE = "\\"
+
+def escape_like(q: str) -> str:
+    """Екранує %, _ та \\ у користувацькому вводі, щоб вони шукались буквально."""
+    return (
+        q.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+         .replace("%", LIKE_ESCAPE + "%")
+         .replace("_", LIKE_ESCAPE + "_")
+    )
+
+def dialect_name(db: DB) -> str:
+    try:
+        return db.get_bind().dialect.name
+    except Exception:
+        return "postgresql"
+
+def contains(col, q: str, *, dialect: str) -> ColumnElement:
+    """
+    Підрядковий пошук '%q%'.
+    - PostgreSQL: ILIKE → використовує GIN-індекси gin_trgm_ops.
+    - SQLite (dev): звичайний LIKE — він і так регістронезалежний для ASCII,
+      а ilike() загорнув би колонку в lower() і зробив би те саме повільніше.
+    """
+    pattern = f"%{escape_like(q)}%"
+    if dialect == "sqlite":
+        return col.like(pattern, escape=LIKE_ESCAPE)
+    return col.ilike(pattern, escape=LIKE_ESCAPE)
+
+def text_search(
+    db: DB,
+    q: Optional[str],
+    columns: Iterable,
+    *,
+    via: Sequence[Tuple] = (),
+) -> Optional[ColumnElement]:
+    """
+    Будує OR-умову пошуку по колонках однієї таблиці.
+
+    via — пов'язані таблиці як (fk_col, target_pk, target_text_col): замість
+    JOIN + OR по двох таблицях (що ламає BitmapOr у планувальнику) додаємо
+    `fk_col IN (SELECT target_pk WHERE target_text_col ILIKE ...)`.
+    Так кожна гілка OR йде своїм індексом.
+
+    Повертає None, якщо q порожній.
+    """
+    q = (q or "").strip()
+    if not q:
+        return None
+    dialect = dialect_name(db)
+    conds = [contains(c, q, dialect=dialect) for c in columns]
+    for fk_col, target_pk, target_col in via:
+        sub = select(target_pk).where(contains(target_col, q, dialect=dialect))
+        conds.append(fk_col.in_(sub))
+    return or_(*conds)
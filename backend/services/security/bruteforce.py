@@ -1,16 +1,39 @@
 # backend/services/security/bruteforce.py
-#unused
+# Експоненційний backoff після невдалих спроб логіну. Стан — у Redis (hash на IP+scope),
+# таблиця failed_logins — лише фолбек, коли Redis недоступний.
 from __future__ import annotations
+import logging
+from time import time
+
 from sqlalchemy.orm import Session as DB
 from backend import models
 from backend.core.config import settings
+from backend.core.redis import get_redis
+from backend.services.security.rate_limit import too_many
 from backend.utils.dt import now_utc
-from fastapi import HTTPException
 
-def register_failed_code_try(db: DB, ip: str, code_try: str) -> None:
+log = logging.getLogger(__name__)
+
+BF_PREFIX = "bf:"
+
+def _key(scope: str, ip: str) -> str:
+    return f"{BF_PREFIX}{scope}:{ip}"
+
+def _max_attempts() -> int:
+    return int(settings.rate_attempts) + 20
+
+def _wait_seconds(attempts: int) -> int:
+    """Backoff: rate_base * 2^(attempts - rate_attempts - 1); 0 — ще в межах ліміту."""
+    if attempts <= settings.rate_attempts:
+        return 0
+    exp_idx = min(attempts, _max_attempts()) - settings.rate_attempts - 1
+    return int(settings.rate_base) * (2 ** max(exp_idx, 0))
+
+# ───────────────────────── DB-фолбек (стара поведінка) ─────────────────────────
+def _db_register(db: DB, ip: str, code_try: str) -> None:
     rec = db.get(models.FailedLogin, ip)
     if rec:
-        rec.attempts = min(rec.attempts + 1, int(settings.rate_attempts) + 20)
+        rec.attempts = min(rec.attempts + 1, _max_attempts())
         rec.code_try = code_try
         rec.last_try = now_utc()
     else:
@@ -18,22 +41,51 @@ def register_failed_code_try(db: DB, ip: str, code_try: str) -> None:
     db.add(rec)
     db.commit()
 
-def clear_failed_code_try(db: DB, ip: str) -> None:
+def _db_clear(db: DB, ip: str) -> None:
     db.query(models.FailedLogin).filter_by(ip=ip).delete()
     db.commit()
 
-def check_bruteforce(db: DB, ip: str) -> None:
+def _db_state(db: DB, ip: str) -> tuple[int, float]:
+    rec = db.get(models.FailedLogin, ip)
+    if not rec:
+        return 0, 0.0
+    return int(rec.attempts), rec.last_try.timestamp()
+
+# ───────────────────────── API ─────────────────────────
+def register_failed_code_try(db: DB, ip: str, code_try: str, scope: str = "admin") -> None:
+    try:
+        p = get_redis().pipeline(transaction=True)
+        k = _key(scope, ip)
+        p.hincrby(k, "attempts", 1)
+        p.hset(k, mapping={"last": f"{time():.3f}", "code_try": (code_try or "")[:64]})
+        p.expire(k, int(getattr(settings, "bruteforce_ttl_seconds", 86400)))
+        p.execute()
+    except Exception:
+        log.warning("bruteforce_redis_unavailable", exc_info=True)
+        _db_register(db, ip, code_try)
+
+def clear_failed_code_try(db: DB, ip: str, scope: str = "admin") -> None:
+    try:
+        get_redis().delete(_key(scope, ip))
+    except Exception:
+        log.warning("bruteforce_redis_unavailable", exc_info=True)
+        _db_clear(db, ip)
+
+def check_bruteforce(db: DB, ip: str, scope: str = "admin") -> None:
     """
-    Кидає 429, якщо ліміт вичерпано і ще не минув backoff.
+    Кидає 429 (з Retry-After), якщо ліміт вичерпано і ще не минув backoff.
     Backoff: rate_base * 2^(attempts - rate_attempts - 1)
     """
-    rec = db.get(models.FailedLogin, ip)
-    if not rec or rec.attempts <= settings.rate_attempts:
-        return
-
-    exp_idx = rec.attempts - settings.rate_attempts - 1
-    wait = int(settings.rate_base) * (2 ** max(exp_idx, 0))
-    delta = int((now_utc() - rec.last_try).total_seconds())
+    try:
+        attempts, last = get_redis().hmget(_key(scope, ip), "attempts", "last")
+        attempts, last = int(attempts or 0), float(last or 0)
+    except Exception:
+        log.warning("bruteforce_redis_unavailable", exc_info=True)
+        attempts, last = _db_state(db, ip)
 
+    wait = _wait_seconds(attempts)
+    if not wait:
+        return
+    delta = int(time() - last)
     if delta < wait:
-        raise HTTPException(status_code=429, detail=f"Too many attempts, try in {wait - delta} s")
+        raise too_many(wait - delta)
@@ -0,0 +1,138 @@
+# backend/services/security/rate_limit.py
+# Rate-limit логінів у Redis: GCRA (sliding window без лічильників-відер) по кількох ключах атомарно в Lua.
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from math import ceil
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from backend.core.config import settings
+from backend.core.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+RL_PREFIX = "rl:"
+CODE_PREFIX_LEN = 4
+
+# GCRA: для кожного правила зберігається лише TAT (theoretical arrival time, мс).
+# Запит пропускається, якщо TAT - tau <= now для ВСІХ правил; тоді всі TAT зсуваються на T.
+# Відмова нічого не списує — бот, що «довбить» у закриті двері, не продовжує собі бан.
+# KEYS: rule keys | ARGV: T1, tau1, T2, tau2, ... (мс)
+# → {1, 0} — пропущено; {0, retry_ms, rule_index} — відмова
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tats = {}
+local retry, worst = 0, 0
+for i = 1, #KEYS do
+  local T = tonumber(ARGV[2 * i - 1])
+  local tau = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  local wait = tat - tau - now
+  if wait > retry then retry, worst = wait, i end
+  tats[i] = tat + T
+end
+if retry > 0 then
+  return {0, retry, worst}
+end
+for i = 1, #KEYS do
+  redis.call('SET', KEYS[i], tats[i], 'PX', math.max(1, tats[i] - now))
+end
+return {1, 0, 0}
+"""
+
+@lru_cache(maxsize=1)
+def _script():
+    return get_redis().register_script(_GCRA_LUA)
+
+@dataclass(frozen=True)
+class Rule:
+    """count запитів за period секунд (burst = count)."""
+    name: str
+    key: str
+    count: int
+    period: float
+
+    @property
+    def emission_ms(self) -> int:
+        return max(1, int(self.period * 1000 / self.count))
+
+    @property
+    def tau_ms(self) -> int:
+        return max(0, int(self.period * 1000) - self.emission_ms)
+
+def parse_rate(spec: str | None) -> Optional[Tuple[int, float]]:
+    """'20/60' → (20, 60.0); '' / '0/…' → None (правило вимкнене)."""
+    if not spec:
+        return None
+    try:
+        n, _, per = str(spec).partition("/")
+        count, period = int(n), float(per or 1)
+    except ValueError:
+        log.warning("rate_limit_bad_spec", extra={"spec": spec})
+        return None
+    if count <= 0 or period <= 0:
+        return None
+    return count, period
+
+def _rule(name: str, key: str, spec: str | None) -> Optional[Rule]:
+    parsed = parse_rate(spec)
+    return Rule(name, f"{RL_PREFIX}{key}", *parsed) if parsed else None
+
+def enabled() -> bool:
+    return bool(getattr(settings, "rate_limit_enabled", True))
+
+def hit(rules: Sequence[Optional[Rule]]) -> Tuple[bool, float, Optional[str]]:
+    """
+    Атомарна перевірка + списання по всіх правилах. → (allowed, retry_after_sec, rule_name).
+    Redis недоступний → fail-open (логін не блокуємо через інфраструктуру).
+    """
+    active = [r for r in rules if r is not None]
+    if not active or not enabled():
+        return True, 0.0, None
+    args: list = []
+    for r in active:
+        args.extend([r.emission_ms, r.tau_ms])
+    try:
+        res = _script()(keys=[r.key for r in active], args=args)
+    except Exception:
+        log.warning("rate_limit_unavailable", exc_info=True)
+        return True, 0.0, None
+    if int(res[0]) == 1:
+        return True, 0.0, None
+    return False, int(res[1]) / 1000.0, active[int(res[2]) - 1].name
+
+def too_many(retry_after: float, detail: str = "Too many attempts") -> HTTPException:
+    secs = max(1, ceil(retry_after))
+    return HTTPException(status_code=429, detail=f"{detail}, try in {secs} s", headers={"Retry-After": str(secs)})
+
+def _enforce(rules: Sequence[Optional[Rule]]) -> None:
+    allowed, retry, name = hit(rules)
+    if not allowed:
+        log.info("rate_limited", extra={"rule": name, "retry_after": retry})
+        raise too_many(retry)
+
+# ───────────────────────── правила логінів ─────────────────────────
+def code_prefix(code: str) -> str:
+    return (code or "").strip().upper()[:CODE_PREFIX_LEN]
+
+def limit_code_login(ip: str | None, code: str) -> None:
+    """/api/auth/login_by_code: IP, IP + префікс коду, глобально. Кидає 429 з Retry-After."""
+    ip = ip or "0.0.0.0"
+    _enforce([
+        _rule("ip", f"code:ip:{ip}", settings.login_rate_ip),
+        _rule("ip_prefix", f"code:ipp:{ip}:{code_prefix(code)}", settings.login_rate_ip_prefix),
+        _rule("global", "code:global", settings.login_rate_global),
+    ])
+
+def limit_admin_login(ip: str | None) -> None:
+    """/api/admin/login: IP і глобально."""
+    ip = ip or "0.0.0.0"
+    _enforce([
+        _rule("ip", f"admin:ip:{ip}", settings.admin_login_rate_ip),
+        _rule("global", "admin:global", settings.admin_login_rate_global),
+    ])
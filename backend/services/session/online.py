@@ -2,10 +2,14 @@
 #v0.5
 # backend/services/session/online.py
 from __future__ import annotations
+from typing import Dict, Tuple
+
 from backend.core.redis import get_redis
 from backend.utils.dt import utc_ts
 
 ONLINE_ZSET = "online:z"
+# індекс івентів із презенс-ZSET-ами: семплер CCU обходить його замість SCAN по ключах
+ONLINE_EVENTS = "online:events"
 
 def _event_zset(event_id: int) -> str:
     return f"online:z:event:{event_id}"
@@ -44,8 +48,9 @@ def mark_event_online(session_id: str, event_id: int, ttl: int) -> int:
     p.zadd(key, {str(session_id): now + ttl})
     p.zremrangebyscore(key, "-inf", now)
     p.expire(key, max(ttl * 2, 300))
+    p.sadd(ONLINE_EVENTS, int(event_id))
     p.zcount(key, now, "+inf")
-    _, _, _, online_count = p.execute()
+    *_, online_count = p.execute()
     return int(online_count)
 
 def event_ccu(event_id: int) -> int:
@@ -57,3 +62,32 @@ def event_ccu(event_id: int) -> int:
     p.zcount(key, now, "+inf")
     _, count = p.execute()
     return int(count)
+
+def sample_ccu() -> Tuple[int, Dict[int, int]]:
+    """
+    Один знімок для семплера: глобальний CCU і CCU кожного івенту з індексу — двома pipeline.
+    Івент, у якого ZSET спорожнів, віддається з 0 (ряд падає до нуля) і виходить з індексу.
+    """
+    r = get_redis()
+    now = utc_ts()
+    event_ids = []
+    for m in r.smembers(ONLINE_EVENTS):
+        try:
+            event_ids.append(int(m))
+        except (TypeError, ValueError):
+            r.srem(ONLINE_EVENTS, m)
+    p = r.pipeline()
+    p.zremrangebyscore(ONLINE_ZSET, "-inf", now)
+    p.zcount(ONLINE_ZSET, now, "+inf")
+    for event_id in event_ids:
+        key = _event_zset(event_id)
+        p.zremrangebyscore(key, "-inf", now)
+        p.zcount(key, now, "+inf")
+    res = p.execute()
+    total = int(res[1])
+    per_event = {event_id: int(res[3 + 2 * i]) for i, event_id in enumerate(event_ids)}
+    empty = [event_id for event_id, n in per_event.items() if n == 0]
+    if empty:
+        # heartbeat між zcount і srem втратить свій sadd — наступний (за ≤ ttl) поверне івент в індекс
+        r.srem(ONLINE_EVENTS, *empty)
+    return total, per_event
@@ -0,0 +1,210 @@
+# backend/services/session/slots.py
+# Слоти конкурентних сесій коду в Redis (ZSET на код, score = created_at).
+from __future__ import annotations
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from backend.core.config import settings
+from backend.core.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+SLOTS_PREFIX = "code:slots:"
+SLOTS_INDEX = "code:slots:index"   # SET code_id, для яких є живий ZSET (для reconcile)
+
+def _zset_key(code_id: int) -> str:
+    return f"{SLOTS_PREFIX}{int(code_id)}"
+
+def _marker_key(code_id: int) -> str:
+    # маркер «ZSET засіяний з Postgres»; порожній ZSET у Redis не існує, тому окремий ключ
+    return f"{SLOTS_PREFIX}{int(code_id)}:seeded"
+
+def _ttl_ms() -> int:
+    return int(getattr(settings, "session_slots_ttl_seconds", 86400)) * 1000
+
+def slots_enabled() -> bool:
+    return bool(getattr(settings, "session_slots_enabled", True))
+
+# KEYS: zset, marker | ARGV: sid, score, limit, ttl_ms
+# → {-1} якщо не засіяно; інакше {1, victim1, victim2, ...}
+_ADMIT_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+  return {-1}
+end
+local sid = ARGV[1]
+local limit = math.max(1, tonumber(ARGV[3]))
+redis.call('ZADD', KEYS[1], ARGV[2], sid)
+local n = redis.call('ZCARD', KEYS[1])
+local out = {1}
+if n > limit then
+  local over = n - limit
+  -- беремо на один більше: нова сесія ніколи не жертва, навіть при розсинхроні годинників
+  local oldest = redis.call('ZRANGE', KEYS[1], 0, over)
+  for _, m in ipairs(oldest) do
+    if m ~= sid and #out <= over then
+      table.insert(out, m)
+    end
+  end
+  for i = 2, #out do
+    redis.call('ZREM', KEYS[1], out[i])
+  end
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[2], ARGV[4])
+return out
+"""
+
+# KEYS: zset, marker, index | ARGV: ttl_ms, code_id, score1, member1, ...
+_SEED_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+  return 0
+end
+for i = 3, #ARGV, 2 do
+  redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('SET', KEYS[2], '1', 'PX', ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+return 1
+"""
+
+@lru_cache(maxsize=1)
+def _scripts():
+    r = get_redis()
+    return r.register_script(_ADMIT_LUA), r.register_script(_SEED_LUA)
+
+def _score(dt: datetime) -> float:
+    return float(dt.timestamp())
+
+def _load_active(db, code_id: int) -> List[Tuple[str, Optional[datetime]]]:
+    from backend.models import Session
+    rows = db.query(Session.id, Session.created_at).filter(
+        Session.code_id == code_id, Session.active.is_(True)
+    ).all()
+    return [(str(sid), created) for sid, created in rows]
+
+def _seed(db, code_id: int) -> None:
+    _, seed = _scripts()
+    args: list = [_ttl_ms(), int(code_id)]
+    for sid, created in _load_active(db, code_id):
+        args.extend([_score(created) if created else 0.0, sid])
+    seed(keys=[_zset_key(code_id), _marker_key(code_id), SLOTS_INDEX], args=args)
+
+def admit_session(db, code_id: int, session_id: str, created_at: datetime, limit: int) -> Optional[List[str]]:
+    """
+    Атомарно займає слот для нової сесії та повертає sid-и, які треба витіснити
+    (найстаріші понад limit). None — Redis недоступний/вимкнено → викликач іде DB-шляхом.
+    """
+    if not slots_enabled():
+        return None
+    try:
+        admit, _ = _scripts()
+        keys = [_zset_key(code_id), _marker_key(code_id)]
+        args = [str(session_id), _score(created_at), int(limit), _ttl_ms()]
+        res = admit(keys=keys, args=args)
+        if res and int(res[0]) == -1:
+            _seed(db, code_id)
+            res = admit(keys=keys, args=args)
+        if not res or int(res[0]) != 1:
+            return None
+        return [str(v) for v in res[1:]]
+    except Exception:
+        log.warning("session_slots_admit_failed", exc_info=True)
+        return None
+
+def release_slot(code_id: Optional[int], session_id: str) -> None:
+    if not code_id or not slots_enabled():
+        return
+    try:
+        get_redis().zrem(_zset_key(code_id), str(session_id))
+    except Exception:
+        log.debug("session_slots_release_failed", exc_info=True)
+
+def release_slots(pairs: Iterable[Tuple[Optional[int], str]]) -> None:
+    """Пакетне звільнення: [(code_id, sid), ...] одним pipeline."""
+    if not slots_enabled():
+        return
+    try:
+        p = get_redis().pipeline(transaction=False)
+        n = 0
+        for code_id, sid in pairs:
+            if code_id:
+                p.zrem(_zset_key(code_id), str(sid))
+                n += 1
+        if n:
+            p.execute()
+    except Exception:
+        log.debug("session_slots_release_failed", exc_info=True)
+
+def reset_slots(code_ids: Iterable[int]) -> None:
+    """Скидає стан слотів (наступний логін засіє заново з Postgres)."""
+    ids = [int(c) for c in code_ids if c]
+    if not ids or not slots_enabled():
+        return
+    try:
+        p = get_redis().pipeline(transaction=False)
+        for cid in ids:
+            p.delete(_zset_key(cid), _marker_key(cid))
+            p.srem(SLOTS_INDEX, cid)
+        p.execute()
+    except Exception:
+        log.debug("session_slots_reset_failed", exc_info=True)
+
+def reconcile_codes(db, code_ids: Sequence[int], *, grace_seconds: int = 60) -> dict:
+    """
+    Звіряє ZSET-и з Postgres для набору кодів:
+      - ZREM членів, яких немає серед активних сесій (старших за grace — щоб не
+        зачепити логін, що вже в Redis, але ще не закомічений),
+      - ZADD активних сесій, яких бракує в ZSET,
+      - прибирає з індексу коди з простроченим маркером.
+    """
+    from backend.models import Session
+    from backend.utils.dt import utc_ts
+
+    stats = {"removed": 0, "added": 0, "expired": 0}
+    ids = [int(c) for c in code_ids]
+    if not ids:
+        return stats
+
+    r = get_redis()
+    p = r.pipeline(transaction=False)
+    for cid in ids:
+        p.exists(_marker_key(cid))
+        p.zrange(_zset_key(cid), 0, -1, withscores=True)
+    raw = p.execute()
+
+    live: dict[int, dict[str, float]] = {}
+    expired: list[int] = []
+    for i, cid in enumerate(ids):
+        if not raw[2 * i]:
+            expired.append(cid)
+            continue
+        live[cid] = {str(m): float(s) for m, s in raw[2 * i + 1]}
+
+    active: dict[int, dict[str, float]] = {cid: {} for cid in live}
+    if live:
+        rows = db.query(Session.id, Session.code_id, Session.created_at).filter(
+            Session.code_id.in_(list(live)), Session.active.is_(True)
+        ).all()
+        for sid, cid, created in rows:
+            active[int(cid)][str(sid)] = _score(created) if created else 0.0
+
+    cutoff = utc_ts() - int(grace_seconds)
+    p = r.pipeline(transaction=False)
+    for cid, members in live.items():
+        want = active[cid]
+        stale = [m for m, s in members.items() if m not in want and s < cutoff]
+        missing = {m: s for m, s in want.items() if m not in members}
+        if stale:
+            p.zrem(_zset_key(cid), *stale)
+            stats["removed"] += len(stale)
+        if missing:
+            p.zadd(_zset_key(cid), missing)
+            stats["added"] += len(missing)
+    if expired:
+        p.srem(SLOTS_INDEX, *expired)
+        stats["expired"] = len(expired)
+    p.execute()
+    return stats
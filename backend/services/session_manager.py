@@ -1,79 +1,114 @@
 # backend/services/session_manager.py
 #v0.5
 from __future__ import annotations
+from typing import List
+from uuid import uuid4
+
 from sqlalchemy.orm import Session as DB
-from sqlalchemy import select, func, literal
+from sqlalchemy import select, func, text, update, insert
 from fastapi import HTTPException
 
-from backend.utils.dt import now_utc
+from backend.utils.dt import ensure_aware_utc, now_utc
 from backend.models import Session, RefreshToken, SessionEvent, AccessCode
 from backend.services.ws_service import broadcast, publish_terminate
 from backend.services.authz.policy import code_allows_event 
 from backend.services.session.constants import ONLINE_TTL_SEC
 from backend.services.session.tokens import issue_access, issue_refresh, rotate_refresh as _rotate_refresh
 from backend.services.session.online import mark_online, mark_offline
+from backend.services.session.slots import admit_session, release_slot
+from backend.services.authn.code_cache import get_code_meta
+from backend.services.metrics.usage import record_login, record_watch
 
-# (опційно) PG advisory lock для боротьби з гонками при логіні одним кодом
-def _pg_advisory_lock(db: DB, key: int | str) -> None:
-    try:
-        # Безпечний спосіб: через чистий SQL
-        db.execute("SELECT pg_advisory_xact_lock(%s)", [(hash(key) & 0x7fffffff)])
-    except Exception:
-        # Не PostgreSQL — ігноруємо
-        pass
+# простір ключів для pg_advisory_xact_lock(int4, int4): (namespace, code_id)
+_LOGIN_LOCK_NS = 0x5050
+
+# PG advisory lock для боротьби з гонками при логіні одним кодом (лише DB-фолбек)
+def _pg_advisory_lock(db: DB, key: int) -> None:
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text("SELECT pg_advisory_xact_lock(:ns, :key)"), {"ns": _LOGIN_LOCK_NS, "key": int(key)})
 
-def login_with_code(db: DB, code_plain: str, ip: str | None = None, ua: str | None = None):
-    code = db.execute(select(AccessCode).where(AccessCode.code_plain == code_plain)).scalar_one_or_none()
-    if not code or getattr(code, "active", True) is False:
+def _db_pick_victims(db: DB, code_id: int, max_sessions: int) -> List[str]:
+    """Фолбек без Redis: рахуємо активні сесії під advisory lock і беремо найстаріші."""
+    _pg_advisory_lock(db, code_id)
+    current = db.execute(
+        select(func.count()).select_from(Session).where(Session.code_id == code_id, Session.active.is_(True))
+    ).scalar_one()
+    if current < max_sessions:
+        return []
+    overflow = current - max_sessions + 1  # звільняємо місце для нової
+    return list(db.execute(
+        select(Session.id)
+        .where(Session.code_id == code_id, Session.active.is_(True))
+        .order_by(Session.created_at.asc())
+        .limit(overflow)
+        .with_for_update(skip_locked=True)
+    ).scalars().all())
+
+def _revoke_victims(db: DB, victims: List[str]) -> None:
+    """Set-based деактивація витіснених сесій + події 'revoked' (без коміту)."""
+    if not victims:
+        return
+    db.execute(
+        update(Session)
+        .where(Session.id.in_(victims), Session.active.is_(True))
+        .values(active=False, connected=False)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(insert(SessionEvent), [{"session_id": v, "event": "revoked"} for v in victims])
+
+def login_with_code(db: DB, code_plain: str, ip: str | None = None, ua: str | None = None,
+                    event_id: int | None = None):
+    # метадані коду з кешу (Redis) — без SELECT на кожен логін
+    code = get_code_meta(db, code_plain)
+    if not code:
         raise ValueError("Invalid or inactive code")
 
-    exp = getattr(code, "expires_at", None)
-    if exp is not None and getattr(exp, "tzinfo", None) is None:
-        from datetime import timezone
-        exp = exp.replace(tzinfo=timezone.utc)
-    if getattr(code, "revoked", False) or (exp is not None and exp <= now_utc()):
+    if code.is_expired_or_revoked():
         raise HTTPException(status_code=403, detail="Code disabled or expired")
 
-    _pg_advisory_lock(db, getattr(code, "id", code_plain))
+    # перевірка прав на подію — до створення сесії, щоб 403 не лишав «висячу» сесію
+    if event_id is not None and not code_allows_event(db, code, int(event_id)):
+        raise HTTPException(status_code=403, detail="event_not_allowed")
 
-    max_sessions = getattr(code, "max_concurrent_sessions", getattr(code, "allowed_sessions", 1))
-    current = db.execute(
-        select(func.count()).select_from(Session).where(Session.code_id == code.id, Session.active.is_(True))
-    ).scalar_one()
+    max_sessions = code.allowed_sessions or 1
+    sid = str(uuid4())
+    created = now_utc()
 
-    if current >= max_sessions:
-        overflow = current - max_sessions + 1  # звільняємо місце для нової
-        victims = db.execute(
-            select(Session)
-            .where(Session.code_id == code.id, Session.active.is_(True))
-            .order_by(Session.created_at.asc())
-            .limit(overflow)
-            .with_for_update(skip_locked=True)
-        ).scalars().all()
-
-        for old in victims:
-            if old.active:
-                old.active = False
-                old.connected = False
-                db.add(SessionEvent(session_id=old.id, event="revoked"))
-                try: mark_offline(old.id)
-                except: pass
-                try: publish_terminate(old.id, "limit_exceeded")
-                except: pass
-        db.flush()
-
-    s = Session(code_id=code.id, ip=ip, user_agent=ua, active=True, connected=False)
-    db.add(s); db.flush()
-
-    access, jti = issue_access(s.id)
-    s.token_jti = jti
-    rjti = issue_refresh(db, s.id)
-
-    db.add(SessionEvent(session_id=s.id, event="login"))
-    db.commit()
+    # 1) Redis: атомарний admit-and-evict у ZSET коду (без count(*) та FOR UPDATE)
+    victims = admit_session(db, code.id, sid, created, max_sessions)
+    if victims is None:
+        # 2) Redis недоступний — старий шлях через Postgres
+        victims = _db_pick_victims(db, code.id, max_sessions)
+
+    try:
+        _revoke_victims(db, victims)
+
+        s = Session(id=sid, code_id=code.id, event_id=int(event_id) if event_id is not None else None,
+                    ip=ip, user_agent=ua, active=True, connected=False, created_at=created)
+        db.add(s); db.flush()
+
+        access, jti = issue_access(s.id)
+        s.token_jti = jti
+        rjti = issue_refresh(db, s.id)
+
+        db.add(SessionEvent(session_id=s.id, event="login"))
+        record_login(db, code_id=code.id, batch_id=code.batch_id, event_id=s.event_id, at=created)
+        db.commit()
+    except Exception:
+        db.rollback()
+        release_slot(code.id, sid)
+        raise
+
+    # сигнали — лише після коміту
+    for old in victims:
+        try: mark_offline(old)
+        except: pass
+        try: publish_terminate(old, "limit_exceeded")
+        except: pass
 
     try:
-        if current >= max_sessions:
+        if victims:
             broadcast({"type": "session_revoked_bulk", "payload": {"code_id": code.id}})
     except: pass
 
@@ -88,12 +123,21 @@ def logout(db: DB, session_id: str):
         return
     if sess.active:
         sess.active = False
+        # хвіст перегляду з останнього heartbeat — лише якщо глядач ще був онлайн
+        now = now_utc()
+        last = ensure_aware_utc(sess.last_seen)
+        tail = int((now - last).total_seconds()) if last else 0
+        if 0 < tail <= ONLINE_TTL_SEC:
+            sess.watch_seconds = int(sess.watch_seconds or 0) + tail
+            sess.last_seen = now
+            record_watch(db, code_id=sess.code_id, event_id=sess.event_id, seconds=tail)
     sess.connected = False
     db.query(RefreshToken).filter(
         RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None)
     ).update({"revoked_at": now_utc()})
     db.add(SessionEvent(session_id=session_id, event="logout"))
     db.commit()
+    release_slot(sess.code_id, session_id)
     try: mark_offline(session_id)
     except: pass
     try: publish_terminate(session_id, "admin_logout")
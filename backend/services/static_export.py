@@ -0,0 +1,224 @@
+# backend/services/static_export.py
+# Статичний експорт опублікованих сторінок у каталог, який nginx/CDN віддає напряму:
+#   p/{slug}/index.html, events/{id}/page/index.html, events/slug/{slug}/page/index.html
+#   event-assets/{id}/user.{hash}.js
+#   runtime/ppv-runtime.{version}.js
+# Поруч із кожним файлом — .gz/.br (gzip_static/brotli_static). Сторінка — shell на хеш-CSP,
+# per-viewer частину (підписаний URL, Mux) рантайм бере з /api/events/{id}/boot.
+# Для object store каталог синхронізується окремо (rclone/aws s3 sync) — тут лише розкладка.
+from __future__ import annotations
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DB
+
+from backend import models
+from backend.core.config import ROOT_DIR, settings
+from backend.repositories.events_repo import compute_event_etag
+from backend.schemas.events import SLUG_RE
+from backend.services.compression import BR, GZIP, available_encodings, compress
+from backend.services.page_compiler import user_js_path
+from backend.services.page_shell import user_js_bytes, build_shell
+from backend.services.runtime_registry import all_runtimes
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "export_all",
+    "export_event",
+    "export_enabled",
+    "export_runtimes",
+    "sync_event",
+]
+
+_SUFFIX = {GZIP: ".gz", BR: ".br"}
+_MANIFEST_DIR = "_manifest/events"
+
+def export_enabled() -> bool:
+    return bool(getattr(settings, "static_export_dir", ""))
+
+def export_root() -> Path:
+    p = Path(settings.static_export_dir)
+    return p if p.is_absolute() else ROOT_DIR / p
+
+def _inside(root: Path, rel: str) -> Optional[Path]:
+    """Абсолютний шлях у межах root; None — rel виходить за каталог експорту (.., абсолютний, symlink)."""
+    base = root.resolve()
+    p = (base / rel).resolve()
+    return p if p != base and p.is_relative_to(base) else None
+
+# ───────────────────────── файли ─────────────────────────
+def _write_atomic(path: Path, data: bytes) -> bool:
+    """tmp + os.replace: nginx ніколи не бачить наполовину записаний файл. False — вміст не змінився."""
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return True
+
+def _write_with_variants(root: Path, rel: str, raw: bytes, variants: Optional[Dict[str, bytes]] = None) -> list[str]:
+    """Пише файл і стиснуті сусіди; повертає всі записані відносні шляхи."""
+    path = _inside(root, rel)
+    if path is None:
+        raise ValueError(f"static export path outside root: {rel!r}")
+    written = [rel]
+    _write_atomic(path, raw)
+    for enc in available_encodings():
+        body = (variants or {}).get(enc) or compress(raw, enc)
+        rel_enc = rel + _SUFFIX[enc]
+        path_enc = path.with_name(path.name + _SUFFIX[enc])
+        if len(body) < len(raw):
+            _write_atomic(path_enc, body)
+            written.append(rel_enc)
+        else:
+            path_enc.unlink(missing_ok=True)
+    return written
+
+def _remove(root: Path, rels: Iterable[str]) -> int:
+    base = root.resolve()
+    n = 0
+    for rel in rels:
+        p = _inside(base, rel)
+        if p is None:
+            # маніфест із шляхом поза каталогом (старий slug із '..' тощо) — нічого не чіпаємо
+            log.warning("static_export_remove_outside_root", extra={"path": rel})
+            continue
+        try:
+            p.unlink()
+            n += 1
+        except FileNotFoundError:
+            continue
+        # порожні каталоги slug-ів прибираємо, щоб nginx не віддавав autoindex/403
+        parent = p.parent
+        while parent != base and parent.is_relative_to(base):
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+    return n
+
+def _manifest_path(root: Path, event_id: int) -> Path:
+    return root / _MANIFEST_DIR / f"{event_id}.json"
+
+def _read_manifest(root: Path, event_id: int) -> Set[str]:
+    try:
+        return set(json.loads(_manifest_path(root, event_id).read_text(encoding="utf-8")).get("files") or ())
+    except (FileNotFoundError, ValueError):
+        return set()
+
+def _write_manifest(root: Path, event_id: int, files: Set[str]) -> None:
+    if files:
+        data = json.dumps({"files": sorted(files)}, ensure_ascii=False).encode("utf-8")
+        _write_atomic(_manifest_path(root, event_id), data)
+    else:
+        _manifest_path(root, event_id).unlink(missing_ok=True)
+
+# ───────────────────────── експорт ─────────────────────────
+def _page_paths(ev: models.Event) -> tuple[str, ...]:
+    if not SLUG_RE.fullmatch(ev.slug or ""):
+        # slug, збережений до валідації, у шлях не підставляємо — лише сторінка за id
+        log.warning("static_export_bad_slug", extra={"event_id": ev.id})
+        return (f"events/{ev.id}/page/index.html",)
+    return (
+        f"p/{ev.slug}/index.html",
+        f"events/{ev.id}/page/index.html",
+        f"events/slug/{ev.slug}/page/index.html",
+    )
+
+def _user_js_rel(ev: models.Event) -> Optional[str]:
+    if getattr(ev, "compiled_at", None) is not None:
+        return user_js_path(ev.id, ev.compiled_js_hash).lstrip("/") if ev.compiled_js else None
+    # легасі без компіляції: ?v= у URL статичний сервер ігнорує
+    return f"event-assets/{ev.id}/user.js"
+
+def export_runtimes() -> int:
+    """Усі версії з реєстру (вже мініфіковані й стиснуті). Закріплені версії незмінні — перезапис не відбувається."""
+    if not export_enabled():
+        return 0
+    root = export_root()
+    n = 0
+    for asset in all_runtimes():
+        rel = asset.path.lstrip("/")
+        n += len(_write_with_variants(root, rel, asset.bodies[""], asset.bodies))
+    return n
+
+def export_event(db: DB, event_id: int) -> dict:
+    """
+    Приводить файли івенту до поточного стану: опублікований — пише сторінки й user.js,
+    інакше (чернетка/видалений) — прибирає все, що було записано раніше (за маніфестом).
+    """
+    root = export_root()
+    previous = _read_manifest(root, event_id)
+    ev = db.get(models.Event, event_id)
+
+    if ev is None or (ev.status or "draft") != "published":
+        removed = _remove(root, previous)
+        _write_manifest(root, event_id, set())
+        return {"event_id": event_id, "written": 0, "removed": removed}
+
+    etag = ev.etag or compute_event_etag(ev)
+    shell = build_shell(ev, event_etag=etag, static=True)
+    files: Set[str] = set()
+    html = shell.html.encode("utf-8")
+    for rel in _page_paths(ev):
+        files.update(_write_with_variants(root, rel, html))
+    js_rel = _user_js_rel(ev)
+    if js_rel:
+        files.update(_write_with_variants(root, js_rel, user_js_bytes(ev)))
+
+    # старі сторінки (попередній slug) прибираємо; старі user.{hash}.js лишаються —
+    # закешована CDN сторінка ще може на них посилатись, а вміст за хешем не змінюється
+    stale = {p for p in previous - files if not p.startswith("event-assets/")}
+    removed = _remove(root, stale)
+    _write_manifest(root, event_id, files | (previous - files - stale))
+    if shell.runtime_version and not (root / "runtime" / f"ppv-runtime.{shell.runtime_version}.js").exists():
+        export_runtimes()
+    return {"event_id": event_id, "written": len(files), "removed": removed}
+
+def sync_event(db: DB, event_id: int) -> None:
+    """Хук адмінських записів: експорт не повинен ламати збереження — помилки лише в лог."""
+    if not export_enabled():
+        return
+    try:
+        export_event(db, event_id)
+    except Exception:
+        log.exception("static_export_event_failed", extra={"event_id": event_id})
+
+def export_all(db: DB, progress: Optional[Callable[[int, Optional[int]], None]] = None) -> dict:
+    """Повний прохід: рантайми, усі опубліковані івенти, прибирання осиротілих маніфестів."""
+    root = export_root()
+    runtime_files = export_runtimes()
+    ids = list(db.execute(select(models.Event.id).where(models.Event.status == "published")).scalars())
+    known = {
+        int(p.stem) for p in (root / _MANIFEST_DIR).glob("*.json") if p.stem.isdigit()
+    } if (root / _MANIFEST_DIR).is_dir() else set()
+    stale = sorted(known - set(ids))
+    total = len(ids) + len(stale)
+    if progress:
+        progress(0, total)
+    written = removed = 0
+    for i, event_id in enumerate([*ids, *stale], 1):
+        r = export_event(db, event_id)
+        written += r["written"]
+        removed += r["removed"]
+        db.expire_all()
+        if progress:
+            progress(i, None)
+    return {"events": len(ids), "files": written, "removed": removed, "runtime_files": runtime_files}
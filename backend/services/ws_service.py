@@ -3,9 +3,10 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Set, Dict, Optional
+from typing import Dict, Optional, Sequence, Set
 
 import anyio
+import orjson
 from starlette.websockets import WebSocket, WebSocketState
 from backend.core.redis import get_redis, get_redis_async
 
@@ -16,6 +17,12 @@ _clients: Dict[str, WebSocket] = {}                 # session_id -> ws
 _terminate_tasks: Dict[str, asyncio.Task] = {}      # session_id -> listener task
 
 TERMINATE_CH_PREFIX = "session:terminate:"
+# один сигнал на всю партію кодів; кожен WS сам перевіряє свій sid у SET погашених (лише Redis, без БД)
+TERMINATE_BATCH_CH_PREFIX = "batch:terminate:"
+TERMINATED_BATCH_KEY_PREFIX = "batch:terminated:"
+# SET потрібен лише підписникам у момент сигналу
+TERMINATED_BATCH_TTL = 600
+_TERMINATED_CHUNK = 1_000
 
 # ─────────────── клієнтські WS ─────────────────────
 def register_client(session_id: str, ws: WebSocket) -> None:
@@ -57,6 +64,21 @@ def publish_terminate(session_id: str, reason: str = "revoked") -> None:
     except Exception:
         logger.debug("redis_publish_terminate_failed", exc_info=True)
 
+def publish_terminate_batch(batch_id: int, session_ids: Sequence[str], reason: str = "revoked") -> None:
+    """Погашені sid — у SET партії, потім один publish (той самий pipeline, тож SET уже є на момент сигналу)."""
+    if not session_ids:
+        return
+    key = f"{TERMINATED_BATCH_KEY_PREFIX}{int(batch_id)}"
+    try:
+        pipe = get_redis().pipeline()
+        for i in range(0, len(session_ids), _TERMINATED_CHUNK):
+            pipe.sadd(key, *session_ids[i:i + _TERMINATED_CHUNK])
+        pipe.expire(key, TERMINATED_BATCH_TTL)
+        pipe.publish(f"{TERMINATE_BATCH_CH_PREFIX}{int(batch_id)}", reason or "revoked")
+        pipe.execute()
+    except Exception:
+        logger.debug("redis_publish_terminate_batch_failed", exc_info=True)
+
 def _start_terminate_listener(session_id: str) -> None:
     try:
         loop = asyncio.get_running_loop()
@@ -141,3 +163,43 @@ async def _safe_send(ws: WebSocket, event: dict) -> None:
         await ws.send_json(event)
     except Exception:
         unregister_admin_ws(ws)
+
+# ─────────────── broadcast між процесами (Redis) ─────────────
+# broadcast() бачить лише WS цього процесу; події з фонових воркерів (jobs)
+# ідуть через Redis-канал, і кожен процес ретранслює їх своїм адмінам.
+ADMIN_EVENTS_CH = "admin:events"
+
+def publish_admin_event(event: dict) -> None:
+    try:
+        get_redis().publish(ADMIN_EVENTS_CH, orjson.dumps(event))
+    except Exception:
+        logger.debug("redis_publish_admin_event_failed", exc_info=True)
+
+async def run_admin_event_relay() -> None:
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis_async().pubsub()
+            await pubsub.subscribe(ADMIN_EVENTS_CH)
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not msg or msg.get("type") != "message":
+                    continue
+                try:
+                    event = orjson.loads(msg.get("data"))
+                except Exception:
+                    continue
+                if _admin_clients:
+                    await _broadcast_async(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.debug("admin_event_relay_error", exc_info=True)
+            await asyncio.sleep(1.0)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.unsubscribe(ADMIN_EVENTS_CH)
+                    await pubsub.close()
+                except Exception:
+                    pass
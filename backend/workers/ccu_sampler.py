@@ -0,0 +1,72 @@
+# backend/workers/ccu_sampler.py
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+import anyio
+
+from backend.core.config import settings
+from backend.core.redis import get_redis
+from backend.database import SessionLocal
+from backend.services.metrics.ccu_rollups import apply_retention, rollup_range
+from backend.services.metrics.ccu_series import write_ccu_sample
+from backend.services.session.online import sample_ccu
+
+log = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"[:64]
+TICK_LOCK = "ccu:sampler:{minute}"
+# семплюємо трохи після межі хвилини, щоб не збігатися з піком heartbeat-ів на :00
+TICK_OFFSET_SECONDS = 2.0
+# ретеншн — раз на годину, у тіку цієї хвилини години
+RETENTION_MINUTE = 17
+
+def _elect(minute: int) -> bool:
+    """
+    Лідер — на кожну хвилину окремо: SET NX на ключ хвилини. Впалий лідер не тримає роль,
+    наступну хвилину забере будь-який живий воркер; дубль (Redis моргнув) — лише повторний upsert.
+    """
+    try:
+        return bool(get_redis().set(TICK_LOCK.format(minute=minute), WORKER_ID, nx=True, ex=120))
+    except Exception:
+        log.warning("ccu_sampler_election_failed", exc_info=True)
+        return False
+
+def _sample_once(minute: int) -> dict:
+    ts = datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+    total, per_event = sample_ccu()
+    with SessionLocal() as db:
+        events = write_ccu_sample(db, ts, total, per_event)
+        db.commit()
+        # попередні 5 хвилин теж: добирає відро, якщо минулий тік записав точку, але впав на ролапі
+        rollups = rollup_range(db, ts - timedelta(minutes=5), ts)
+        db.commit()
+        removed = None
+        if minute % 60 == RETENTION_MINUTE:
+            removed = apply_retention(db)
+            db.commit()
+    return {"ts": ts.isoformat(), "ccu": total, "events": events, "rollups": rollups, "removed": removed}
+
+async def run_ccu_sampler() -> None:
+    """
+    Щохвилини: глобальний і per-event CCU з презенс-ZSET-ів → ccu_minutely / event_ccu_minutely,
+    далі ролапи 5m/1h/1d відкритих відер; раз на годину — ретеншн.
+    """
+    while True:
+        now = time.time()
+        minute = int(now // 60)
+        await asyncio.sleep(max(0.0, (minute + 1) * 60 + TICK_OFFSET_SECONDS - now))
+        if not getattr(settings, "ccu_sampler_enabled", True):
+            continue
+        try:
+            # хвилина, що щойно почалась, — мітка знімка
+            tick = minute + 1
+            if await anyio.to_thread.run_sync(_elect, tick):
+                stats = await anyio.to_thread.run_sync(_sample_once, tick)
+                log.debug("ccu_sampled", extra=stats)
+        except Exception:
+            log.exception("ccu_sampler_failed")
@@ -17,6 +17,7 @@ from backend.services.ws_service import broadcast, publish_terminate
 from backend.services.session.policy import policy_value
 from backend.services.session.constants import ONLINE_TTL_SEC
 from backend.services.session.online import ONLINE_ZSET  # використовуємо ZSET
+from backend.services.session.slots import release_slots
 from backend.utils.dt import now_utc, utc_ts
 
 log = logging.getLogger(__name__)
@@ -119,11 +120,13 @@ def _deactivate_sessions(offline_sids: Iterable[str]) -> None:
     with SessionLocal() as db:
         # вимикаємо сесії
         sess_rows = db.query(models.Session).filter(models.Session.id.in_(sids)).all()
+        released = []
         for s in sess_rows:
             if getattr(s, "active", False):
                 s.active = False
                 s.connected = False
                 db.add(models.SessionEvent(session_id=s.id, event="auto_idle_kill"))
+                released.append((s.code_id, s.id))
 
         # відкликаємо всі незакриті refresh токени цих сесій (запобігаємо «оживленню»)
         db.query(models.RefreshToken).filter(
@@ -132,3 +135,4 @@ def _deactivate_sessions(offline_sids: Iterable[str]) -> None:
         ).update({"revoked_at": now_utc()}, synchronize_session=False)
 
         db.commit()
+    release_slots(released)
@@ -0,0 +1,57 @@
+# backend/workers/jobs_runner.py
+from __future__ import annotations
+import asyncio
+import logging
+
+import anyio
+
+from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.services.jobs import handlers  # noqa: F401 — реєстрація обробників
+from backend.services.jobs.core import claim_next, requeue_stale, run_job
+
+log = logging.getLogger(__name__)
+
+POLL_SECONDS = 1.0
+REQUEUE_EVERY_SECONDS = 30.0
+
+def _claim() -> str | None:
+    with SessionLocal() as db:
+        return claim_next(db)
+
+def _requeue() -> int:
+    with SessionLocal() as db:
+        return requeue_stale(db)
+
+async def _slot(n: int) -> None:
+    """Один слот виконання: бере задачу з черги, виконує в треді, повторює."""
+    while True:
+        try:
+            job_id = await anyio.to_thread.run_sync(_claim)
+            if job_id:
+                log.info("job_claimed", extra={"job_id": job_id, "slot": n})
+                await anyio.to_thread.run_sync(run_job, job_id)
+                continue
+        except Exception:
+            log.exception("job_slot_failed")
+        await asyncio.sleep(POLL_SECONDS)
+
+async def run_job_workers(concurrency: int | None = None) -> None:
+    """
+    Фоновий цикл черги jobs: N паралельних слотів + періодичне повернення
+    «осиротілих» running-задач (heartbeat протух) у чергу — зокрема після рестарту.
+    """
+    n = max(1, int(concurrency or getattr(settings, "jobs_workers", 2)))
+    slots = [asyncio.create_task(_slot(i)) for i in range(n)]
+    try:
+        while True:
+            try:
+                requeued = await anyio.to_thread.run_sync(_requeue)
+                if requeued:
+                    log.info("jobs_requeued", extra={"count": requeued})
+            except Exception:
+                log.exception("jobs_requeue_failed")
+            await asyncio.sleep(REQUEUE_EVERY_SECONDS)
+    finally:
+        for t in slots:
+            t.cancel()
@@ -0,0 +1,57 @@
+# backend/workers/slots_reconciler.py
+from __future__ import annotations
+import asyncio
+import logging
+from typing import List
+
+import anyio
+
+from backend.core.config import settings
+from backend.core.redis import get_redis
+from backend.database import SessionLocal
+from backend.services.session.slots import SLOTS_INDEX, reconcile_codes, slots_enabled
+
+log = logging.getLogger(__name__)
+
+BATCH_LIMIT = 500
+
+def _reconcile_pass() -> dict:
+    """
+    Один прохід: SSCAN по індексу кодів з живими ZSET-ами, звірка батчами з Postgres.
+    """
+    total = {"removed": 0, "added": 0, "expired": 0}
+    r = get_redis()
+    cursor = 0
+    with SessionLocal() as db:
+        while True:
+            cursor, members = r.sscan(SLOTS_INDEX, cursor=cursor, count=BATCH_LIMIT)
+            ids: List[int] = []
+            for m in members:
+                try:
+                    ids.append(int(m))
+                except (TypeError, ValueError):
+                    continue
+            if ids:
+                stats = reconcile_codes(db, ids)
+                for k, v in stats.items():
+                    total[k] += int(v)
+                db.rollback()  # лише читання; не тримаємо снапшот між батчами
+            if int(cursor) == 0:
+                break
+    return total
+
+async def run_slots_reconciler(poll_seconds: int | None = None) -> None:
+    """
+    Фоновий цикл: підтягує Redis-слоти до стану Postgres
+    (втрачені release після падінь, ручні правки в БД, GC).
+    """
+    interval = int(poll_seconds or getattr(settings, "session_slots_reconcile_seconds", 60))
+    while True:
+        try:
+            if slots_enabled():
+                total = await anyio.to_thread.run_sync(_reconcile_pass)
+                if any(total.values()):
+                    log.info("session_slots_reconcile", extra={"stats": total})
+        except Exception:
+            log.exception("session_slots_reconcile_failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,69 @@
+# benchmarks/bench_code_hash.py
+"""
+Бенчмарк хешування access-кодів (hash_codes) для 10k / 100k / 1M кодів.
+
+    python -m benchmarks.bench_code_hash
+    python -m benchmarks.bench_code_hash --n 10000 100000 --workers 8 --bcrypt-sample 200
+
+bcrypt на 1M кодів рахується годинами, тому для нього хешується лише
+--bcrypt-sample кодів, а час екстраполюється (позначено "~").
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import sys
+import time
+
+os.environ.setdefault("JWT_SECRET", "bench")
+os.environ.setdefault("ADMIN_JWT_SECRET", "bench")
+os.environ.setdefault("DB_URL", "sqlite://")
+
+ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+
+
+def _codes(n: int) -> list[str]:
+    return ["".join(secrets.choice(ALPHABET) for _ in range(10)) for _ in range(n)]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--bcrypt-sample", type=int, default=500)
+    ap.add_argument("--rounds", type=int, default=12)
+    args = ap.parse_args()
+    os.environ["CODE_HASH_BCRYPT_ROUNDS"] = str(args.rounds)
+
+    from backend.services.authn.codes import SCHEME_BCRYPT, SCHEME_HMAC, hash_codes, verify_code
+
+    pool = _codes(max(args.n))
+    print(f"workers={args.workers}  bcrypt rounds={args.rounds}")
+    print(f"{'n':>10}{'scheme':>22}{'seconds':>14}{'codes/s':>14}")
+
+    # прогрів пулу процесів, щоб не міряти його старт
+    hash_codes(pool[: 2 * args.workers], SCHEME_BCRYPT, workers=args.workers)
+
+    for n in args.n:
+        codes = pool[:n]
+        cases = [
+            (SCHEME_HMAC, 1),
+            (f"{SCHEME_BCRYPT} x1", 1),
+            (f"{SCHEME_BCRYPT} x{args.workers}", args.workers),
+        ]
+        for name, workers in cases:
+            scheme = name.split()[0]
+            sample = codes if scheme == SCHEME_HMAC else codes[: min(n, args.bcrypt_sample * max(1, workers))]
+            t0 = time.perf_counter()
+            hashes = hash_codes(sample, scheme, workers=workers)
+            dt = time.perf_counter() - t0
+            assert verify_code(sample[0], hashes[0])
+            total = dt * n / len(sample)
+            mark = "" if len(sample) == n else "~"
+            print(f"{n:>10}{name:>22}{mark + f'{total:.2f}':>14}{n / total:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
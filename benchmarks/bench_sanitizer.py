@@ -0,0 +1,114 @@
+# benchmarks/bench_sanitizer.py
+"""
+Бенчмарк санітизації HTML сторінок івентів на 1 MB / 10 MB.
+
+    python -m benchmarks.bench_sanitizer
+    python -m benchmarks.bench_sanitizer --mb 1 10 50 --legacy-kb 16 64
+
+Сторінки: звичайна розмітка і «ворожі» — тисячі незакритих <script, on*=" без закриваючої
+лапки, суцільні '<' і коментарі без кінця. Старі regex-и (.*? з DOTALL) на таких входах
+квадратичні, тому для них міряємо лише --legacy-kb префікси — видно, як росте час.
+Перед замірами — перевірка XSS: жоден on* з корпусу не має пережити санітизацію.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+
+os.environ.setdefault("JWT_SECRET", "bench")
+os.environ.setdefault("ADMIN_JWT_SECRET", "bench")
+os.environ.setdefault("DB_URL", "sqlite://")
+
+_LEGACY_SCRIPT_RE = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+_LEGACY_ON_RE = re.compile(r"\s(on[a-z0-9_-]+)\s*=\s*(\".*?\"|'.*?'|[^\s>]+)", re.IGNORECASE | re.DOTALL)
+
+
+def legacy(html: str) -> str:
+    return _LEGACY_ON_RE.sub("", _LEGACY_SCRIPT_RE.sub("", html))
+
+
+def _fill(unit: str, size: int) -> str:
+    return unit * (size // len(unit) + 1)
+
+
+PAGES = {
+    "clean": lambda n: _fill(
+        '<section class="hero"><h2 id="t">Заголовок</h2><p>Текст <a href="/x">лінк</a></p>'
+        '<img src="/i.png" alt="" loading="lazy"></section>\n', n),
+    "typical": lambda n: _fill(
+        '<section class="hero"><h2 id="t">Заголовок</h2><p>Текст <a href="/x" onclick="go()">лінк</a></p>'
+        '<img src="/i.png" alt="" loading="lazy"><script>track()</script></section>\n', n),
+    "unclosed-script": lambda n: _fill("<script>x", n),
+    "unclosed-on-quote": lambda n: _fill('<a onclick="x ', n),
+    "lt-flood": lambda n: _fill("<<<<a<", n),
+    "open-comments": lambda n: _fill("<!-- <b>", n),
+    "attr-flood": lambda n: "<div " + _fill('a=1 b="2" onx=3 ', n) + ">",
+    "svg-rawtext": lambda n: _fill(
+        "<svg><style><img src=x onerror=alert(1)></style><title><img src=x onerror=alert(1)></title></svg>", n),
+}
+
+# у SVG/MathML style/title/… — не raw text: браузер розбирає їх вміст як розмітку
+XSS = (
+    "<svg><style><img src=x onerror=alert(1)></style></svg>",
+    "<svg><title><img src=x onerror=alert(1)></title></svg>",
+    "<math><style><img src=x onerror=alert(1)></style></math>",
+    "<svg><textarea><img src=x onerror=alert(1)></textarea></svg>",
+    "<svg><noscript><img src=x onerror=alert(1)></noscript></svg>",
+    "<svg><p></p><math></svg><style><img src=x onerror=alert(1)></style>",
+    "<noscript><p title=\"</noscript><img src=x onerror=alert(1)>\">",
+)
+
+
+def check_xss() -> int:
+    from backend.services.sanitizer import has_inline_event_handlers, strip_scripts_and_inline_handlers
+
+    failed = 0
+    for html in XSS:
+        out = strip_scripts_and_inline_handlers(html)
+        if "onerror" in out or not has_inline_event_handlers(html):
+            print(f"XSS: {html!r} -> {out!r}")
+            failed += 1
+    return failed
+
+
+def _time(fn, html: str) -> float:
+    t0 = time.perf_counter()
+    fn(html)
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, nargs="+", default=[1, 10])
+    ap.add_argument("--legacy-kb", type=int, nargs="+", default=[16, 64])
+    ap.add_argument("--chunk-kb", type=int, default=64)
+    args = ap.parse_args()
+    if check_xss():
+        return 1
+
+    from backend.services.sanitizer import iter_sanitized, strip_scripts_and_inline_handlers
+
+    def streamed(html: str) -> None:
+        for _ in iter_sanitized(html, args.chunk_kb * 1024):
+            pass
+
+    print(f"{'page':>20}{'size':>10}{'impl':>10}{'seconds':>12}{'MB/s':>10}")
+    for name, make in PAGES.items():
+        for kb in args.legacy_kb:
+            html = make(kb * 1024)[: kb * 1024]
+            dt = _time(legacy, html)
+            print(f"{name:>20}{f'{kb}K':>10}{'legacy':>10}{dt:>12.4f}{len(html) / dt / 1e6 if dt else 0:>10.1f}")
+        for mb in args.mb:
+            size = int(mb * 1024 * 1024)
+            html = make(size)[:size]
+            for impl, fn in (("single", strip_scripts_and_inline_handlers), ("stream", streamed)):
+                dt = _time(fn, html)
+                print(f"{name:>20}{f'{mb:g}M':>10}{impl:>10}{dt:>12.4f}{len(html) / dt / 1e6 if dt else 0:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# migrations/alembic/versions/2f7c5e9a1d36_add_compiled_page_assets.py
+"""add compiled page assets to events
+
+Revision ID: 2f7c5e9a1d36
+Revises: 8b1f4d7e2a90
+Create Date: 2026-01-23 16:05:12.583920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7c5e9a1d36'
+down_revision: Union[str, Sequence[str], None] = '8b1f4d7e2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("events", sa.Column("compiled_html", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("compiled_css", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("compiled_js", sa.Text(), nullable=True))
+    op.add_column("events", sa.Column("compiled_js_hash", sa.String(length=32), nullable=True))
+    op.add_column("events", sa.Column("compiled_hash", sa.String(length=32), nullable=True))
+    op.add_column("events", sa.Column("compiled_at", sa.DateTime(timezone=True), nullable=True))
+    # існуючі сторінки компілюються ліниво: при наступному збереженні/публікації,
+    # до того рендер і /user.js працюють із сирих page_*
+
+
+def downgrade() -> None:
+    op.drop_column("events", "compiled_at")
+    op.drop_column("events", "compiled_hash")
+    op.drop_column("events", "compiled_js_hash")
+    op.drop_column("events", "compiled_js")
+    op.drop_column("events", "compiled_css")
+    op.drop_column("events", "compiled_html")
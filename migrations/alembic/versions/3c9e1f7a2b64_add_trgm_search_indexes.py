@@ -0,0 +1,61 @@
+# migrations/alembic/versions/3c9e1f7a2b64_add_trgm_search_indexes.py
+"""add pg_trgm GIN indexes for ILIKE search
+
+Revision ID: 3c9e1f7a2b64
+Revises: e9ee9aa6fe73
+Create Date: 2026-01-12 10:04:11.532710
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f7a2b64'
+down_revision: Union[str, Sequence[str], None] = 'e9ee9aa6fe73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index, table, column)
+TRGM_INDEXES = [
+    ("ix_sessions_id_trgm", "sessions", "id"),
+    ("ix_sessions_ip_trgm", "sessions", "ip"),
+    ("ix_sessions_user_agent_trgm", "sessions", "user_agent"),
+    ("ix_access_codes_code_plain_trgm", "access_codes", "code_plain"),
+    ("ix_code_batches_label_trgm", "code_batches", "label"),
+    ("ix_events_title_trgm", "events", "title"),
+    ("ix_events_slug_trgm", "events", "slug"),
+]
+
+
+def upgrade() -> None:
+    """pg_trgm + GIN-індекси; на SQLite (dev) нічого не робимо — там пошук іде LIKE-фолбеком."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY, щоб не блокувати записи на великих sessions/access_codes;
+    # він не працює всередині транзакції — тому autocommit_block
+    with op.get_context().autocommit_block():
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(
+                name, table, [column],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(TRGM_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    # розширення не видаляємо: ним можуть користуватись інші обʼєкти БД
@@ -0,0 +1,36 @@
+# migrations/alembic/versions/4e8b2d6f1a57_add_event_ccu_minutely.py
+"""add per-event ccu series
+
+Revision ID: 4e8b2d6f1a57
+Revises: 2f7c5e9a1d36
+Create Date: 2026-01-27 11:42:08.315402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b2d6f1a57'
+down_revision: Union[str, Sequence[str], None] = '2f7c5e9a1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_ccu_minutely",
+        sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ccu", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("event_id", "ts"),
+    )
+    # ретеншн і зрізи «усі івенти за хвилину»
+    op.create_index("ix_event_ccu_minutely_ts", "event_ccu_minutely", ["ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_event_ccu_minutely_ts", table_name="event_ccu_minutely")
+    op.drop_table("event_ccu_minutely")
@@ -0,0 +1,80 @@
+# migrations/alembic/versions/5a9d3c7e2b14_add_code_usage_rollups.py
+"""add code and event-code usage rollups
+
+Revision ID: 5a9d3c7e2b14
+Revises: 7c3f9a1e5b28
+Create Date: 2026-02-03 11:42:08.317460
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9d3c7e2b14'
+down_revision: Union[str, Sequence[str], None] = '7c3f9a1e5b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# початкове заповнення; той самий розрахунок повторює задача analytics.rebuild_usage
+BACKFILL = (
+    """
+    INSERT INTO code_usage (code_id, batch_id, sessions, watch_seconds, bytes_out, first_login_at, last_login_at)
+    SELECT s.code_id, c.batch_id, COUNT(*), COALESCE(SUM(s.watch_seconds), 0), COALESCE(SUM(s.bytes_out), 0),
+           MIN(s.created_at), MAX(s.created_at)
+    FROM sessions s JOIN access_codes c ON c.id = s.code_id
+    GROUP BY s.code_id, c.batch_id
+    """,
+    """
+    INSERT INTO event_code_usage (event_id, code_id, sessions, watch_seconds, bytes_out)
+    SELECT s.event_id, s.code_id, COUNT(*), COALESCE(SUM(s.watch_seconds), 0), COALESCE(SUM(s.bytes_out), 0)
+    FROM sessions s
+    WHERE s.event_id IS NOT NULL AND s.code_id IS NOT NULL
+    GROUP BY s.event_id, s.code_id
+    """,
+)
+
+
+def _counters() -> list:
+    return [
+        sa.Column("sessions", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("watch_seconds", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("bytes_out", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    # підсумки пакета/івенту — агрегат цих рядків при читанні, без спільного рядка на пакет/івент
+    op.create_table(
+        "code_usage",
+        sa.Column("code_id", sa.Integer(), nullable=False),
+        sa.Column("batch_id", sa.Integer(), nullable=True),
+        *_counters(),
+        sa.Column("first_login_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_login_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["code_id"], ["access_codes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("code_id"),
+    )
+    op.create_index("ix_code_usage_batch_id", "code_usage", ["batch_id"])
+    op.create_table(
+        "event_code_usage",
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("code_id", sa.Integer(), nullable=False),
+        *_counters(),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["code_id"], ["access_codes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("event_id", "code_id"),
+    )
+    op.create_index("ix_event_code_usage_code_id", "event_code_usage", ["code_id"])
+
+    for sql in BACKFILL:
+        op.execute(sa.text(sql))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_event_code_usage_code_id", table_name="event_code_usage")
+    op.drop_table("event_code_usage")
+    op.drop_index("ix_code_usage_batch_id", table_name="code_usage")
+    op.drop_table("code_usage")
@@ -0,0 +1,40 @@
+# migrations/alembic/versions/7c3f9a1e5b28_add_ccu_rollups.py
+"""add multi-resolution ccu rollups
+
+Revision ID: 7c3f9a1e5b28
+Revises: 4e8b2d6f1a57
+Create Date: 2026-01-28 09:17:44.602193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f9a1e5b28'
+down_revision: Union[str, Sequence[str], None] = '4e8b2d6f1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ccu_rollups",
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("resolution", sa.Integer(), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ccu_min", sa.Integer(), nullable=True),
+        sa.Column("ccu_max", sa.Integer(), nullable=True),
+        sa.Column("ccu_sum", sa.BigInteger(), nullable=True),
+        sa.Column("samples", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("event_id", "resolution", "ts"),
+    )
+    # ретеншн: DELETE по (resolution, ts < cutoff)
+    op.create_index("ix_ccu_rollups_resolution_ts", "ccu_rollups", ["resolution", "ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ccu_rollups_resolution_ts", table_name="ccu_rollups")
+    op.drop_table("ccu_rollups")
@@ -0,0 +1,28 @@
+# migrations/alembic/versions/8b1f4d7e2a90_access_codes_batch_id_index.py
+"""index access_codes.batch_id for batch-level operations
+
+Revision ID: 8b1f4d7e2a90
+Revises: 6d2a9c4e8f13
+Create Date: 2026-01-21 10:41:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1f4d7e2a90'
+down_revision: Union[str, Sequence[str], None] = '6d2a9c4e8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # масові UPDATE ... WHERE batch_id = :id і підзапити сесій партії
+    op.create_index("ix_access_codes_batch_id", "access_codes", ["batch_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_access_codes_batch_id", table_name="access_codes")
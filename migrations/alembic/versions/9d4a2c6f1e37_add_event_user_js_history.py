@@ -0,0 +1,36 @@
+# migrations/alembic/versions/9d4a2c6f1e37_add_event_user_js_history.py
+"""add event user.js history
+
+Revision ID: 9d4a2c6f1e37
+Revises: 5a9d3c7e2b14
+Create Date: 2026-02-05 10:17:44.502913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a2c6f1e37'
+down_revision: Union[str, Sequence[str], None] = '5a9d3c7e2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # попередні версії compiled_js: оболонка з CDN пінить їх SRI-хешем, поки не сплине s-maxage
+    op.create_table(
+        "event_user_js",
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("js_hash", sa.String(length=32), nullable=False),
+        sa.Column("js", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("event_id", "js_hash"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("event_user_js")